@@ -1,19 +1,89 @@
 import streamlit as st
 import pandas as pd
+import io
+from functools import partial
+import json
+import os
 import sys
 from pathlib import Path
 
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.data_loading import load_data, detect_domain
-from src.preprocessing import preprocess_pipeline
-from src.topic_modeling import TopicModeler
-from src.sentiment_analysis import SentimentAnalyzer
-from src.features import create_features
-from src.models import ModelTrainer
-from src.explainability import SHAPExplainer
+from src import config
+from src.data_loading import load_data
+from src.artifacts import ArtifactStore
+from src.jobs import JobRegistry
+from src.pipeline import STAGES
 from src.utils import generate_dummy_data
+from src.cache import get_default_cache
+from src.instrumentation import Instrumentation
+
+STAGE_LABELS = {
+    "preprocess": "Preprocessing",
+    "dedup": "Deduplication",
+    "topics": "Topic Modeling (BERTopic)",
+    "sentiment": "Sentiment Analysis",
+    "features": "Feature Engineering",
+    "model": "Modeling",
+    "shap": "Explainability (SHAP)",
+    "result_store": "Result Store",
+}
+
+# Loaded once per server process and shared by all sessions. Model libraries are
+# imported inside these functions, so the Overview tab renders before any of them load.
+@st.cache_resource
+def get_artifact_store():
+    return ArtifactStore()
+
+@st.cache_resource
+def get_job_registry():
+    return JobRegistry()
+
+@st.cache_resource
+def get_sentence_model(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+@st.cache_resource
+def get_sentiment_analyzer(model_name, num_workers):
+    from src.sentiment_analysis import SentimentAnalyzer
+    return SentimentAnalyzer(model_name, num_workers=num_workers)
+
+# Cached per input, so reruns see identical data (and identical stage keys)
+@st.cache_data
+def load_uploaded(data: bytes, name: str):
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    # Segment columns (agent, location, ...) are loaded too when the file has them
+    return load_data(buffer, extra_columns=config.SEGMENT_COLUMNS)
+
+@st.cache_data
+def load_dummy(domain):
+    return generate_dummy_data(domain)
+
+# Polls the running job; only this fragment reruns, the rest of the page stays as is
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id):
+    job = get_job_registry().get(job_id)
+    if job is None or job.finished:
+        # Full rerun to render the result tabs
+        st.rerun()
+    st.info(f"Pipeline {job.status} ({job.elapsed():.0f}s)")
+    current = next((s for s in STAGES if s not in job.stages), None)
+    for stage in STAGES:
+        state = job.stages.get(stage)
+        if state == "cached":
+            st.write(f"✅ {STAGE_LABELS[stage]} (from previous run)")
+        elif state == "done":
+            st.write(f"✅ {STAGE_LABELS[stage]}")
+        elif stage == current and job.status == "running":
+            st.write(f"⏳ {STAGE_LABELS[stage]}")
+        else:
+            st.write(f"▫️ {STAGE_LABELS[stage]}")
+    if current == "sentiment" and "sentiment" in job.progress:
+        done, total = job.progress["sentiment"]
+        st.progress(done / total, text=f"Scored {done}/{total} reviews")
 
 st.set_page_config(page_title="Dual Domain ML Framework", layout="wide")
 
@@ -23,25 +93,30 @@ st.title("Dual Domain ML Framework: Satisfaction Determinants")
 st.sidebar.header("Configuration")
 data_source = st.sidebar.radio("Data Source", ["Upload CSV", "Use Dummy MHA Data", "Use Dummy Quick Commerce Data"])
 
+sentiment_workers = st.sidebar.number_input("Sentiment worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1)
+profile_stages = st.sidebar.checkbox("Profile stages (cProfile)", value=False)
+
 df = None
 domain = "unknown"
+source_id = data_source
 
 if data_source == "Upload CSV":
-    uploaded_file = st.sidebar.file_uploader("Upload Review CSV", type=["csv"])
+    uploaded_file = st.sidebar.file_uploader("Upload Review CSV", type=["csv", "parquet", "arrow", "feather"])
     if uploaded_file:
-        df, domain = load_data(uploaded_file)
+        df, domain = load_uploaded(uploaded_file.getvalue(), uploaded_file.name)
+        source_id = f"{data_source}:{uploaded_file.file_id}"
 elif data_source == "Use Dummy MHA Data":
-    df = generate_dummy_data("mha")
+    df = load_dummy("mha")
     domain = "mha"
 else:
-    df = generate_dummy_data("quick_commerce")
+    df = load_dummy("quick_commerce")
     domain = "quick_commerce"
 
 if df is not None:
     st.sidebar.success(f"Loaded {len(df)} reviews. Domain: {domain}")
     
     # Tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Overview", "Topic Modeling", "Sentiment Analysis", "Model Performance", "Explainability"])
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Overview", "Topic Modeling", "Sentiment Analysis", "Model Performance", "Explainability", "Performance", "Segments"])
     
     with tab1:
         st.header("Dataset Overview")
@@ -50,66 +125,123 @@ if df is not None:
         st.write(f"**Average Rating:** {df['rating'].mean():.2f}")
         st.bar_chart(df['rating'].value_counts())
 
-    # Pipeline Execution (Cached if possible, but for now direct)
+    # Pipeline Execution: the pipeline runs as a background job shared by all sessions.
+    # Identical submissions (same data + settings) attach to the existing job, and
+    # stage outputs are stored on disk so unchanged stages are loaded, not recomputed.
     if st.sidebar.button("Run Pipeline"):
-        with st.spinner("Preprocessing..."):
-            df = preprocess_pipeline(df, domain)
-            
-        with st.spinner("Topic Modeling (BERTopic)..."):
-            # Reduce samples for speed in demo if needed, but full run here
-            topic_modeler = TopicModeler()
-            topics, probs = topic_modeler.fit_transform(df['clean_text'].tolist())
-            topic_info = topic_modeler.get_topic_info()
-            
+        job = get_job_registry().submit(
+            df, domain,
+            settings={
+                "embedding_model": config.BERTOPIC_EMBEDDING_MODEL,
+                "sentiment_model": config.SENTIMENT_MODEL,
+                "sentiment_backend": config.SENTIMENT_BACKEND,
+                "profile": profile_stages,
+            },
+            description=source_id,
+            store=get_artifact_store(),
+            # Resolved in the job, and only by the stages that actually run
+            sentence_model_factory=partial(get_sentence_model, config.BERTOPIC_EMBEDDING_MODEL),
+            sentiment_analyzer_factory=partial(get_sentiment_analyzer, config.SENTIMENT_MODEL, sentiment_workers),
+            instrumentation=Instrumentation(profile="cprofile" if profile_stages else None),
+        )
+        # Kept across reruns so widget interactions do not lose track of the job
+        st.session_state["job_id"] = job.id
+        st.session_state["pipeline_source"] = source_id
+
+    job = None
+    if st.session_state.get("pipeline_source") == source_id:
+        job = get_job_registry().get(st.session_state.get("job_id"))
+
+    if job is not None and not job.finished:
+        with st.sidebar:
+            show_job_progress(job.id)
+    elif job is not None and job.status == "failed":
+        st.sidebar.error(f"Pipeline failed: {job.error}")
+    elif job is not None and job.status == "evicted":
+        st.sidebar.info("These results were released from memory. Run Pipeline again to reload them "
+                        "from the stored stage outputs (nothing is recomputed).")
+
+    result = job.result if job is not None and job.status == "done" else None
+    if result is not None:
+        dedup = result["dedup"]
+        st.sidebar.caption(f"{dedup['unique']} distinct of {dedup['rows']} reviews ({dedup['reduction_ratio']:.0%} duplicates processed once)")
+        if result["cached_stages"]:
+            st.sidebar.info("Reused from previous runs: " + ", ".join(STAGE_LABELS[s] for s in result["cached_stages"]))
+
         with tab2:
             st.header("Topic Modeling Results")
-            st.dataframe(topic_info)
-            fig = topic_modeler.visualize_topics()
-            if fig:
-                st.plotly_chart(fig)
+            st.dataframe(result["topic_info"])
+            st.write("Average rating and sentiment per topic")
+            st.dataframe(result["result_store"].topic_summary())
+            from src.visualization import plot_topic_map, render_plotly
+            topic_map = result["topic_map"]
+            if len(topic_map) > 1:
+                # Built from the per-topic summary, cached by its hash
+                st.plotly_chart(render_plotly("topic_map", topic_map, plot_topic_map))
             else:
                 st.warning("Not enough topics found to visualize. Try increasing dataset size or adjusting model parameters.")
-            
-        with st.spinner("Sentiment Analysis..."):
-            sentiment_analyzer = SentimentAnalyzer()
-            sentiment_scores = sentiment_analyzer.predict(df['clean_text'].tolist())
-            df['sentiment_score'] = sentiment_scores
-            
+
         with tab3:
             st.header("Sentiment Analysis")
             st.write("Sentiment Scores Distribution")
-            st.bar_chart(pd.Series(sentiment_scores).value_counts())
+            st.bar_chart(result["result_store"].sentiment_counts())
             st.write("Sample Predictions")
-            st.dataframe(df[['review_text', 'rating', 'sentiment_score']].head(10))
-            
-        with st.spinner("Feature Engineering & Modeling..."):
-            # Handle probs being 1D or 2D
-            if probs.ndim == 1:
-                # If BERTopic returns 1D array (probabilities=False or only 1 topic?), 
-                # but we set calculate_probabilities=True.
-                # Sometimes it returns just the probability of the assigned topic.
-                # We need the full probability matrix for the feature engineering strategy we chose.
-                # If probs is 1D, we might need to rely on 'topics' (dominant topic) only.
-                # For safety in this demo, let's check.
-                X, y = create_features(df, topics, sentiment_scores, topic_probs=None) # Fallback to dominant
-            else:
-                X, y = create_features(df, topics, sentiment_scores, topic_probs=probs)
-                
-            trainer = ModelTrainer()
-            results, best_model_name = trainer.train_and_evaluate(X, y)
-            
+            st.dataframe(result["result_store"].head(10, columns=['review_text', 'rating', 'sentiment']))
+            cache_stats = get_default_cache().stats()
+            st.caption(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+
         with tab4:
             st.header("Model Performance")
-            st.write(f"**Best Model:** {best_model_name}")
-            st.json(results)
-            
-        with st.spinner("Explainability (SHAP)..."):
-            explainer = SHAPExplainer(trainer.best_model, X)
-            explainer.calculate_shap()
-            
+            st.write(f"**Best Model:** {result['best_model_name']}")
+            st.json(result["results"])
+
         with tab5:
+            explainer = result["explainer"]
             st.header("SHAP Explainability")
             st.write("Global Feature Importance")
-            st.pyplot(explainer.plot_summary())
-            # st.write("Beeswarm Plot")
-            # st.pyplot(explainer.plot_beeswarm()) # Beeswarm might fail if shap version issues, summary is safer
+            st.caption(f"SHAP values computed on a stratified sample of {len(explainer.X)} of {len(result['X'])} reviews")
+            # Rendered from a bounded summary of the values and cached as PNG,
+            # so size and render time do not grow with the number of reviews
+            from src.visualization import plot_shap_beeswarm, plot_shap_density, plot_shap_importance, render_png
+            summary = explainer.summarize()
+            st.image(render_png("shap_importance", summary, plot_shap_importance))
+            st.write("Beeswarm Plot")
+            st.image(render_png("shap_beeswarm", summary, plot_shap_beeswarm))
+            with st.expander("SHAP value vs feature value (density)"):
+                st.image(render_png("shap_density", summary, plot_shap_density))
+
+        with tab6:
+            performance = result["performance"]
+            st.header("Pipeline Performance")
+            st.write(f"**Total time:** {performance['total_wall_seconds']:.1f}s, **peak memory:** {performance['peak_rss_mb']:.0f} MB")
+            if performance.get("overlapped_stages"):
+                overlapped = ", ".join(STAGE_LABELS.get(s, s) for s in performance["overlapped_stages"])
+                st.caption(f"Another job ran at the same time as: {overlapped}. Memory and cache numbers of "
+                           "these stages are process-wide and include that job's work.")
+            stages = pd.DataFrame.from_dict(performance["stages"], orient="index")
+            st.dataframe(stages.drop(columns=["profile"], errors="ignore").rename(index=STAGE_LABELS))
+            st.bar_chart(stages["wall_seconds"].rename(index=STAGE_LABELS))
+            st.download_button("Download report (JSON)", json.dumps(performance, indent=2, default=str),
+                               file_name="pipeline_performance.json", mime="application/json")
+            for stage, record in performance["stages"].items():
+                if record.get("profile"):
+                    with st.expander(f"Profile: {STAGE_LABELS[stage]}"):
+                        st.text(record["profile"])
+
+        with tab7:
+            from src.segments import compare_segments, detect_segment_columns
+            st.header("Segment Comparison")
+            segment_columns = detect_segment_columns(result["df"])
+            if not segment_columns:
+                st.info("No segment columns (" + ", ".join(config.SEGMENT_COLUMNS) + ") found in this data.")
+            else:
+                segment_column = st.selectbox("Compare by", segment_columns)
+                st.caption(f"A model is fitted per segment with at least {config.SEGMENT_MIN_REVIEWS} reviews, "
+                           "on the topics and sentiment of the run above.")
+                comparison_id = (st.session_state.get("job_id"), segment_column)
+                if st.button("Compare Segments"):
+                    with st.spinner("Fitting segment models..."):
+                        st.session_state["segments"] = (
+                            comparison_id, compare_segments(result, segment_column, store=get_artifact_store()))
+                if st.session_state.get("segments", (None,))[0] == comparison_id:
+                    st.dataframe(st.session_state["segments"][1])
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: row-wise clean_text via Series.apply vs clean_text_series.
+
+Generates synthetic reviews (punctuation, digits, the occasional URL / HTML tag /
+bracketed edit note), checks that all paths produce identical output and
+reports reviews/sec.
+
+Usage:
+    python benchmarks/bench_clean_text.py [--rows 1000000] [--jobs 4]
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.preprocessing import clean_text_series
+
+WORDS = ("the app is great delivery was late rider rude refund pending order missing items fresh "
+         "love sleep meditation anxiety calm subscription expensive ui buggy support never replies").split()
+EXTRAS = ["10mins", "5star", "2nd", "!!", "??", "...", ",", "<b>really</b>", "[edited]",
+          "https://t.co/abc123", "www.shop.in", "\n"]
+
+
+def original_clean_text(text):
+    # Seven-pass per-row implementation that clean_text_series replaces
+    text = str(text).lower()
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'<.*?>+', '', text)
+    text = re.sub(r'[%s]' % re.escape(string.punctuation), '', text)
+    text = re.sub(r'\n', ' ', text)
+    text = re.sub(r'\w*\d\w*', '', text)
+    return text.strip()
+
+
+def make_reviews(n, seed=0):
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(n):
+        words = rng.choices(WORDS, k=rng.randint(2, 60))
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(EXTRAS))
+        reviews.append(" ".join(words).capitalize())
+    return pd.Series(reviews)
+
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.2f}s  {n / elapsed:12,.0f} reviews/sec")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--jobs", type=int, default=4)
+    args = parser.parse_args()
+
+    texts = make_reviews(args.rows)
+    baseline, t_base = timed("apply(original clean_text)", lambda: texts.apply(original_clean_text), len(texts))
+    single, t_single = timed("clean_text_series", lambda: clean_text_series(texts), len(texts))
+    multi, t_multi = timed(f"clean_text_series n_jobs={args.jobs}", lambda: clean_text_series(texts, n_jobs=args.jobs), len(texts))
+
+    assert single.tolist() == baseline.tolist()
+    assert multi.tolist() == baseline.tolist()
+    print(f"speedup: {t_base / t_single:.2f}x single process, {t_base / t_multi:.2f}x with {args.jobs} jobs")
+
+
+if __name__ == "__main__":
+    main()
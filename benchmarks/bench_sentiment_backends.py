@@ -0,0 +1,41 @@
+"""
+Parity and speed check of the sentiment inference backends against FP32 torch.
+
+For each backend, reports how often its 1-5 star label matches the FP32 model
+on a sample of reviews and how much faster it is. Run this before changing
+config.SENTIMENT_BACKEND.
+
+Usage:
+    python benchmarks/bench_sentiment_backends.py [--csv PATH] [--sample N] [--backends torch_int8 onnx]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import config
+from src.data_loading import load_data
+from src.preprocessing import preprocess_pipeline
+from src.sentiment_analysis import check_backend_parity
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=str(config.PROJECT_ROOT / "Fast Delivery Agent Reviews.csv"))
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--backends", nargs="+", default=["torch_int8", "onnx"])
+    args = parser.parse_args()
+
+    df, _ = load_data(args.csv)
+    df = preprocess_pipeline(df)
+    texts = df['clean_text'].tolist()
+
+    for backend in args.backends:
+        report = check_backend_parity(texts, backend, sample_size=args.sample)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: reviews/sec of SentimentAnalyzer before and after length-bucketed batching.
+
+"before" reproduces the original fixed-size path (input order, 32 reviews per
+batch, each padded to its longest review). "after" is the current
+SentimentAnalyzer._compute_logits. The embedding cache is disabled so both
+measure raw model throughput.
+
+Usage:
+    python benchmarks/bench_sentiment_batching.py [--csv PATH] [--limit N] [--threads N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import config
+from src.data_loading import load_data
+from src.preprocessing import preprocess_pipeline
+from src.sentiment_analysis import SentimentAnalyzer
+
+
+def fixed_batch_logits(analyzer, texts, batch_size=32):
+    tokenizer = analyzer.pipe.tokenizer
+    model = analyzer.pipe.model
+    outputs = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            encoded = tokenizer(texts[i:i+batch_size], truncation=True, max_length=config.SENTIMENT_MAX_LENGTH,
+                                padding=True, return_tensors="pt")
+            outputs.append(model(**encoded).logits.float().numpy())
+    return np.concatenate(outputs)
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    result = fn(texts)
+    elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=str(config.PROJECT_ROOT / "Fast Delivery Agent Reviews.csv"))
+    parser.add_argument("--limit", type=int, default=None, help="Only score the first N reviews")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    df, _ = load_data(args.csv)
+    df = preprocess_pipeline(df)
+    texts = df['clean_text'].tolist()[:args.limit]
+
+    analyzer = SentimentAnalyzer(use_cache=False, num_threads=args.threads)
+    # Warm up so lazy initialisation is not billed to either path
+    analyzer._compute_logits(texts[:8])
+
+    before, t_before = timed(lambda t: fixed_batch_logits(analyzer, t), texts)
+    after, t_after = timed(analyzer._compute_logits, texts)
+
+    agreement = float((before.argmax(axis=1) == after.argmax(axis=1)).mean())
+    print(f"reviews:            {len(texts)}")
+    print(f"threads:            {torch.get_num_threads()}")
+    print(f"before (fixed 32):  {len(texts) / t_before:8.1f} reviews/sec ({t_before:.1f}s)")
+    print(f"after (bucketed):   {len(texts) / t_after:8.1f} reviews/sec ({t_after:.1f}s)")
+    print(f"speedup:            {t_before / t_after:.2f}x")
+    print(f"label agreement:    {agreement:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: TopicModeler fit time and peak RSS versus corpus size.
+
+Compares the full fit against large-corpus mode (sampled UMAP/HDBSCAN fit with
+chunked assignment, optional PCA pre-reduction and low-memory UMAP). Uses
+synthetic clustered embeddings, so nothing is encoded; the sentence-transformer
+is still loaded once by TopicModeler and must be available locally. Each
+(size, mode) runs in a fresh subprocess so peak RSS is measured per run.
+
+Usage:
+    python benchmarks/bench_topic_scaling.py [--sizes 50000 200000 500000] [--sample-size 50000] [--pca 50]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+def synthetic_corpus(n, dim=384, n_clusters=40, seed=0):
+    from src.utils import generate_dummy_data
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    labels = rng.integers(0, n_clusters, size=n)
+    embeddings = (centers[labels] + rng.normal(scale=0.6, size=(n, dim))).astype(np.float32)
+    texts = generate_dummy_data("quick_commerce", n_samples=10)['review_text'].tolist()
+    docs = [f"{texts[l % len(texts)]} cluster{l}" for l in labels]
+    return docs, embeddings
+
+
+def run_single(n, mode, sample_size, pca):
+    from src.topic_modeling import TopicModeler
+    docs, embeddings = synthetic_corpus(n)
+    large = mode != "full"
+    modeler = TopicModeler(use_cache=False, large_corpus=large, sample_size=sample_size,
+                           pca_components=pca if mode == "sampled+pca" else None, low_memory=large)
+    start = time.perf_counter()
+    topics, probs = modeler.fit_transform(docs, embeddings=embeddings)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "n_docs": n, "mode": mode, "fit_seconds": round(elapsed, 2), "peak_rss_mb": round(peak_rss_mb, 1),
+        "n_topics": len(set(topics)) - (1 if -1 in topics else 0),
+        "probs_mb": round(probs.nbytes / 1024 ** 2, 1) if probs is not None else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000, 200_000, 500_000])
+    parser.add_argument("--modes", nargs="+", default=["full", "sampled", "sampled+pca"])
+    parser.add_argument("--sample-size", type=int, default=50_000)
+    parser.add_argument("--pca", type=int, default=50)
+    parser.add_argument("--single", nargs=2, metavar=("N", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(int(args.single[0]), args.single[1], args.sample_size, args.pca)
+        return
+
+    print(f"{'n_docs':>9} {'mode':<12} {'fit (s)':>9} {'peak RSS (MB)':>14} {'topics':>7}")
+    for n in args.sizes:
+        for mode in args.modes:
+            out = subprocess.run([sys.executable, __file__, "--single", str(n), mode,
+                                  "--sample-size", str(args.sample_size), "--pca", str(args.pca)],
+                                 capture_output=True, text=True)
+            if out.returncode != 0:
+                print(f"{n:>9} {mode:<12} failed: {out.stderr.strip().splitlines()[-1] if out.stderr else ''}")
+                continue
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{r['n_docs']:>9} {r['mode']:<12} {r['fit_seconds']:>9} {r['peak_rss_mb']:>14} {r['n_topics']:>7}")
+
+
+if __name__ == "__main__":
+    main()
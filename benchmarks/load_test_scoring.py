@@ -0,0 +1,89 @@
+"""
+Load test for the local scoring service (src/serving.py).
+
+Start the service first (it needs a scoring bundle from a pipeline run):
+
+    python -m src.serving --port 8765
+
+then send synthetic reviews from many concurrent keep-alive connections:
+
+    python benchmarks/load_test_scoring.py --requests 2000 --concurrency 64
+
+Reports client-side throughput and p50 / p99 latency, plus the service's own
+/stats (server-side latency and mean micro-batch size).
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import generate_synthetic_reviews
+
+
+async def request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(headers["content-length"]))
+    return int(status.split()[1]), json.loads(payload)
+
+
+async def client(host, port, texts, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for text in texts:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/score", {"text": text})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run(args):
+    texts = generate_synthetic_reviews(args.domain, args.requests, seed=args.seed)['review_text'].tolist()
+    latencies, errors = [], []
+    # Each connection sends its share of the requests back to back
+    shares = [texts[i::args.concurrency] for i in range(args.concurrency)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, share, latencies, errors) for share in shares if share))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, server_stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"Requests:    {len(latencies)} ({len(errors)} errors) over {args.concurrency} connections")
+    print(f"Throughput:  {len(latencies) / elapsed:,.1f} reviews/sec")
+    print(f"Client p50:  {np.percentile(latencies_ms, 50):.1f} ms")
+    print(f"Client p99:  {np.percentile(latencies_ms, 99):.1f} ms")
+    print(f"Server:      {json.dumps(server_stats)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--domain", default="quick_commerce", choices=["mha", "quick_commerce"])
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
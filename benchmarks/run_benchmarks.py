@@ -0,0 +1,142 @@
+"""
+End-to-end benchmark suite: times and memory-profiles every pipeline stage.
+
+Generates a seeded synthetic corpus (src.utils.generate_synthetic_reviews),
+writes it to CSV and runs load_data -> preprocess_pipeline -> TopicModeler ->
+SentimentAnalyzer -> create_features -> ModelTrainer -> SHAPExplainer using the
+offline stand-in models from benchmarks/standins.py. Caches are disabled so
+every run measures real work.
+
+Results are written as JSON and can be compared with a previous run:
+
+    python benchmarks/run_benchmarks.py --rows 10000 --output bench_output.json
+    python benchmarks/run_benchmarks.py --rows 10000 --baseline bench_output.json --tolerance 0.2
+
+With --baseline, stages slower than baseline * (1 + tolerance) are reported and
+the exit code is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent))
+
+
+def measure(inst, name, n_items, fn):
+    with inst.stage(name, items=n_items):
+        result = fn()
+    record = inst.stages[name]
+    print(f"{name:<18} {record['wall_seconds']:9.2f}s {record['items_per_sec'] or 0:>12,.0f} items/s "
+          f"{record['peak_rss_mb']:>9.1f} MB peak")
+    return result
+
+
+def run(args):
+    import numpy as np
+    from src import config
+    from src.data_loading import load_data
+    from src.preprocessing import preprocess_pipeline
+    from src.topic_modeling import TopicModeler
+    from src.sentiment_analysis import SentimentAnalyzer
+    from src.features import create_features
+    from src.models import ModelTrainer
+    from src.explainability import SHAPExplainer
+    from src.utils import generate_synthetic_reviews
+    from src.dedup import deduplicate
+    from src.instrumentation import Instrumentation
+    from standins import HashingSentenceModel, build_tiny_sentiment_model
+
+    inst = Instrumentation(profile=args.profile)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        corpus = generate_synthetic_reviews(args.domain, args.rows, seed=args.seed)
+        csv_path = tmp / "reviews.csv"
+        corpus.to_csv(csv_path, index=False)
+        model_dir = build_tiny_sentiment_model(tmp / "sentiment", " ".join(corpus['review_text'].head(5000)).lower().split())
+
+        df, domain = measure(inst, "load_data", args.rows, lambda: load_data(csv_path))
+        df = measure(inst, "preprocess", len(df), lambda: preprocess_pipeline(df, domain))
+        docs = df['clean_text'].tolist()
+        dedup = measure(inst, "dedup", len(docs), lambda: deduplicate(docs))
+        inst.stages["dedup"].update(dedup.summary())
+
+        topic_modeler = TopicModeler(use_cache=False, sentence_model=HashingSentenceModel())
+        topics, probs = measure(inst, "topic_modeling", len(docs), lambda: topic_modeler.fit_transform(docs))
+
+        analyzer = SentimentAnalyzer(model_dir, use_cache=False)
+        sentiment = measure(inst, "sentiment", len(docs), lambda: analyzer.predict(docs))
+
+        topic_probs = probs if probs is not None and np.ndim(probs) == 2 else None
+        X, y = measure(inst, "features", len(docs), lambda: create_features(df, topics, sentiment, topic_probs=topic_probs))
+
+        trainer = ModelTrainer()
+        measure(inst, "model_selection", len(docs), lambda: trainer.train_and_evaluate(X, y, n_jobs=args.jobs))
+
+        explainer = SHAPExplainer(trainer.best_model, X, use_cache=False)
+        measure(inst, "shap", len(explainer.X), explainer.calculate_shap)
+
+    return {
+        "meta": {
+            "rows": args.rows,
+            "seed": args.seed,
+            "domain": args.domain,
+            "jobs": args.jobs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "best_model": trainer.best_model_name,
+        },
+        **inst.report(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the stages whose wall time regressed by more than `tolerance` (0.2 = 20%).
+    """
+    regressions = []
+    print(f"\n{'stage':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        change = current["wall_seconds"] / base["wall_seconds"] - 1 if base["wall_seconds"] > 0 else 0.0
+        flag = " REGRESSION" if change > tolerance else ""
+        print(f"{name:<18} {base['wall_seconds']:>9.2f}s {current['wall_seconds']:>9.2f}s {change:>+7.0%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000, help="Synthetic reviews (10k - 1M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--domain", default="quick_commerce", choices=["mha", "quick_commerce"])
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for ModelTrainer")
+    parser.add_argument("--profile", default=None, choices=["cprofile", "pyinstrument"],
+                        help="Keep a per-stage profile in the results")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--baseline", default=None, help="Previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Small local stand-ins for the pretrained models, so benchmarks run offline.
+
+- HashingSentenceModel replaces the all-MiniLM-L6-v2 SentenceTransformer
+  (hashed bag of words, fixed random projection to 384 dims).
+- build_tiny_sentiment_model writes a randomly initialised 2-layer BERT with the
+  nlptown label set ("1 star" ... "5 stars") and a word-level vocabulary to a
+  local directory, so the real SentimentAnalyzer code path (tokenization,
+  batching, inference) is exercised without downloading anything.
+
+Predictions from these models are meaningless; they only have realistic shapes.
+"""
+from pathlib import Path
+
+import numpy as np
+from bertopic.backend import BaseEmbedder
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class HashingSentenceModel(BaseEmbedder):
+    def __init__(self, dim=384, n_features=2 ** 12, seed=0):
+        super().__init__()
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self.projection = np.random.default_rng(seed).normal(size=(n_features, dim)).astype(np.float32)
+
+    def encode(self, texts, show_progress_bar=False, convert_to_numpy=True, **kwargs):
+        embeddings = np.asarray(self.vectorizer.transform(texts) @ self.projection, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def embed(self, documents, verbose=False):
+        return self.encode(documents)
+
+
+def build_tiny_sentiment_model(path, vocab_words, seed=0) -> str:
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(vocab_words))
+    vocab_file = path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n")
+    BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True).save_pretrained(str(path))
+
+    id2label = {i: f"{i + 1} star" + ("s" if i else "") for i in range(5)}
+    config = BertConfig(
+        vocab_size=len(vocab), hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=128, max_position_embeddings=512, num_labels=5,
+        id2label=id2label, label2id={v: k for k, v in id2label.items()},
+    )
+    torch.manual_seed(seed)
+    BertForSequenceClassification(config).save_pretrained(str(path))
+    return str(path)
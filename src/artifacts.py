@@ -0,0 +1,108 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+import joblib
+
+from src import config
+
+LATEST_FILE = "LATEST"
+
+def publish_dir(root, name: str, write_fn: Callable[[Path], Any]) -> Path:
+    """
+    Writes `root/name` with write_fn(directory) and points `root/LATEST` at it.
+
+    The directory is written under a temporary name and renamed into place, and
+    is never modified afterwards, so concurrent runs publishing different names
+    cannot overwrite each other. If `name` is already published it is kept as is.
+    """
+    root = Path(root)
+    path = root / name
+    if not path.exists():
+        tmp_path = root / f".tmp-{name}-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        try:
+            write_fn(tmp_path)
+            try:
+                os.rename(tmp_path, path)
+            except OSError:
+                # Another run published the same name first
+                if not path.exists():
+                    raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    # Replacing a file is atomic, so readers see either the old or the new name
+    latest_tmp = root / f".{LATEST_FILE}.tmp{os.getpid()}-{threading.get_ident()}"
+    latest_tmp.write_text(name)
+    os.replace(latest_tmp, root / LATEST_FILE)
+    return path
+
+def resolve_latest(root) -> Path:
+    """
+    The directory `root/LATEST` points at, or `root` itself when there is no pointer.
+    """
+    root = Path(root)
+    latest = root / LATEST_FILE
+    return root / latest.read_text().strip() if latest.exists() else root
+
+
+class ArtifactStore:
+    """
+    On-disk store of pipeline stage outputs.
+
+    Each output is saved under `<root>/<stage>/<key>.joblib`, where the key is a
+    hash of everything the stage depends on (upstream keys, data, config). A
+    stage whose key is already present is skipped and its output loaded instead.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else config.ARTIFACTS_DIR
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(stage: str, *parts) -> str:
+        # joblib.hash handles numpy arrays and pandas objects efficiently
+        return joblib.hash((stage,) + parts)
+
+    def path(self, stage: str, key: str) -> Path:
+        return self.root / stage / f"{key}.joblib"
+
+    def has(self, stage: str, key: str) -> bool:
+        return self.path(stage, key).exists()
+
+    def load(self, stage: str, key: str) -> Any:
+        return joblib.load(self.path(stage, key))
+
+    def save(self, stage: str, key: str, value: Any) -> None:
+        path = self.path(stage, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so an interrupted run never leaves a truncated artifact
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+
+    def get_or_compute(self, stage: str, key: str, compute_fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns (value, was_cached).
+        """
+        if self.has(stage, key):
+            try:
+                value = self.load(stage, key)
+                self.hits += 1
+                return value, True
+            except Exception as e:
+                print(f"Could not load artifact {stage}/{key} ({e}), recomputing")
+        self.misses += 1
+        value = compute_fn()
+        self.save(stage, key, value)
+        return value, False
+
+    def delete(self, stage: str, key: str) -> None:
+        self.path(stage, key).unlink(missing_ok=True)
+
+    def clear(self, stage: str = None) -> None:
+        shutil.rmtree(self.root / stage if stage else self.root, ignore_errors=True)
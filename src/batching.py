@@ -0,0 +1,30 @@
+import numpy as np
+from typing import List, Sequence
+
+
+def plan_batches(lengths: Sequence[int], max_tokens: int, max_batch_size: int = 256) -> List[np.ndarray]:
+    """
+    Groups item indices into batches of similar length under a padded-token budget.
+
+    Items are sorted by length (longest first) so each batch pads only to the
+    length of its own longest item. A batch grows while
+    `batch_size * longest_length <= max_tokens` and `batch_size <= max_batch_size`;
+    an item longer than the budget still gets a batch of its own.
+
+    Returns a list of index arrays into the original order, which callers use to
+    scatter results back (e.g. `out[idx] = batch_result`).
+    """
+    lengths = np.asarray(lengths)
+    if len(lengths) == 0:
+        return []
+
+    # Stable sort so equal-length items keep their input order
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, min(max_batch_size, max_tokens // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
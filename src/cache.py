@@ -0,0 +1,199 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from src import config
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache for per-text model outputs.
+
+    Each entry is keyed by a hash of (model name, kind, cleaned text), so the same
+    review is only encoded once per model no matter how often the pipeline is re-run.
+    `kind` separates different outputs of the same text, e.g. "embedding" for the
+    sentence embeddings used by BERTopic and "logits" for the sentiment model.
+
+    Entries live in a single SQLite file. When the stored payload grows beyond
+    `max_bytes`, the least recently used entries are evicted. The connection is
+    shared by all threads (e.g. concurrent pipeline jobs) and guarded by a lock.
+    """
+
+    # Keep well below SQLITE_MAX_VARIABLE_NUMBER for IN (...) queries
+    _QUERY_CHUNK = 500
+
+    def __init__(self, path=None, max_bytes: Optional[int] = None):
+        self.path = Path(path) if path is not None else config.EMBEDDING_CACHE_PATH
+        self.max_bytes = config.EMBEDDING_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Reentrant: put_many evicts while holding it
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                shape TEXT NOT NULL,
+                data BLOB NOT NULL,
+                nbytes INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model_name: str, kind: str) -> str:
+        h = hashlib.sha256()
+        h.update(model_name.encode("utf-8"))
+        h.update(b"\x1f")
+        h.update(kind.encode("utf-8"))
+        h.update(b"\x1f")
+        h.update(str(text).encode("utf-8"))
+        return h.hexdigest()
+
+    def get_many(self, texts: List[str], model_name: str, kind: str) -> List[Optional[np.ndarray]]:
+        """
+        Looks up cached arrays for each text. Missing entries are returned as None.
+        """
+        keys = [self.make_key(t, model_name, kind) for t in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), self._QUERY_CHUNK):
+                chunk = list(set(keys[i:i + self._QUERY_CHUNK]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, dtype, shape, data FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, dtype, shape, data in rows:
+                    shape = tuple(int(s) for s in shape.split(",") if s)
+                    found[key] = np.frombuffer(data, dtype=dtype).reshape(shape)
+
+            # Refresh recency of everything we served
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+
+            results = [found.get(k) for k in keys]
+            hits = sum(1 for r in results if r is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: List[str], model_name: str, kind: str, values) -> None:
+        """
+        Stores one array per text (values[i] belongs to texts[i]).
+        """
+        now = time.time()
+        rows = []
+        for text, value in zip(texts, values):
+            arr = np.ascontiguousarray(value)
+            rows.append((
+                self.make_key(text, model_name, kind),
+                arr.dtype.str,
+                ",".join(str(s) for s in arr.shape),
+                arr.tobytes(),
+                arr.nbytes,
+                now,
+            ))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            self._evict()
+
+    def get_or_compute(self, texts: List[str], model_name: str, kind: str,
+                       compute_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns a stacked array of outputs for `texts`, calling `compute_fn` only
+        for texts that are not cached yet (each distinct text is computed once).
+        """
+        texts = [str(t) for t in texts]
+        cached = self.get_many(texts, model_name, kind)
+
+        missing = list(dict.fromkeys(t for t, c in zip(texts, cached) if c is None))
+        if missing:
+            computed = np.asarray(compute_fn(missing))
+            self.put_many(missing, model_name, kind, computed)
+            lookup = dict(zip(missing, computed))
+            cached = [c if c is not None else lookup[t] for t, c in zip(texts, cached)]
+
+        if not cached:
+            return np.empty((0,), dtype=np.float32)
+        return np.stack(cached)
+
+    def _evict(self) -> None:
+        # Called with the lock held
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        to_delete = []
+        freed = 0
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM entries ORDER BY last_access ASC"):
+            to_delete.append((key,))
+            freed += nbytes
+            if freed >= excess:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+        self._conn.commit()
+        self.evictions += len(to_delete)
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> EmbeddingCache:
+    """
+    Process-wide cache instance, so TopicModeler and SentimentAnalyzer share one
+    connection and one set of hit/miss counters.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
@@ -0,0 +1,143 @@
+"""
+Headless batch runner over the same stages as the Streamlit app.
+
+    python -m src.cli reviews.parquet --output-dir data/output/nightly
+
+Every stage output is checkpointed in the artifact store (and sentiment
+scores every SENTIMENT_CHECKPOINT_ROWS reviews), so re-running the same
+command after a crash or kill resumes where the previous run stopped.
+"""
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.artifacts import ArtifactStore
+from src.data_loading import load_data
+from src.features import is_sparse_frame
+from src.instrumentation import Instrumentation
+from src.pipeline import run_pipeline
+from src.result_store import ResultStore
+
+def write_outputs(result: dict, output_dir: Path) -> list:
+    """
+    Writes the results of run_pipeline to output_dir and returns the written paths.
+    """
+    output_dir = Path(output_dir)
+    config.ensure_dirs(output_dir)
+    written = []
+
+    # Per-review text, rating, topic and sentiment (plus the probability matrix) as stored by the pipeline
+    results = result["result_store"]
+    for name in (ResultStore.REVIEWS_FILE, ResultStore.PROBS_FILE):
+        if (results.path / name).exists():
+            shutil.copyfile(results.path / name, output_dir / name)
+            written.append(output_dir / name)
+
+    result["topic_info"].to_csv(output_dir / "topic_info.csv", index=False)
+    written.append(output_dir / "topic_info.csv")
+
+    X, y = result["X"], result["y"]
+    if is_sparse_frame(X):
+        import scipy.sparse as sp
+        sp.save_npz(output_dir / "features.npz", X.sparse.to_coo().tocsr())
+        pd.DataFrame({"rating": y}).to_parquet(output_dir / "target.parquet", index=False)
+        written += [output_dir / "features.npz", output_dir / "target.parquet"]
+    else:
+        X.assign(rating=np.asarray(y)).to_parquet(output_dir / "features.parquet", index=False)
+        written.append(output_dir / "features.parquet")
+
+    with open(output_dir / "metrics.json", "w") as f:
+        json.dump({"best_model": result["best_model_name"], "results": result["results"]}, f, indent=2, default=float)
+    written.append(output_dir / "metrics.json")
+
+    explainer = result["explainer"]
+    np.savez(
+        output_dir / "shap_values.npz",
+        shap_values=explainer.shap_values,
+        expected_value=explainer.expected_value,
+        row_index=explainer.sample_index[:len(explainer.shap_values)],
+        feature_names=np.array(explainer.X.columns, dtype=str),
+    )
+    written.append(output_dir / "shap_values.npz")
+
+    with open(output_dir / "performance.json", "w") as f:
+        json.dump(result["performance"], f, indent=2, default=str)
+    written.append(output_dir / "performance.json")
+    return written
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV / Parquet / Arrow file with review text and rating columns")
+    parser.add_argument("--output-dir", default=None, help="Default: data/output/<input name>")
+    parser.add_argument("--checkpoint-dir", default=None, help="Artifact store root, default: models/artifacts")
+    parser.add_argument("--domain", default=None, choices=list(config.DOMAINS), help="Override domain detection")
+    parser.add_argument("--sentiment-workers", type=int, default=None, help="Worker processes for sentiment scoring")
+    parser.add_argument("--profile", default=None, choices=["cprofile", "pyinstrument"], help="Keep a per-stage profile")
+    parser.add_argument("--restart", action="store_true",
+                        help="Recompute every stage for this input, replacing its checkpoints "
+                             "(checkpoints of other inputs are kept)")
+    parser.add_argument("--segment-by", default=None,
+                        help="Also fit and compare a model per value of this column (e.g. 'agent name')")
+    args = parser.parse_args(argv)
+
+    input_path = Path(args.input)
+    output_dir = Path(args.output_dir) if args.output_dir else config.OUTPUT_DIR / input_path.stem
+    store = ArtifactStore(args.checkpoint_dir)
+
+    segment_column = args.segment_by.lower().strip() if args.segment_by else None
+    df, domain = load_data(input_path, extra_columns=[segment_column] if segment_column else [])
+    domain = args.domain or domain
+    if df.empty:
+        print(f"No reviews with text and rating found in {input_path}")
+        return 1
+    if segment_column and segment_column not in df:
+        print(f"Column '{args.segment_by}' not found in {input_path}")
+        return 1
+    print(f"Loaded {len(df)} reviews from {input_path} (domain: {domain})")
+
+    sentiment_analyzer = None
+    if args.sentiment_workers:
+        from src.sentiment_analysis import SentimentAnalyzer
+        sentiment_analyzer = SentimentAnalyzer(config.SENTIMENT_MODEL, num_workers=args.sentiment_workers)
+
+    start = time.perf_counter()
+
+    def on_stage(stage, cached):
+        status = "resumed from checkpoint" if cached else "done"
+        print(f"[{time.perf_counter() - start:8.1f}s] {stage}: {status}", flush=True)
+
+    def on_sentiment(done, total):
+        print(f"\rsentiment: {done}/{total} reviews", end="" if done < total else "\n", flush=True)
+
+    result = run_pipeline(
+        df, domain,
+        store=store,
+        sentiment_analyzer=sentiment_analyzer,
+        on_stage=on_stage,
+        sentiment_progress=on_sentiment,
+        instrumentation=Instrumentation(profile=args.profile),
+        recompute=args.restart,
+    )
+
+    written = write_outputs(result, output_dir)
+    if segment_column:
+        from src.segments import compare_segments
+        segments = compare_segments(result, segment_column, store=store)
+        segments.to_csv(output_dir / "segments.csv")
+        written.append(output_dir / "segments.csv")
+        on_stage("segments", False)
+
+    for path in written:
+        print(f"Wrote {path}")
+    print(f"Best model: {result['best_model_name']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,14 +6,158 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 MODELS_DIR = PROJECT_ROOT / "models"
 
-# Ensure dirs exist
-DATA_DIR.mkdir(exist_ok=True)
-MODELS_DIR.mkdir(exist_ok=True)
+# Directories are not created at import time; code that writes under them
+# creates what it needs (see ensure_dirs).
+def ensure_dirs(*paths):
+    """
+    Creates the given directories (default: DATA_DIR and MODELS_DIR) if missing.
+    """
+    for path in paths or (DATA_DIR, MODELS_DIR):
+        Path(path).mkdir(parents=True, exist_ok=True)
 
 # Model Configs
 BERTOPIC_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 SENTIMENT_MODEL = "nlptown/bert-base-multilingual-uncased-sentiment"
 
+# Sentiment inference batching
+SENTIMENT_MAX_LENGTH = 512
+SENTIMENT_MAX_TOKENS_PER_BATCH = 8192  # padded tokens per forward pass
+SENTIMENT_MAX_BATCH_SIZE = 256
+SENTIMENT_SORT_WINDOW = 8192  # reviews tokenized and length-sorted together
+SENTIMENT_NUM_THREADS = None  # torch intra-op threads, None keeps the torch default
+
+# Sentiment inference backend: "torch" (FP32), "torch_int8" (dynamic int8 quantization)
+# or "onnx" (exported once to ONNX_DIR and run with onnxruntime). Check label agreement
+# with sentiment_analysis.check_backend_parity before switching.
+SENTIMENT_BACKEND = "torch"
+ONNX_DIR = MODELS_DIR / "onnx"
+ONNX_OPSET = 14
+
+# Multi-process sentiment scoring (1 = single-process)
+SENTIMENT_NUM_WORKERS = 1
+SENTIMENT_SHARD_SIZE = 1024  # reviews per work item sent to a worker
+SENTIMENT_MP_START_METHOD = None  # None = "fork" from the main thread where available (shares weights copy-on-write), else "spawn"
+
+# Model selection (ModelTrainer)
+MODEL_SELECTION_CV_FOLDS = 5
+MODEL_SELECTION_N_JOBS = None  # worker processes for model x fold jobs, None = all cores, 1 = in-process
+MODEL_SELECTION_EARLY_STOPPING = True  # drop a model once its partial RMSE cannot beat the best
+
+# Versioned fitted models (src/model_registry.py)
+MODEL_REGISTRY_DIR = MODELS_DIR / "registry"
+MODEL_REGISTRY_NAME = "satisfaction"
+
+# Out-of-core training (OutOfCoreTrainer in src/models.py, python -m src.retrain)
+OOC_CHUNK_ROWS = 100_000  # feature rows materialized at a time
+OOC_VALIDATION_EVERY = 5  # every 5th review is held out for metrics
+OOC_DATASET_DIR = MODELS_DIR / "ooc_datasets"  # binned LightGBM Datasets, reused on retraining
+OOC_LGB_PARAMS = {"objective": "regression", "learning_rate": 0.1, "num_leaves": 31, "max_bin": 63, "verbose": -1}
+OOC_LGB_ROUNDS = 500
+OOC_EARLY_STOPPING_ROUNDS = 20
+OOC_SGD_EPOCHS = 3
+OOC_SGD_ALPHA = 1e-4
+
+# SHAP explainability budget
+SHAP_MAX_SAMPLES = 2000  # rows explained for global plots (stratified by dominant topic)
+SHAP_BACKGROUND_SIZE = 50  # background rows: sampled rows (Tree / Linear) or weighted k-means centroids (Kernel)
+SHAP_TIME_BUDGET = None  # seconds; stop after the chunk that crosses it, None = no limit
+SHAP_CHUNK_SIZE = 200  # rows per explanation chunk
+SHAP_N_JOBS = None  # parallel chunks, None = all cores
+SHAP_TREE_PERTURBATION = "interventional"  # TreeSHAP against the sampled background, CPU only
+SHAP_CACHE_DIR = MODELS_DIR / "shap_cache"
+
+# Topic model settings (TopicModeler); rank alternatives with src/topic_sweep.py
+TOPIC_N_NEIGHBORS = 15  # UMAP
+TOPIC_N_COMPONENTS = 5  # UMAP
+TOPIC_MIN_CLUSTER_SIZE = 80  # HDBSCAN, also BERTopic's min_topic_size
+TOPIC_MIN_SAMPLES = None  # HDBSCAN, None = min_cluster_size
+TOPIC_NGRAM_RANGE = (1, 3)  # CountVectorizer for topic representations
+
+# Hyperparameter sweep (src/topic_sweep.py): every combination of these values is scored
+TOPIC_SWEEP_GRID = {
+    "n_neighbors": [10, 15, 30],
+    "n_components": [5, 10],
+    "min_cluster_size": [20, 40, 80, 150],
+    "min_samples": [None],
+    "ngram_range": [(1, 1), (1, 2), (1, 3)],
+}
+TOPIC_SWEEP_SAMPLE_SIZE = 50_000  # reviews the sweep fits on, None = all
+TOPIC_SWEEP_N_JOBS = None  # HDBSCAN fits at once, None = all cores
+TOPIC_SWEEP_CV_FOLDS = 3  # folds of the Ridge model behind the downstream RMSE
+TOPIC_SWEEP_TOP_WORDS = 10  # words per topic for coherence / diversity
+TOPIC_SWEEP_RANK_BY = ["rmse", "coherence"]  # sort order of the results
+
+# Plots rendered from bounded summaries (src/visualization.py), whatever the row count
+VIZ_MAX_FEATURES = 20  # features in SHAP plots, most important first
+VIZ_VALUE_BINS = 20  # feature value bins of the SHAP density plots
+VIZ_SHAP_BINS = 40  # SHAP value bins (density plots and beeswarm thinning)
+VIZ_BEESWARM_POINTS_PER_BIN = 10  # beeswarm points kept per feature and SHAP bin
+VIZ_DENSITY_PANELS = 8  # features shown as SHAP density heatmaps
+VIZ_MAX_TOPICS = 100  # largest topics shown in the topic map
+VIZ_FIGURE_WIDTH = 8  # inches
+VIZ_MAX_FIGURE_HEIGHT = 10  # inches
+VIZ_DPI = 100
+VIZ_TOPIC_MAP_HEIGHT = 600  # pixels
+FIGURE_CACHE_DIR = MODELS_DIR / "figures"
+
+# Persisted topic model for transform-only scoring of new reviews
+TOPIC_MODEL_DIR = MODELS_DIR / "topic_model"
+TOPIC_TRANSFORM_CHUNK_SIZE = 10_000  # reviews per transform call, bounds the probability matrix in flight
+TOPIC_MERGE_MIN_SIMILARITY = 0.7  # new clusters less similar than this to every existing topic are added
+
+# Large-corpus topic modeling: fit UMAP/HDBSCAN on a stratified sample, assign the rest in chunks
+TOPIC_LARGE_CORPUS_THRESHOLD = 200_000  # corpora larger than this use large-corpus mode by default
+TOPIC_FIT_SAMPLE_SIZE = 100_000
+TOPIC_SAMPLE_STRATA = 50  # k-means cells of the embedding space used to stratify the sample
+TOPIC_PCA_COMPONENTS = None  # e.g. 50 to PCA-reduce embeddings before UMAP
+TOPIC_LOW_MEMORY = False  # UMAP low_memory nearest-neighbour search
+
+# Stage-level pipeline artifacts (see src/artifacts.py)
+ARTIFACTS_DIR = MODELS_DIR / "artifacts"
+SENTIMENT_CHECKPOINT_ROWS = 50_000  # sentiment scores are checkpointed every this many reviews
+
+# Deduplication before embedding / sentiment (src/dedup.py)
+DEDUP_ENABLED = True  # exact duplicates of the cleaned text are processed once
+DEDUP_NEAR_DUPLICATES = False  # also collapse near-duplicates (MinHash / LSH)
+DEDUP_NEAR_THRESHOLD = 0.9  # estimated Jaccard similarity of character shingles
+DEDUP_NUM_PERM = 64  # MinHash permutations
+DEDUP_LSH_BANDS = 16  # LSH bands (num_perm / bands rows each)
+DEDUP_SHINGLE_SIZE = 5  # characters per shingle
+
+# Per-review results in columnar form (src/result_store.py), stored under the artifact root
+RESULTS_PROB_DTYPE = "float32"  # topic probability matrix on disk, "float16" halves it again
+RESULTS_ROW_GROUP_SIZE = 100_000  # Parquet row group / streaming batch size
+
+# Background pipeline jobs in the app (src/jobs.py)
+JOB_MAX_WORKERS = 2  # pipelines running at once; further submissions queue
+JOB_HISTORY = 20  # finished jobs kept in memory for the UI
+JOB_RESULTS_KEPT = 2  # newest finished jobs whose full results (frame, features, models) stay in memory
+
+# Per-segment comparison (src/segments.py): one global embedding / sentiment pass, per-segment models
+SEGMENT_COLUMNS = ["app_name", "agent name", "location", "order type"]  # normalized names loaded by the app
+SEGMENT_MIN_REVIEWS = 200  # smaller segments are skipped
+SEGMENT_MAX_VALUES = 50  # columns with more distinct values are not offered as segments
+SEGMENT_N_JOBS = None  # segments fitted at once, None = all cores
+SEGMENT_SHAP_MAX_SAMPLES = 500  # rows explained per segment
+SEGMENT_TOP_DETERMINANTS = 3
+
+# Local scoring service (python -m src.serving), loads the bundle written by the last pipeline run
+SCORING_DIR = MODELS_DIR / "scoring"
+SCORING_HOST = "127.0.0.1"
+SCORING_PORT = 8765
+SCORING_MAX_BATCH = 64  # reviews scored together at most
+SCORING_MAX_WAIT_MS = 10  # how long the first review of a batch waits for others
+SCORING_LATENCY_WINDOW = 10_000  # recent requests used for p50 / p99
+
+# Headless batch runner (python -m src.cli)
+OUTPUT_DIR = DATA_DIR / "output"
+
+# Embedding / logits cache (shared by TopicModeler and SentimentAnalyzer)
+CACHE_DIR = MODELS_DIR / "cache"
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = CACHE_DIR / "embeddings.sqlite"
+EMBEDDING_CACHE_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB, least recently used entries are evicted first
+
 # Domain Configs
 DOMAINS = {
     "mha": "Mental Health Apps",
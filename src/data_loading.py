@@ -1,6 +1,13 @@
+import itertools
 import pandas as pd
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Iterator, List, Optional, Tuple
+
+# Rows per chunk when streaming large exports
+DEFAULT_CHUNKSIZE = 100_000
+
+PARQUET_SUFFIXES = {'.parquet', '.pq'}
+ARROW_SUFFIXES = {'.arrow', '.feather', '.ipc'}
 
 def detect_domain(df: pd.DataFrame) -> str:
     """
@@ -8,13 +15,13 @@ def detect_domain(df: pd.DataFrame) -> str:
     """
     # Simple heuristic: check for keywords in a sample of text
     text_sample = " ".join(df['review_text'].astype(str).head(100).tolist()).lower()
-    
+
     mha_keywords = ['meditation', 'anxiety', 'therapy', 'mood', 'sleep', 'calm', 'mental']
     qc_keywords = ['delivery', 'rider', 'grocery', 'order', 'refund', 'late', 'item', 'fresh']
-    
+
     mha_score = sum(1 for k in mha_keywords if k in text_sample)
     qc_score = sum(1 for k in qc_keywords if k in text_sample)
-    
+
     if mha_score > qc_score:
         return "mha"
     elif qc_score > mha_score:
@@ -22,41 +29,144 @@ def detect_domain(df: pd.DataFrame) -> str:
     else:
         return "unknown"
 
-def load_data(file_path: str) -> Tuple[pd.DataFrame, str]:
+def detect_columns(columns: List[str]) -> Tuple[str, str]:
     """
-    Loads CSV and detects domain.
+    Picks the review text and rating columns from a list of (normalized) column names.
     """
-    try:
-        df = pd.read_csv(file_path)
-    except Exception as e:
-        raise ValueError(f"Error loading file: {e}")
-    
-    # Normalize columns to lowercase for checking
-    df.columns = [c.lower().strip() for c in df.columns]
-    
     # Smart column detection
     text_candidates = ['review_text', 'review', 'text', 'body', 'comment', 'content', 'feedback']
     rating_candidates = ['rating', 'score', 'star', 'stars', 'label', 'grade']
-    
-    text_col = next((c for c in text_candidates if c in df.columns), None)
-    rating_col = next((c for c in rating_candidates if c in df.columns), None)
-    
+
+    text_col = next((c for c in text_candidates if c in columns), None)
+    rating_col = next((c for c in rating_candidates if c in columns), None)
+
     # If exact match not found, try partial match
     if not text_col:
-        text_col = next((c for c in df.columns if any(x in c for x in ['review', 'text', 'body'])), None)
+        text_col = next((c for c in columns if any(x in c for x in ['review', 'text', 'body'])), None)
     if not rating_col:
-        rating_col = next((c for c in df.columns if any(x in c for x in ['rating', 'score', 'star'])), None)
-        
+        rating_col = next((c for c in columns if any(x in c for x in ['rating', 'score', 'star'])), None)
+
     if not text_col or not rating_col:
-        raise ValueError(f"Could not automatically detect 'review' and 'rating' columns. Found: {list(df.columns)}. Please rename columns to 'review_text' and 'rating'.")
-        
-    # Rename to standard names
-    df = df.rename(columns={text_col: 'review_text', rating_col: 'rating'})
-    
-    # Ensure numeric rating
-    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
-    df = df.dropna(subset=['review_text', 'rating'])
-    
-    domain = detect_domain(df)
-    
+        raise ValueError(f"Could not automatically detect 'review' and 'rating' columns. Found: {list(columns)}. Please rename columns to 'review_text' and 'rating'.")
+
+    return text_col, rating_col
+
+def _file_format(file_path) -> str:
+    # Accepts paths as well as file-like objects (e.g. Streamlit uploads) that carry a name
+    name = str(getattr(file_path, 'name', file_path))
+    suffix = Path(name).suffix.lower()
+    if suffix in PARQUET_SUFFIXES:
+        return "parquet"
+    if suffix in ARROW_SUFFIXES:
+        return "arrow"
+    return "csv"
+
+def _rewind(file_path):
+    if hasattr(file_path, 'seek'):
+        file_path.seek(0)
+
+def read_header(file_path) -> List[str]:
+    """
+    Returns the raw column names without reading any rows.
+    """
+    fmt = _file_format(file_path)
+    _rewind(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        names = pq.ParquetFile(file_path).schema_arrow.names
+    elif fmt == "arrow":
+        names = _open_arrow(file_path).schema.names
+    else:
+        names = list(pd.read_csv(file_path, nrows=0).columns)
+    _rewind(file_path)
+    return names
+
+def _open_arrow(file_path):
+    import pyarrow as pa
+    try:
+        return pa.ipc.open_file(file_path)
+    except pa.ArrowInvalid:
+        # Not the random-access file format, try the streaming format
+        _rewind(file_path)
+        return pa.ipc.open_stream(file_path)
+
+def _iter_raw_chunks(file_path, usecols: List[str], text_col: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    fmt = _file_format(file_path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=usecols):
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        reader = _open_arrow(file_path)
+        if hasattr(reader, 'num_record_batches'):
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = iter(reader)
+        for batch in batches:
+            yield batch.select(usecols).to_pandas()
+    else:
+        # Only the needed columns are parsed; the review text gets an explicit string dtype
+        yield from pd.read_csv(file_path, usecols=usecols, dtype={text_col: "string"}, chunksize=chunksize)
+
+def iter_data(file_path, chunksize: int = DEFAULT_CHUNKSIZE, extra_columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Streams a CSV / Parquet / Arrow file as normalized DataFrame chunks.
+
+    Columns are detected from the header alone. With `extra_columns=None` every
+    column is read (as lowercase names, like the original loader); otherwise only
+    the text and rating columns plus `extra_columns` (given by normalized name),
+    so `extra_columns=[]` reads just text and rating. Each chunk has
+    'review_text' and a float64 'rating', with rows missing either dropped, so
+    peak memory is bounded by `chunksize`.
+    """
+    raw_columns = read_header(file_path)
+    # Normalize columns to lowercase for checking
+    normalized = {c.lower().strip(): c for c in raw_columns}
+    text_col, rating_col = detect_columns(list(normalized))
+
+    if extra_columns is None:
+        extra_columns = list(normalized)
+    extra_columns = [c for c in extra_columns if c in normalized and c not in (text_col, rating_col)]
+    usecols = [normalized[c] for c in [text_col, rating_col] + extra_columns]
+    rename = {normalized[text_col]: 'review_text', normalized[rating_col]: 'rating'}
+    rename.update({normalized[c]: c for c in extra_columns})
+
+    try:
+        for chunk in _iter_raw_chunks(file_path, usecols, normalized[text_col], chunksize):
+            chunk = chunk.rename(columns=rename)
+            # Ensure numeric rating; kept float64, since float32 would change targets like 2.1
+            chunk['rating'] = pd.to_numeric(chunk['rating'], errors='coerce').astype('float64')
+            chunk = chunk.dropna(subset=['review_text', 'rating'])
+            if len(chunk):
+                yield chunk
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error loading file: {e}")
+
+def load_data_stream(file_path, chunksize: int = DEFAULT_CHUNKSIZE, extra_columns: Optional[List[str]] = None) -> Tuple[Iterator[pd.DataFrame], str]:
+    """
+    Returns (chunk generator, domain). The domain is detected on the first chunk,
+    which is then yielded again as the first item of the generator.
+    """
+    chunks = iter_data(file_path, chunksize, extra_columns)
+    first = next(chunks, None)
+    if first is None:
+        return iter([]), "unknown"
+    domain = detect_domain(first)
+    return itertools.chain([first], chunks), domain
+
+def load_data(file_path, chunksize: int = DEFAULT_CHUNKSIZE, extra_columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, str]:
+    """
+    Loads CSV (or Parquet / Arrow) and detects domain.
+
+    The file is read in chunks. Pass `extra_columns` (e.g. [] for text and rating
+    only) to skip the other columns, so a wide export is never materialized with
+    all of them.
+    """
+    chunks, domain = load_data_stream(file_path, chunksize, extra_columns)
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame({'review_text': pd.Series(dtype="string"), 'rating': pd.Series(dtype="float64")}), domain
+    df = pd.concat(frames, ignore_index=True)
     return df, domain
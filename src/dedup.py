@@ -0,0 +1,164 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src import config
+
+# Shingles are hashed as base-257 polynomials of their bytes, reduced mod this prime
+_PRIME = (1 << 31) - 1
+
+class DedupResult:
+    """
+    Maps every review to a group of identical (or near-identical) reviews.
+
+    - inverse[row]: group of each row
+    - unique_index[group]: row of the group's representative (its first occurrence)
+    - counts[group]: multiplicity, usable as a sample weight
+
+    Models run on `unique(texts)` and their outputs are expanded back to all
+    rows with `broadcast`.
+    """
+
+    def __init__(self, inverse: np.ndarray, unique_index: np.ndarray):
+        self.inverse = inverse
+        self.unique_index = unique_index
+        self.counts = np.bincount(inverse, minlength=len(unique_index))
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.inverse)
+
+    @property
+    def n_unique(self) -> int:
+        return len(self.unique_index)
+
+    @property
+    def reduction_ratio(self) -> float:
+        """
+        Share of rows that did not need to be processed (0 = no duplicates).
+        """
+        return 1 - self.n_unique / self.n_rows if self.n_rows else 0.0
+
+    def unique(self, values) -> list:
+        return [values[i] for i in self.unique_index]
+
+    def broadcast(self, values) -> np.ndarray:
+        """
+        Expands per-group values (first axis) back to one entry per row.
+        """
+        return np.asarray(values)[self.inverse]
+
+    def summary(self) -> dict:
+        return {"rows": self.n_rows, "unique": self.n_unique, "reduction_ratio": self.reduction_ratio}
+
+def _shingle_hashes(texts: List[str], size: int):
+    """
+    Hashes of all byte shingles of `texts`, concatenated, and the offset of each
+    text's first shingle. Texts shorter than `size` are padded to one shingle.
+    """
+    encoded = [t.encode().ljust(size, b"\0") for t in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    n_shingles = lengths - size + 1
+    offsets = np.concatenate([[0], np.cumsum(n_shingles)[:-1]])
+    # Start position of every shingle in the joined buffer (none cross a text boundary)
+    text_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    starts = np.arange(n_shingles.sum()) + np.repeat(text_starts - offsets, n_shingles)
+    hashes = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(size):
+        hashes = (hashes * np.uint64(257) + buffer[starts + k]) % np.uint64(_PRIME)
+    return hashes, offsets
+
+def minhash_signatures(texts: List[str], num_perm: int = None, shingle_size: int = None, seed: int = 0,
+                       block_shingles: int = 1_000_000) -> np.ndarray:
+    """
+    (n_texts, num_perm) MinHash signatures of byte shingles.
+
+    Permutations are a * x + b with odd a, wrapping at 32 bits (a bijection of
+    the 32-bit hash space); each text's minimum is taken with np.minimum.reduceat,
+    one permutation at a time. Texts are processed in blocks of about
+    `block_shingles` shingles (bytes), so memory does not depend on review length.
+    """
+    num_perm = num_perm or config.DEDUP_NUM_PERM
+    shingle_size = shingle_size or config.DEDUP_SHINGLE_SIZE
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 32, size=num_perm, dtype=np.uint32) | np.uint32(1)
+    b = rng.integers(0, 2 ** 32, size=num_perm, dtype=np.uint32)
+
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    # Block boundaries by cumulative length (at least one text per block)
+    lengths = np.fromiter((max(len(t), shingle_size) for t in texts), dtype=np.int64, count=len(texts))
+    block_ids = np.cumsum(lengths) // block_shingles
+    bounds = np.flatnonzero(np.diff(block_ids)) + 1
+    for start, stop in zip(np.concatenate([[0], bounds]), np.concatenate([bounds, [len(texts)]])):
+        if start == stop:
+            continue
+        hashes, offsets = _shingle_hashes(texts[start:stop], shingle_size)
+        hashes = hashes.astype(np.uint32)
+        for i in range(num_perm):
+            signatures[start:stop, i] = np.minimum.reduceat(a[i] * hashes + b[i], offsets)
+    return signatures
+
+def near_duplicate_labels(texts: List[str], threshold: float = None, num_perm: int = None, bands: int = None,
+                          shingle_size: int = None) -> np.ndarray:
+    """
+    Groups texts whose estimated Jaccard similarity is at least `threshold`.
+
+    LSH over `bands` bands of the MinHash signature proposes candidates (texts
+    sharing a band bucket); each candidate is merged with the first text of its
+    bucket when their signatures agree on at least `threshold` of positions.
+    Returns, per text, the index of its group's first text.
+    """
+    threshold = threshold or config.DEDUP_NEAR_THRESHOLD
+    bands = bands or config.DEDUP_LSH_BANDS
+    signatures = minhash_signatures(texts, num_perm, shingle_size)
+    rows_per_band = signatures.shape[1] // bands
+
+    parent = np.arange(len(texts))
+    # Random odd multipliers combine a band's rows into one 64-bit bucket id
+    mix = np.random.default_rng(1).integers(1, 2 ** 63, size=rows_per_band, dtype=np.uint64) | np.uint64(1)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        band_sig = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        buckets = (band_sig * mix).sum(axis=1)
+        order = np.argsort(buckets, kind="stable")
+        boundaries = np.flatnonzero(np.diff(buckets[order])) + 1
+        group_starts = np.concatenate([[0], boundaries])
+        group_sizes = np.diff(np.concatenate([group_starts, [len(order)]]))
+        # Only buckets with more than one text hold candidates
+        for group_start, size in zip(group_starts[group_sizes > 1], group_sizes[group_sizes > 1]):
+            members = order[group_start:group_start + size]
+            head = members[0]
+            similarity = (signatures[members[1:]] == signatures[head]).mean(axis=1)
+            for other in members[1:][similarity >= threshold]:
+                root_a, root_b = find(head), find(other)
+                if root_a != root_b:
+                    # The earlier text stays the representative
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    return np.array([find(i) for i in range(len(texts))])
+
+def deduplicate(texts: List[str], near_duplicates: bool = None, threshold: float = None) -> DedupResult:
+    """
+    Collapses exact duplicates (by hash of the cleaned text) and, optionally,
+    near-duplicates found with MinHash / LSH among the remaining unique texts.
+    """
+    near_duplicates = config.DEDUP_NEAR_DUPLICATES if near_duplicates is None else near_duplicates
+    # Codes are assigned in order of first appearance
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object), sort=False)
+    first_index = np.unique(codes, return_index=True)[1]
+
+    if not near_duplicates or len(uniques) < 2:
+        return DedupResult(codes, first_index)
+
+    roots = near_duplicate_labels(list(uniques), threshold)
+    # Roots are the earliest member of each group, so groups stay in first-appearance order
+    group_roots, group_of_unique = np.unique(roots, return_inverse=True)
+    return DedupResult(group_of_unique[codes], first_index[group_roots])
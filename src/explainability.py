@@ -1,33 +1,170 @@
-import shap
-import matplotlib.pyplot as plt
+import joblib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 
+from src import config
+from src.features import is_sparse_frame
+from src.utils import stratified_sample_indices
+
+def dominant_feature(X) -> np.ndarray:
+    """
+    Index of the largest-magnitude feature per row, -1 for all-zero rows.
+    """
+    if is_sparse_frame(X):
+        M = abs(X.sparse.to_coo().tocsr())
+        dominant = np.asarray(M.argmax(axis=1)).ravel()
+        dominant[np.diff(M.indptr) == 0] = -1
+        return dominant
+    M = np.abs(np.asarray(X, dtype=float))
+    dominant = M.argmax(axis=1)
+    dominant[M.max(axis=1) == 0] = -1
+    return dominant
+
 class SHAPExplainer:
-    def __init__(self, model, X):
+    def __init__(self, model, X, max_samples=None, background_size=None, time_budget=None,
+                 n_jobs=None, use_cache=True, random_state=42):
         self.model = model
-        self.X = X
+        self.max_samples = max_samples or config.SHAP_MAX_SAMPLES
+        self.background_size = background_size or config.SHAP_BACKGROUND_SIZE
+        self.time_budget = time_budget if time_budget is not None else config.SHAP_TIME_BUDGET
+        self.n_jobs = n_jobs or config.SHAP_N_JOBS or os.cpu_count() or 1
+        self.use_cache = use_cache
+        self.random_state = random_state
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X)
+
+        # Global plots only need a representative sample: stratify rows by their
+        # dominant topic so small topics are still represented.
+        sample_index = stratified_sample_indices(dominant_feature(X), self.max_samples, random_state)
+        # Shuffled, so the rows finished within a time budget are still a mixed sample
+        self.sample_index = np.random.default_rng(random_state).permutation(sample_index)
+        X_sample = X.iloc[self.sample_index]
+        # Explainers and plots need dense values; only the sample is densified
+        self.X = X_sample.sparse.to_dense() if is_sparse_frame(X_sample) else X_sample
         self.explainer = None
+        self.summary = None
         self.shap_values = None
-        
-    def calculate_shap(self):
+        self.expected_value = None
+
+    def _explainer_kind(self) -> str:
         # TreeExplainer for Trees, LinearExplainer for Linear, Kernel for others
         model_type = type(self.model).__name__
-        
-        if "LGBM" in model_type or "RandomForest" in model_type or "XGB" in model_type:
-            self.explainer = shap.TreeExplainer(self.model)
-        elif "Ridge" in model_type or "Lasso" in model_type:
-            self.explainer = shap.LinearExplainer(self.model, self.X)
+        # "Booster": LightGBM models trained out of core (OutOfCoreTrainer)
+        if "LGBM" in model_type or "Booster" in model_type or "RandomForest" in model_type or "XGB" in model_type:
+            return "tree"
+        if "Ridge" in model_type or "Lasso" in model_type or "SGD" in model_type:
+            return "linear"
+        return "kernel"
+
+    def _background(self):
+        import shap
+        # A small background keeps Kernel / interventional Tree cost bounded
+        k = min(self.background_size, len(self.X))
+        if self._explainer_kind() == "kernel":
+            # k-means centroids; KernelExplainer weights them by cluster size
+            return shap.kmeans(self.X, k)
+        # Tree / Linear explainers would treat centroids as equally likely rows,
+        # so they get a uniform sample of real rows instead
+        return shap.sample(self.X, k, random_state=self.random_state)
+
+    def _build_explainer(self, background):
+        import shap
+        kind = self._explainer_kind()
+        if kind == "tree":
+            return shap.TreeExplainer(self.model, data=background,
+                                      feature_perturbation=config.SHAP_TREE_PERTURBATION)
+        elif kind == "linear":
+            return shap.LinearExplainer(self.model, background)
         else:
-            self.explainer = shap.KernelExplainer(self.model.predict, shap.sample(self.X, 50))
-            
-        self.shap_values = self.explainer.shap_values(self.X)
-        
+            return shap.KernelExplainer(self.model.predict, background)
+
+    def _cache_path(self):
+        # Model fingerprint + explained rows + settings that change the values
+        key = joblib.hash((self.model, self.X, self.background_size, self._explainer_kind(),
+                           config.SHAP_TREE_PERTURBATION))
+        return config.SHAP_CACHE_DIR / f"{key}.npz"
+
+    def _chunk_workers(self) -> int:
+        # Only TreeExplainer is safe to call from several threads: KernelExplainer
+        # keeps per-call state (synthetic data, nsamplesRun, ...) on the instance
+        return self.n_jobs if type(self.explainer).__name__ == "TreeExplainer" else 1
+
+    def _explain_in_chunks(self):
+        """
+        Explains self.X in chunks, _chunk_workers() chunks at a time. With a time
+        budget, stops after the wave of chunks that crosses it and keeps the rows
+        done so far.
+        """
+        chunk_size = config.SHAP_CHUNK_SIZE
+        chunks = [self.X.iloc[i:i + chunk_size] for i in range(0, len(self.X), chunk_size)]
+        n_workers = self._chunk_workers()
+        start = time.perf_counter()
+        values = []
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            for wave in range(0, len(chunks), n_workers):
+                values.extend(executor.map(self.explainer.shap_values, chunks[wave:wave + n_workers]))
+                if self.time_budget is not None and time.perf_counter() - start > self.time_budget:
+                    break
+        return np.concatenate(values) if values else np.empty((0, self.X.shape[1]))
+
+    def calculate_shap(self):
+        cache_path = self._cache_path() if self.use_cache else None
+        if cache_path is not None and cache_path.exists():
+            cached = np.load(cache_path)
+            self.shap_values = cached["shap_values"]
+            self.expected_value = float(cached["expected_value"])
+            self.X = self.X.iloc[:len(self.shap_values)]
+            return
+
+        self.explainer = self._build_explainer(self._background())
+        self.shap_values = self._explain_in_chunks()
+        self.expected_value = float(np.ravel(self.explainer.expected_value)[0])
+        # Rows past the time budget were not explained
+        complete = len(self.shap_values) == len(self.X)
+        self.X = self.X.iloc[:len(self.shap_values)]
+
+        # A run cut short by the time budget is not cached, so later runs
+        # (with a larger or no budget) explain every sampled row
+        if cache_path is not None and complete:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(cache_path, shap_values=self.shap_values, expected_value=self.expected_value)
+
+    def explanation(self):
+        """
+        The computed values as a shap.Explanation, for the shap.plots API.
+        """
+        import shap
+        return shap.Explanation(
+            values=self.shap_values,
+            base_values=np.full(len(self.shap_values), self.expected_value),
+            data=np.asarray(self.X),
+            feature_names=list(self.X.columns),
+        )
+
+    def summarize(self) -> dict:
+        """
+        Compact summary of the values for plotting (see src/visualization.py),
+        computed once and kept with the explainer.
+        """
+        if getattr(self, "summary", None) is None:
+            from src.visualization import summarize_shap
+            self.summary = summarize_shap(self.shap_values, self.X)
+        return self.summary
+
     def plot_summary(self):
+        import shap
+        import matplotlib.pyplot as plt
         fig = plt.figure()
         shap.summary_plot(self.shap_values, self.X, show=False)
         return fig
-        
+
     def plot_beeswarm(self):
+        import shap
+        import matplotlib.pyplot as plt
         fig = plt.figure()
-        shap.plots.beeswarm(self.explainer(self.X), show=False)
+        # Reuses the values from calculate_shap instead of re-explaining every row
+        shap.plots.beeswarm(self.explanation(), show=False)
         return fig
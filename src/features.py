@@ -1,8 +1,25 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 from typing import Tuple
 
-def create_features(df: pd.DataFrame, topics: list, sentiment_scores: list, topic_probs=None) -> Tuple[pd.DataFrame, pd.Series]:
+# Rows per block when sparsifying the probability matrix, bounds the dense temporary
+SPARSE_BLOCK_ROWS = 50_000
+
+def is_sparse_frame(X) -> bool:
+    return isinstance(X, pd.DataFrame) and len(X.columns) > 0 and all(isinstance(dt, pd.SparseDtype) for dt in X.dtypes)
+
+def to_model_matrix(X):
+    """
+    Returns what models are fitted on: a CSR matrix for sparse feature frames,
+    X unchanged otherwise.
+    """
+    if is_sparse_frame(X):
+        return X.sparse.to_coo().tocsr()
+    return X
+
+def create_features(df: pd.DataFrame, topics: list, sentiment_scores: list, topic_probs=None,
+                    sparse: bool = False, dtype=np.float64, prob_threshold: float = 0.0) -> Tuple[pd.DataFrame, pd.Series]:
     """
     Constructs X (features) and y (target).
     
@@ -27,6 +44,11 @@ def create_features(df: pd.DataFrame, topics: list, sentiment_scores: list, topi
     Or create columns for each topic, set value = sentiment if dominant, else 0 (or neutral).
     
     Let's use the Probability * Sentiment approach as it's more continuous and robust.
+
+    Memory options (both paths are vectorized):
+    - sparse: return a DataFrame of sparse columns (see `to_model_matrix` for the CSR view)
+    - dtype: e.g. np.float32 to halve memory
+    - prob_threshold: topic probabilities below this are treated as 0
     """
     
     y = df['rating']
@@ -46,26 +68,99 @@ def create_features(df: pd.DataFrame, topics: list, sentiment_scores: list, topi
         
         # Normalize sentiment to be centered? Maybe not needed for tree models.
         
-        sentiments = np.array(sentiment_scores).reshape(-1, 1)
-        X_values = topic_probs * sentiments
-        
+        sentiments = np.asarray(sentiment_scores, dtype=dtype).reshape(-1, 1)
+        probs = np.asarray(topic_probs)
+
         # Create DataFrame
         # We need column names. Let's assume topic indices 0..N
         # Note: topic_probs might not include topic -1.
-        num_topics = topic_probs.shape[1]
+        num_topics = probs.shape[1]
         col_names = [f"Topic_{i}" for i in range(num_topics)]
-        X = pd.DataFrame(X_values, columns=col_names)
-        
+
+        if sparse:
+            # Build CSR block by block so only SPARSE_BLOCK_ROWS dense rows exist at a time
+            blocks = []
+            for start in range(0, len(probs), SPARSE_BLOCK_ROWS):
+                P = probs[start:start + SPARSE_BLOCK_ROWS].astype(dtype, copy=False)
+                values = P * sentiments[start:start + SPARSE_BLOCK_ROWS]
+                if prob_threshold > 0:
+                    values[P < prob_threshold] = 0
+                blocks.append(sp.csr_matrix(values))
+            X_csr = sp.vstack(blocks, format="csr") if blocks else sp.csr_matrix((0, num_topics), dtype=dtype)
+            X = pd.DataFrame.sparse.from_spmatrix(X_csr, columns=col_names)
+        else:
+            X_values = np.multiply(probs, sentiments, dtype=dtype)
+            if prob_threshold > 0:
+                X_values[probs < prob_threshold] = 0
+            X = pd.DataFrame(X_values, columns=col_names)
+
     else:
         # Fallback: Dominant topic only
-        # Create a matrix of zeros
+        # Column per topic, value = sentiment if it is the dominant topic, else 0
+        topics_arr = np.asarray(topics)
         unique_topics = sorted(list(set(topics)))
         if -1 in unique_topics: unique_topics.remove(-1)
-        
-        X = pd.DataFrame(0, index=range(len(df)), columns=[f"Topic_{t}" for t in unique_topics])
-        
-        for i, (t, s) in enumerate(zip(topics, sentiment_scores)):
-            if t != -1:
-                X.loc[i, f"Topic_{t}"] = s
-                
+        col_names = [f"Topic_{t}" for t in unique_topics]
+
+        mask = topics_arr != -1
+        rows = np.nonzero(mask)[0]
+        cols = np.searchsorted(unique_topics, topics_arr[mask])
+        values = np.asarray(sentiment_scores, dtype=dtype)[mask]
+
+        if sparse:
+            X_csr = sp.csr_matrix((values, (rows, cols)), shape=(len(df), len(unique_topics)), dtype=dtype)
+            X = pd.DataFrame.sparse.from_spmatrix(X_csr, columns=col_names)
+        else:
+            X_values = np.zeros((len(df), len(unique_topics)), dtype=dtype)
+            X_values[rows, cols] = values
+            X = pd.DataFrame(X_values, columns=col_names)
+
     return X, y
+
+class FeatureStream:
+    """
+    Rows of the create_features matrix of a ResultStore, computed on demand.
+
+    Only rating, topic and sentiment are held in memory (float32 / int16 / int8,
+    7 bytes per review); topic probabilities are read from the store's memory
+    map. Models can be trained chunk by chunk (`iter_chunks`) or through random
+    row access (`rows`) without the full matrix ever existing.
+    """
+
+    def __init__(self, result_store, dtype=np.float32):
+        columns = result_store.read(["rating", "topic", "sentiment"])
+        self.y = columns["rating"].to_numpy(dtype=np.float32)
+        self.topics = columns["topic"].to_numpy()
+        self.sentiment = columns["sentiment"].to_numpy()
+        self.probs = result_store.topic_probs()
+        self.dtype = np.dtype(dtype)
+        if self.probs is not None:
+            self.columns = [f"Topic_{i}" for i in range(self.probs.shape[1])]
+        else:
+            # Dominant-topic layout, with the topics present anywhere in the store
+            self.topic_ids = np.array(sorted(set(np.unique(self.topics).tolist()) - {-1}), dtype=np.int64)
+            self.columns = [f"Topic_{t}" for t in self.topic_ids]
+
+    def __len__(self):
+        return len(self.y)
+
+    def rows(self, index) -> np.ndarray:
+        """
+        Feature rows for a slice or an array of row numbers (sorted is fastest).
+        """
+        sentiment = self.sentiment[index].astype(self.dtype)
+        if self.probs is not None:
+            return np.multiply(self.probs[index], sentiment[:, None], dtype=self.dtype)
+        topics = self.topics[index]
+        values = np.zeros((len(topics), len(self.columns)), dtype=self.dtype)
+        mask = topics != -1
+        values[np.flatnonzero(mask), np.searchsorted(self.topic_ids, topics[mask])] = sentiment[mask]
+        return values
+
+    def iter_chunks(self, chunk_size: int = 100_000):
+        """
+        Yields (first row, X chunk, y chunk) in row order.
+        """
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            yield start, self.rows(slice(start, stop)), self.y[start:stop]
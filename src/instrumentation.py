@@ -0,0 +1,186 @@
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+# Records of the stages currently running in this process, across all Instrumentation
+# objects and threads (e.g. two JobRegistry jobs). RSS and cache counters are
+# process-wide, and only one profiler can be active at a time (cProfile raises on 3.12+).
+_running = {}
+_running_lock = threading.Lock()
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of this process. Falls back to ru_maxrss (the peak so far)
+    where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        import sys
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes elsewhere
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+class PeakRssSampler:
+    """
+    Samples RSS in a background thread and keeps the peak seen while active.
+
+    ru_maxrss only ever grows over the life of the process, so it cannot tell
+    which stage was responsible for the peak.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start = 0
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_bytes())
+
+    def __enter__(self):
+        self.start = self.peak = current_rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+class _Profiler:
+    """
+    Thin wrapper so cProfile and pyinstrument share start / stop / text.
+    """
+
+    def __init__(self, kind):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{kind}'. Use one of {PROFILERS}.")
+        self.kind = kind
+        if kind == "cprofile":
+            import cProfile
+            self.profiler = cProfile.Profile()
+        else:
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+
+    def start(self):
+        if self.kind == "cprofile":
+            self.profiler.enable()
+        else:
+            self.profiler.start()
+
+    def stop(self):
+        if self.kind == "cprofile":
+            self.profiler.disable()
+        else:
+            self.profiler.stop()
+
+    def text(self, limit=30) -> str:
+        if self.kind == "cprofile":
+            import pstats
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        return self.profiler.output_text(unicode=True, color=False)
+
+class Instrumentation:
+    """
+    Collects per-stage wall time, CPU time, peak RSS, throughput and cache hits.
+
+        inst = Instrumentation()
+        with inst.stage("sentiment", items=len(texts), cache=analyzer.cache):
+            analyzer.predict(texts)
+        inst.to_json("run_report.json")
+
+    `cache` is any object with `hits` / `misses` counters (EmbeddingCache,
+    ArtifactStore); the stage records how much they moved while it ran. With
+    `profile="cprofile"` or `"pyinstrument"` each stage's profile is kept as text.
+
+    Peak RSS and cache deltas are measured for the whole process. When another
+    stage (of this or another job) runs at the same time, the record gets
+    `"overlapped": True` because these numbers include that stage's work, and a
+    stage that starts while another is running is not profiled.
+    """
+
+    def __init__(self, profile=None, rss_interval=0.01):
+        self.profile = profile
+        self.rss_interval = rss_interval
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, items=None, cache=None):
+        # Yielded so the caller can fill in items / extra fields once known
+        record = {"items": items}
+        caches = cache if isinstance(cache, (list, tuple)) else [cache] if cache is not None else []
+        counters = [(getattr(c, "hits", 0), getattr(c, "misses", 0)) for c in caches]
+        with _running_lock:
+            record["overlapped"] = bool(_running)
+            for other in _running.values():
+                other["overlapped"] = True
+            _running[id(record)] = record
+        profiler = _Profiler(self.profile) if self.profile and not record["overlapped"] else None
+
+        try:
+            with PeakRssSampler(self.rss_interval) as rss:
+                wall, cpu = time.perf_counter(), time.process_time()
+                if profiler:
+                    profiler.start()
+                try:
+                    yield record
+                finally:
+                    if profiler:
+                        profiler.stop()
+                    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        finally:
+            with _running_lock:
+                del _running[id(record)]
+
+        record["wall_seconds"] = wall
+        record["cpu_seconds"] = cpu
+        record["peak_rss_mb"] = rss.peak / 1024 ** 2
+        record["rss_increase_mb"] = (rss.peak - rss.start) / 1024 ** 2
+        items = record["items"]
+        record["items_per_sec"] = items / wall if items and wall > 0 else None
+        if caches:
+            record["cache_hits"] = sum(getattr(c, "hits", 0) - h for c, (h, _) in zip(caches, counters))
+            record["cache_misses"] = sum(getattr(c, "misses", 0) - m for c, (_, m) in zip(caches, counters))
+        if profiler:
+            record["profile"] = profiler.text()
+        elif self.profile:
+            record["profile"] = "Not profiled: another stage was running in this process."
+        self.stages[name] = record
+
+    def report(self) -> dict:
+        return {
+            "total_wall_seconds": sum(r["wall_seconds"] for r in self.stages.values()),
+            "peak_rss_mb": max((r["peak_rss_mb"] for r in self.stages.values()), default=None),
+            # Stages whose peak RSS / cache numbers include concurrently running work
+            "overlapped_stages": [name for name, r in self.stages.items() if r["overlapped"]],
+            "stages": self.stages,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per stage, without the profile text.
+        """
+        rows = {name: {k: v for k, v in r.items() if k != "profile"} for name, r in self.stages.items()}
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def to_json(self, path=None) -> str:
+        text = json.dumps(self.report(), indent=2, default=str)
+        if path is not None:
+            Path(path).write_text(text)
+        return text
@@ -0,0 +1,143 @@
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import pandas as pd
+
+from src import config
+from src.pipeline import run_pipeline
+
+class Job:
+    """
+    One pipeline run. Updated by the worker thread, read by the UI.
+    """
+
+    def __init__(self, job_id: str, key: str, description: str = ""):
+        self.id = job_id
+        self.key = key
+        self.description = description
+        # queued -> running -> done | failed; done -> evicted once its result is released
+        self.status = "queued"
+        self.stages = {}  # stage -> "done" | "cached", in completion order
+        self.progress = {}  # stage -> (done, total), for stages that report it
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "evicted")
+
+    def on_stage(self, stage, cached):
+        self.stages[stage] = "cached" if cached else "done"
+
+    def on_progress(self, stage):
+        def callback(done, total):
+            self.progress[stage] = (done, total)
+        return callback
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobRegistry:
+    """
+    Runs pipelines in a shared pool of background threads.
+
+    Jobs are keyed by a hash of the dataset and the settings that change the
+    results, so identical submissions (e.g. two analysts on the same file)
+    attach to the one job already queued, running or finished instead of
+    starting another. Failed jobs are retried on the next submission. The
+    heavy stages run in native code (torch, numpy, LightGBM) or worker
+    processes, so threads keep the server responsive.
+
+    Each result holds the full frame, features, models and explainer, so only
+    the `keep_results` most recently finished jobs keep theirs. Older ones are
+    marked "evicted"; submitting them again reloads every stage from the
+    artifact store instead of recomputing.
+    """
+
+    def __init__(self, run_fn=run_pipeline, max_workers=None, history=None, keep_results=None):
+        self.run_fn = run_fn
+        self.history = history or config.JOB_HISTORY
+        self.keep_results = config.JOB_RESULTS_KEPT if keep_results is None else keep_results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or config.JOB_MAX_WORKERS,
+                                            thread_name_prefix="pipeline-job")
+        self._jobs = {}  # id -> Job, in submission order
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def job_key(df: pd.DataFrame, domain: str, settings: dict = None) -> str:
+        return joblib.hash((df['review_text'], df['rating'], domain, sorted((settings or {}).items())))
+
+    def submit(self, df: pd.DataFrame, domain: str, settings: dict = None, description: str = "", **pipeline_kwargs) -> Job:
+        """
+        Returns the existing job for this dataset + settings, or queues a new one.
+
+        pipeline_kwargs are passed to run_pipeline (store, sentence_model, ...).
+        Progress callbacks are wired to the job.
+        """
+        key = self.job_key(df, domain, settings)
+        with self._lock:
+            job = self._by_key.get(key)
+            if job is not None and job.status not in ("failed", "evicted"):
+                return job
+            job = Job(f"job-{next(self._ids)}", key, description)
+            self._jobs[job.id] = job
+            self._by_key[key] = job
+            self._prune()
+        self._executor.submit(self._run, job, df, domain, pipeline_kwargs)
+        return job
+
+    def _run(self, job: Job, df, domain, pipeline_kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        result, status = None, "failed"
+        try:
+            result = self.run_fn(df, domain, on_stage=job.on_stage,
+                                 sentiment_progress=job.on_progress("sentiment"), **pipeline_kwargs)
+            status = "done"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.traceback = traceback.format_exc()
+            print(f"Pipeline {job.id} failed: {job.error}")
+        finally:
+            with self._lock:
+                job.result = result
+                job.finished_at = time.time()
+                job.status = status
+                self._prune()
+
+    def _prune(self):
+        # Called with the lock held. Only the newest finished results stay in memory.
+        done = sorted((j for j in self._jobs.values() if j.status == "done"), key=lambda j: j.finished_at)
+        for job in done[:max(0, len(done) - self.keep_results)]:
+            job.result = None
+            job.status = "evicted"
+
+        # Finished jobs beyond the history limit are forgotten, oldest first.
+        # Their stage outputs stay in the artifact store, so resubmitting is cheap.
+        finished = [j for j in self._jobs.values() if j.finished]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+            if self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+
+    def get(self, job_id: str) -> Job:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
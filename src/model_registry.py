@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+from src import config
+
+class ModelRegistry:
+    """
+    Versioned store of fitted rating models under MODELS_DIR/registry:
+
+        <root>/<name>/v0003/model.joblib   the fitted model (uncompressed, so its
+                                           numpy arrays can be memory-mapped)
+        <root>/<name>/v0003/meta.json      model name / class, feature columns,
+                                           metrics, training-data fingerprint
+
+    Versions are never overwritten. A model trained on data with the same
+    fingerprint can be found with `find` and loaded instead of retrained.
+    """
+
+    MODEL_FILE = "model.joblib"
+    META_FILE = "meta.json"
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else config.MODEL_REGISTRY_DIR
+
+    @staticmethod
+    def make_fingerprint(*parts) -> str:
+        return joblib.hash(parts)
+
+    def _version_path(self, name: str, version: int) -> Path:
+        return self.root / name / f"v{version:04d}"
+
+    def versions(self, name: str = None) -> List[int]:
+        name = name or config.MODEL_REGISTRY_NAME
+        path = self.root / name
+        if not path.exists():
+            return []
+        # Only complete versions: meta.json is written before the directory is renamed into place
+        return sorted(int(p.name[1:]) for p in path.iterdir()
+                      if p.name.startswith("v") and p.name[1:].isdigit() and (p / self.META_FILE).exists())
+
+    def latest_version(self, name: str = None) -> Optional[int]:
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def register(self, model, feature_names, metrics: dict, data_fingerprint: str, model_name: str = None,
+                 name: str = None, **extra) -> int:
+        """
+        Stores a fitted model as the next version of `name` and returns the version.
+        `extra` is kept in the metadata (e.g. n_rows, training mode).
+        """
+        name = name or config.MODEL_REGISTRY_NAME
+        tmp_path = self.root / name / f".tmp{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        joblib.dump(model, tmp_path / self.MODEL_FILE)
+
+        while True:
+            version = (self.latest_version(name) or 0) + 1
+            meta = {
+                "name": name,
+                "version": version,
+                "model_name": model_name or type(model).__name__,
+                "model_class": f"{type(model).__module__}.{type(model).__name__}",
+                "feature_names": [str(c) for c in feature_names],
+                "metrics": metrics,
+                "data_fingerprint": data_fingerprint,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                **extra,
+            }
+            with open(tmp_path / self.META_FILE, "w") as f:
+                json.dump(meta, f, indent=2, default=float)
+            try:
+                # Fails if another writer took this version first; then try the next one
+                os.rename(tmp_path, self._version_path(name, version))
+                return version
+            except OSError:
+                if not self._version_path(name, version).exists():
+                    raise
+
+    def meta(self, version: int = None, name: str = None) -> dict:
+        name = name or config.MODEL_REGISTRY_NAME
+        version = version or self.latest_version(name)
+        if version is None:
+            raise FileNotFoundError(f"No registered versions of '{name}' in {self.root}")
+        with open(self._version_path(name, version) / self.META_FILE) as f:
+            return json.load(f)
+
+    def load(self, version: int = None, name: str = None, mmap_mode: str = "r") -> Tuple[object, dict]:
+        """
+        Returns (model, meta) of `version` (default: latest). Large arrays in the
+        model are memory-mapped read-only unless mmap_mode is None.
+        """
+        meta = self.meta(version, name)
+        model = joblib.load(self._version_path(meta["name"], meta["version"]) / self.MODEL_FILE, mmap_mode=mmap_mode)
+        return model, meta
+
+    def find(self, data_fingerprint: str, name: str = None) -> Optional[int]:
+        """
+        Latest version trained on data with this fingerprint, or None.
+        """
+        for version in reversed(self.versions(name)):
+            if self.meta(version, name)["data_fingerprint"] == data_fingerprint:
+                return version
+        return None
+
+    def list(self, name: str = None) -> pd.DataFrame:
+        rows = []
+        for version in self.versions(name):
+            meta = self.meta(version, name)
+            rows.append({"version": version, "model_name": meta["model_name"], "created_at": meta["created_at"],
+                         "RMSE": meta["metrics"].get("RMSE"), "R2": meta["metrics"].get("R2"),
+                         "n_features": len(meta["feature_names"]), "data_fingerprint": meta["data_fingerprint"]})
+        return pd.DataFrame(rows, columns=["version", "model_name", "created_at", "RMSE", "R2", "n_features",
+                                           "data_fingerprint"])
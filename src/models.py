@@ -3,11 +3,52 @@ from sklearn.naive_bayes import GaussianNB
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.neighbors import KNeighborsRegressor
 from sklearn.svm import SVR
-from sklearn.model_selection import cross_validate
+from sklearn.base import clone
+from sklearn.model_selection import KFold
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+from concurrent.futures import as_completed
+from joblib.externals.loky import get_reusable_executor
 import lightgbm as lgb
+import joblib
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
+
+from src import config
+from src.features import FeatureStream, to_model_matrix
+from src.model_registry import ModelRegistry
+
+# Memory-mapped (X, y) in worker processes, keyed by the dump path, so every
+# model x fold job reads the same pages instead of unpickling its own copy.
+_shared_data = {}
+
+def _load_shared(data_path):
+    if data_path not in _shared_data:
+        _shared_data.clear()
+        _shared_data[data_path] = joblib.load(data_path, mmap_mode='r')
+    return _shared_data[data_path]
+
+def _score_fold(model, X, y, train_idx, test_idx) -> dict:
+    start = time.perf_counter()
+    fold_model = clone(model)
+    fold_model.fit(X[train_idx], y[train_idx])
+    pred = fold_model.predict(X[test_idx])
+    y_test = y[test_idx]
+    return {
+        "MSE": mean_squared_error(y_test, pred),
+        "MAE": mean_absolute_error(y_test, pred),
+        "R2": r2_score(y_test, pred),
+        "Time": time.perf_counter() - start,
+    }
+
+def _score_shared_fold(model, data_path, train_idx, test_idx) -> dict:
+    X, y = _load_shared(data_path)
+    return _score_fold(model, X, y, train_idx, test_idx)
 
 class ModelTrainer:
     def __init__(self):
@@ -27,30 +68,273 @@ class ModelTrainer:
         self.best_model_name = ""
         self.results = {}
 
-    def train_and_evaluate(self, X, y):
-        best_rmse = float('inf')
-        
-        for name, model in self.models.items():
-            # 5-fold CV
-            cv_results = cross_validate(model, X, y, cv=5, scoring=['neg_mean_squared_error', 'neg_mean_absolute_error', 'r2'])
-            
-            mse = -cv_results['test_neg_mean_squared_error'].mean()
-            mae = -cv_results['test_neg_mean_absolute_error'].mean()
-            r2 = cv_results['test_r2'].mean()
-            rmse = np.sqrt(mse)
-            
+    def train_and_evaluate(self, X, y, n_jobs=None, early_stopping=None):
+        """
+        K-fold CV of every model, then refits the best (lowest RMSE) on all data.
+
+        Model x fold jobs run in parallel on a pool of `n_jobs` processes (1 runs
+        them in-process) against a read-only memory-mapped copy of X and y. With
+        early stopping, a model is dropped once the mean MSE of its finished
+        folds, spread over all folds, already gives an RMSE that cannot beat the
+        best finished model (the remaining folds can only add error).
+        """
+        n_jobs = n_jobs or config.MODEL_SELECTION_N_JOBS or os.cpu_count() or 1
+        early_stopping = config.MODEL_SELECTION_EARLY_STOPPING if early_stopping is None else early_stopping
+        # Sparse feature frames are trained on as CSR (all models here accept it)
+        X = to_model_matrix(X)
+        X_arr = X if sp.issparse(X) else np.asarray(X)
+        y_arr = np.asarray(y)
+
+        folds = list(KFold(n_splits=config.MODEL_SELECTION_CV_FOLDS).split(X_arr))
+        n_folds = len(folds)
+        order = {name: i for i, name in enumerate(self.models)}
+        fold_results = {name: [] for name in self.models}
+        pruned = set()
+        best = {"rmse": float('inf'), "name": None}
+
+        def lower_bound_rmse(name):
+            return np.sqrt(sum(r["MSE"] for r in fold_results[name]) / n_folds)
+
+        def on_result(name, result):
+            fold_results[name].append(result)
+            if len(fold_results[name]) == n_folds:
+                rmse = lower_bound_rmse(name)
+                # Ties go to the model listed first, as in the sequential loop
+                if rmse < best["rmse"] or (rmse == best["rmse"] and order[name] < order[best["name"]]):
+                    best["rmse"], best["name"] = rmse, name
+            if not early_stopping:
+                return
+            for other, results in fold_results.items():
+                if other in pruned or not 0 < len(results) < n_folds:
+                    continue
+                # Only dropped once it can no longer win: a tie still wins for a model listed
+                # before the current best, so selection does not depend on fold scheduling
+                bound = lower_bound_rmse(other)
+                if bound > best["rmse"] or (bound == best["rmse"] and order[other] > order[best["name"]]):
+                    pruned.add(other)
+
+        if n_jobs == 1:
+            for name, model in self.models.items():
+                for train_idx, test_idx in folds:
+                    if name in pruned:
+                        break
+                    on_result(name, _score_fold(model, X_arr, y_arr, train_idx, test_idx))
+        else:
+            tmp_dir = tempfile.mkdtemp(prefix="model_selection_")
+            try:
+                data_path = os.path.join(tmp_dir, "Xy.joblib")
+                joblib.dump((X_arr, y_arr), data_path)
+                executor = get_reusable_executor(max_workers=n_jobs)
+                futures = {}
+                # Submitted model-major, so the first models finish first and set the bar
+                for name, model in self.models.items():
+                    for train_idx, test_idx in folds:
+                        futures[executor.submit(_score_shared_fold, model, data_path, train_idx, test_idx)] = name
+                for future in as_completed(futures):
+                    name = futures[future]
+                    if future.cancelled() or name in pruned:
+                        continue
+                    on_result(name, future.result())
+                    for f, n in futures.items():
+                        if n in pruned:
+                            f.cancel()
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.results = {}
+        for name, results in fold_results.items():
+            if not results:
+                continue
+            mse = np.mean([r["MSE"] for r in results])
             self.results[name] = {
-                "MSE": mse,
-                "RMSE": rmse,
-                "MAE": mae,
-                "R2": r2
+                "MSE": float(mse),
+                "RMSE": float(np.sqrt(mse)),
+                "MAE": float(np.mean([r["MAE"] for r in results])),
+                "R2": float(np.mean([r["R2"] for r in results])),
+                "Time (s)": float(sum(r["Time"] for r in results)),
             }
-            
-            if rmse < best_rmse:
-                best_rmse = rmse
-                self.best_model = model
-                self.best_model_name = name
-        
+            if name in pruned:
+                # Metrics cover only the folds that ran before the model was dropped
+                self.results[name]["Early Stopped"] = True
+                self.results[name]["Folds"] = len(results)
+
+        self.best_model_name = best["name"]
+        self.best_model = self.models[self.best_model_name]
+
         # Retrain best model on full data
         self.best_model.fit(X, y)
         return self.results, self.best_model_name
+
+    @classmethod
+    def from_registry(cls, version=None, name=None, registry=None) -> "ModelTrainer":
+        """
+        A trainer holding a registered model as its best model, without retraining.
+        Its feature columns are in `feature_names`.
+        """
+        registry = registry or ModelRegistry()
+        trainer = cls()
+        trainer.best_model, meta = registry.load(version, name)
+        trainer.best_model_name = meta["model_name"]
+        trainer.results = {meta["model_name"]: meta["metrics"]}
+        trainer.feature_names = meta["feature_names"]
+        return trainer
+
+class _Split:
+    """
+    Training or validation rows of a FeatureStream: every `every`-th row
+    (row % every == every - 1) is held out for validation. Maps positions
+    within the split to row numbers without storing them.
+    """
+
+    def __init__(self, n_rows: int, every: int, validation: bool):
+        self.every = every
+        self.validation = validation
+        n_validation = n_rows // every
+        self.n = n_validation if validation else n_rows - n_validation
+
+    def __len__(self):
+        return self.n
+
+    def rows(self, positions) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.validation:
+            return positions * self.every + self.every - 1
+        return positions + positions // (self.every - 1)
+
+    @staticmethod
+    def validation_mask(start: int, n: int, every: int) -> np.ndarray:
+        return np.arange(start, start + n) % every == every - 1
+
+class _StreamSequence(lgb.Sequence):
+    """
+    Lets LightGBM read a split of a FeatureStream in batches while it bins the data.
+    """
+
+    def __init__(self, stream: FeatureStream, split: _Split, batch_size: int):
+        self.stream = stream
+        self.split = split
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return len(self.split)
+
+    def __getitem__(self, idx):
+        # LightGBM bins from float64; only one batch is converted at a time
+        if isinstance(idx, (int, np.integer)):
+            return self.stream.rows(self.split.rows([idx]))[0].astype(np.float64)
+        if isinstance(idx, slice):
+            idx = np.arange(*idx.indices(len(self)))
+        return self.stream.rows(self.split.rows(idx)).astype(np.float64)
+
+class OutOfCoreTrainer:
+    """
+    Model selection for feature matrices that do not fit in memory, over a
+    FeatureStream (see features.py):
+
+    - LightGBM: the training rows are binned batch by batch into a LightGBM
+      Dataset, saved as a binary file under OOC_DATASET_DIR keyed by the data
+      fingerprint, so retraining loads the compact binned data directly
+    - SGD: a linear model fitted with partial_fit over chunks, OOC_SGD_EPOCHS passes
+
+    Every OOC_VALIDATION_EVERY-th row is held out; metrics (same keys as
+    ModelTrainer.results) are computed on it in chunks. Memory stays bounded by
+    OOC_CHUNK_ROWS rows of features plus LightGBM's binned data (one byte per
+    value with max_bin <= 255). The best model is trained on the training rows only.
+    """
+
+    def __init__(self, models=("LightGBM", "SGD"), chunk_size=None, validation_every=None, dataset_dir=None):
+        self.models = list(models)
+        self.chunk_size = chunk_size or config.OOC_CHUNK_ROWS
+        self.validation_every = validation_every or config.OOC_VALIDATION_EVERY
+        if self.validation_every < 2:
+            # Every row would be a validation row, leaving nothing to train on
+            raise ValueError(f"validation_every must be at least 2, got {self.validation_every}")
+        self.dataset_dir = Path(dataset_dir) if dataset_dir is not None else config.OOC_DATASET_DIR
+        self.best_model = None
+        self.best_model_name = ""
+        self.results = {}
+        self.fitted = {}
+
+    def _fit_lightgbm(self, stream: FeatureStream, fingerprint=None):
+        params = dict(config.OOC_LGB_PARAMS)
+        train_split = _Split(len(stream), self.validation_every, validation=False)
+        validation_split = _Split(len(stream), self.validation_every, validation=True)
+        y_validation = stream.y[validation_split.rows(np.arange(len(validation_split)))]
+
+        path = None
+        if fingerprint is not None:
+            # All params, not just max_bin: any Dataset parameter (min_data_in_bin, categorical_feature, ...)
+            # changes the binned file, and a stale one would be loaded silently
+            key = joblib.hash((fingerprint, self.validation_every, stream.columns, sorted(params.items())))
+            path = self.dataset_dir / f"{key}.bin"
+        if path is not None and path.exists():
+            train = lgb.Dataset(str(path), params=params)
+        else:
+            y_train = stream.y[train_split.rows(np.arange(len(train_split)))]
+            train = lgb.Dataset([_StreamSequence(stream, train_split, self.chunk_size)], label=y_train,
+                                feature_name=stream.columns, params=params)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+                train.save_binary(str(tmp_path))
+                os.replace(tmp_path, path)
+
+        validation = lgb.Dataset([_StreamSequence(stream, validation_split, self.chunk_size)], label=y_validation,
+                                 reference=train)
+        return lgb.train(params, train, num_boost_round=config.OOC_LGB_ROUNDS, valid_sets=[validation],
+                         callbacks=[lgb.early_stopping(config.OOC_EARLY_STOPPING_ROUNDS, verbose=False)])
+
+    def _fit_sgd(self, stream: FeatureStream):
+        from sklearn.linear_model import SGDRegressor
+        model = SGDRegressor(alpha=config.OOC_SGD_ALPHA, random_state=0)
+        for _ in range(config.OOC_SGD_EPOCHS):
+            for start, X, y in stream.iter_chunks(self.chunk_size):
+                train = ~_Split.validation_mask(start, len(y), self.validation_every)
+                model.partial_fit(X[train], y[train])
+        return model
+
+    def _evaluate(self, model, stream: FeatureStream) -> dict:
+        n = sse = sae = sum_y = sum_y2 = 0.0
+        for start, X, y in stream.iter_chunks(self.chunk_size):
+            held_out = _Split.validation_mask(start, len(y), self.validation_every)
+            y_true = y[held_out].astype(np.float64)
+            error = model.predict(X[held_out]) - y_true
+            n += len(y_true)
+            sse += float(np.sum(error ** 2))
+            sae += float(np.sum(np.abs(error)))
+            sum_y += float(np.sum(y_true))
+            sum_y2 += float(np.sum(y_true ** 2))
+        mse = sse / n
+        total = sum_y2 - sum_y ** 2 / n
+        return {
+            "MSE": mse,
+            "RMSE": float(np.sqrt(mse)),
+            "MAE": sae / n,
+            "R2": 1 - sse / total if total > 0 else 0.0,
+            "Validation Rows": int(n),
+        }
+
+    def train_and_evaluate(self, stream: FeatureStream, fingerprint: str = None):
+        """
+        Fits every model on the stream's training rows and scores it on the
+        held-out rows. `fingerprint` (e.g. the pipeline's features key) names the
+        cached LightGBM binary Dataset.
+        """
+        if len(stream) < 2 * self.validation_every:
+            raise ValueError(f"Need at least {2 * self.validation_every} rows, got {len(stream)}")
+        self.results = {}
+        for name in self.models:
+            start = time.perf_counter()
+            if name == "LightGBM":
+                model = self._fit_lightgbm(stream, fingerprint)
+            elif name == "SGD":
+                model = self._fit_sgd(stream)
+            else:
+                raise ValueError(f"Unknown out-of-core model: {name}")
+            self.results[name] = self._evaluate(model, stream)
+            self.results[name]["Time (s)"] = time.perf_counter() - start
+            self.fitted[name] = model
+
+        self.best_model_name = min(self.results, key=lambda name: self.results[name]["RMSE"])
+        self.best_model = self.fitted[self.best_model_name]
+        return self.results, self.best_model_name
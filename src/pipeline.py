@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.artifacts import ArtifactStore, publish_dir
+from src.cache import get_default_cache
+from src.instrumentation import Instrumentation
+from src.preprocessing import preprocess_pipeline
+from src.features import create_features
+from src.dedup import DedupResult, deduplicate
+from src.model_registry import ModelRegistry
+from src.result_store import ResultStore
+from src.visualization import summarize_topics
+
+# Stage modules that pull in heavy dependencies (bertopic/umap/hdbscan, torch/transformers,
+# lightgbm, shap/matplotlib) are imported inside the stage that needs them, so importing
+# this module stays fast.
+
+STAGES = ["preprocess", "dedup", "topics", "sentiment", "features", "model", "shap"]
+
+def run_pipeline(df: pd.DataFrame, domain: str, store: ArtifactStore = None, sentence_model=None,
+                 sentiment_analyzer=None, on_stage=None, sentiment_progress=None,
+                 instrumentation: Instrumentation = None, sentence_model_factory=None,
+                 sentiment_analyzer_factory=None, recompute: bool = False) -> dict:
+    """
+    Runs preprocessing -> dedup -> topic modeling -> sentiment -> features -> model selection -> SHAP.
+
+    Every stage output is stored in `store`, keyed by a hash of the stage's
+    inputs and config. Each key is derived from its upstream keys, so the raw
+    data is hashed once. When a key is already stored, the stage is skipped
+    and its output loaded.
+
+    - sentence_model / sentiment_analyzer: already loaded models to reuse
+    - sentence_model_factory / sentiment_analyzer_factory: called without arguments to get
+      them only when the topics / sentiment stage actually runs (e.g. st.cache_resource
+      getters). The factory's analyzer must use the configured SENTIMENT_MODEL / SENTIMENT_BACKEND.
+    - on_stage(stage, cached): called after each stage finishes or is loaded
+    - sentiment_progress(done, total): forwarded to SentimentAnalyzer.predict
+    - instrumentation: collects per-stage timings / memory / cache hits, a new one by default.
+      Its report is returned under "performance".
+    - recompute: replace this input's stored stage outputs instead of loading them;
+      artifacts of other inputs in the store are kept
+    """
+    store = store or ArtifactStore()
+    instrumentation = instrumentation or Instrumentation()
+    cached_stages = []
+    # Stage artifacts plus the embedding / logits cache used by topics and sentiment
+    caches = [store]
+    if sentiment_analyzer is not None and sentiment_analyzer.cache is not None:
+        caches.append(sentiment_analyzer.cache)
+    elif config.EMBEDDING_CACHE_ENABLED:
+        caches.append(get_default_cache())
+
+    def run(stage, key, compute_fn):
+        if recompute:
+            store.delete(stage, key)
+        with instrumentation.stage(stage, items=len(df), cache=caches) as record:
+            value, cached = store.get_or_compute(stage, key, compute_fn)
+            record["cached"] = cached
+        if cached:
+            cached_stages.append(stage)
+        if on_stage:
+            on_stage(stage, cached)
+        return value
+
+    data_key = store.make_key("data", df['review_text'], df['rating'], domain)
+
+    # Preprocessing
+    preprocess_key = store.make_key("preprocess", data_key)
+    clean_text = run("preprocess", preprocess_key,
+                     lambda: preprocess_pipeline(df[['review_text']].copy(), domain)['clean_text'].tolist())
+    df = df.copy()
+    df['clean_text'] = clean_text
+
+    # Deduplication: embedding and sentiment run once per distinct cleaned text,
+    # and their outputs are broadcast back to every review
+    dedup_key = store.make_key("dedup", preprocess_key, config.DEDUP_ENABLED, config.DEDUP_NEAR_DUPLICATES,
+                               config.DEDUP_NEAR_THRESHOLD, config.DEDUP_NUM_PERM, config.DEDUP_LSH_BANDS,
+                               config.DEDUP_SHINGLE_SIZE)
+
+    def find_duplicates():
+        if not config.DEDUP_ENABLED:
+            return DedupResult(np.arange(len(clean_text)), np.arange(len(clean_text)))
+        return deduplicate(clean_text)
+
+    dedup = run("dedup", dedup_key, find_duplicates)
+    instrumentation.stages["dedup"].update(dedup.summary())
+    unique_text = dedup.unique(clean_text)
+
+    # Topic modeling
+    topic_key = store.make_key("topics", dedup_key, config.BERTOPIC_EMBEDDING_MODEL, config.TOPIC_N_NEIGHBORS,
+                               config.TOPIC_N_COMPONENTS, config.TOPIC_MIN_CLUSTER_SIZE, config.TOPIC_MIN_SAMPLES,
+                               config.TOPIC_NGRAM_RANGE, config.TOPIC_LARGE_CORPUS_THRESHOLD,
+                               config.TOPIC_FIT_SAMPLE_SIZE, config.TOPIC_SAMPLE_STRATA, config.TOPIC_PCA_COMPONENTS,
+                               config.TOPIC_LOW_MEMORY)
+
+    def fit_topics():
+        from src.topic_modeling import TopicModeler
+        model = sentence_model if sentence_model is not None or sentence_model_factory is None else sentence_model_factory()
+        topic_modeler = TopicModeler(config.BERTOPIC_EMBEDDING_MODEL, sentence_model=model)
+        # UMAP / HDBSCAN still see one point per review, so duplicates keep their
+        # weight in the density estimate; only the encoding is deduplicated
+        embeddings = dedup.broadcast(topic_modeler.embed(unique_text))
+        topics, probs = topic_modeler.fit_transform(clean_text, embeddings=embeddings)
+        # Latest fitted model, for transform-only scoring of new reviews (TopicModeler.load).
+        # One directory per key, so concurrent jobs do not overwrite each other's model.
+        publish_dir(config.TOPIC_MODEL_DIR, topic_key, topic_modeler.save)
+        return {"topic_modeler": topic_modeler, "topics": list(topics), "probs": probs,
+                "topic_info": topic_modeler.get_topic_info()}
+
+    topic_output = run("topics", topic_key, fit_topics)
+    topics, probs = topic_output["topics"], topic_output["probs"]
+
+    # Sentiment
+    sentiment_model = sentiment_analyzer.model_name if sentiment_analyzer else config.SENTIMENT_MODEL
+    sentiment_backend = sentiment_analyzer.backend if sentiment_analyzer else config.SENTIMENT_BACKEND
+    sentiment_key = store.make_key("sentiment", dedup_key, sentiment_model, sentiment_backend)
+
+    def score_sentiment():
+        from src.sentiment_analysis import SentimentAnalyzer
+        analyzer = sentiment_analyzer
+        if analyzer is None:
+            analyzer = sentiment_analyzer_factory() if sentiment_analyzer_factory else SentimentAnalyzer(config.SENTIMENT_MODEL)
+        # Scored in checkpointed chunks, so an interrupted run resumes at the last finished chunk
+        step = config.SENTIMENT_CHECKPOINT_ROWS
+        scores = []
+        for start in range(0, len(unique_text), step):
+            chunk = unique_text[start:start + step]
+            if recompute:
+                store.delete("sentiment_chunks", store.make_key("sentiment_chunks", sentiment_key, start))
+
+            def progress(done, total, offset=start):
+                if sentiment_progress:
+                    sentiment_progress(offset + done, len(unique_text))
+
+            chunk_scores, cached = store.get_or_compute(
+                "sentiment_chunks", store.make_key("sentiment_chunks", sentiment_key, start),
+                lambda: analyzer.predict(chunk, progress_callback=progress))
+            if cached and sentiment_progress:
+                sentiment_progress(start + len(chunk), len(unique_text))
+            scores.extend(chunk_scores)
+        return dedup.broadcast(scores).tolist()
+
+    sentiment_scores = run("sentiment", sentiment_key, score_sentiment)
+    # The full result is stored now, the per-chunk checkpoints are no longer needed
+    for start in range(0, len(unique_text), config.SENTIMENT_CHECKPOINT_ROWS):
+        store.delete("sentiment_chunks", store.make_key("sentiment_chunks", sentiment_key, start))
+
+    # Per-review outputs in columnar form: int16 topics, int8 sentiment, memory-mapped
+    # probabilities. Features and the app read from here instead of Python lists.
+    results_path = store.root / "results" / store.make_key("results", topic_key, sentiment_key,
+                                                           config.RESULTS_PROB_DTYPE)
+    if ResultStore.exists(results_path) and not recompute:
+        result_store = ResultStore(results_path)
+    else:
+        with instrumentation.stage("result_store", items=len(df)):
+            result_store = ResultStore.write(results_path, df, topics, sentiment_scores, topic_probs=probs)
+    topics, sentiment_scores = result_store.column("topic"), result_store.column("sentiment")
+    if result_store.topic_probs() is not None:
+        probs = result_store.topic_probs()
+    df['sentiment_score'] = sentiment_scores
+
+    # Per-topic summary for the topic map, bounded by VIZ_MAX_TOPICS
+    topic_map_key = store.make_key("topic_map", results_path.name, config.VIZ_MAX_TOPICS)
+    if recompute:
+        store.delete("topic_map", topic_map_key)
+    topic_map, _ = store.get_or_compute(
+        "topic_map", topic_map_key,
+        lambda: summarize_topics(topic_output["topic_info"], topic_output["topic_modeler"].get_topic_embeddings(),
+                                 result_store.topic_summary()))
+
+    # Feature engineering
+    # Features are built from the stored probabilities, so their dtype is part of the key
+    features_key = store.make_key("features", data_key, topic_key, sentiment_key, config.RESULTS_PROB_DTYPE)
+
+    def build_features():
+        columns = result_store.read(["rating", "topic", "sentiment"])
+        # BERTopic can return a 1D array (only the assigned topic's probability),
+        # in which case we fall back to the dominant topic only.
+        return create_features(columns, columns["topic"].to_numpy(), columns["sentiment"].to_numpy(),
+                               topic_probs=result_store.topic_probs())
+
+    X, y = run("features", features_key, build_features)
+
+    # Model selection
+    model_key = store.make_key("model", features_key, config.MODEL_SELECTION_CV_FOLDS)
+
+    def train_models():
+        from src.models import ModelTrainer
+        trainer = ModelTrainer()
+        trainer.train_and_evaluate(X, y)
+        return trainer
+
+    trainer = run("model", model_key, train_models)
+
+    # Versioned copy of the best model with its feature columns and CV metrics,
+    # so serving / explanation can load it without retraining
+    registry = ModelRegistry()
+    if registry.find(features_key) is None:
+        registry.register(trainer.best_model, X.columns, trainer.results[trainer.best_model_name],
+                          data_fingerprint=features_key, model_name=trainer.best_model_name, n_rows=len(y),
+                          training="in_memory")
+
+    # Explainability
+    # The time budget (and the chunk size it is checked after) decide how many rows get
+    # explained, so a budget-truncated result is never loaded by a run without one
+    shap_key = store.make_key("shap", model_key, config.SHAP_MAX_SAMPLES, config.SHAP_BACKGROUND_SIZE,
+                              config.SHAP_TREE_PERTURBATION, config.SHAP_TIME_BUDGET, config.SHAP_CHUNK_SIZE)
+
+    def explain():
+        from src.explainability import SHAPExplainer
+        explainer = SHAPExplainer(trainer.best_model, X)
+        explainer.calculate_shap()
+        # Plots only need the values and their summary; the live explainer object is not stored
+        explainer.summarize()
+        explainer.explainer = None
+        return explainer
+
+    explainer = run("shap", shap_key, explain)
+
+    # Latest run's models and SHAP background for the scoring service (src/serving.py)
+    from src.serving import save_scoring_bundle
+    # Registered models it can serve instead: this run's in-memory model, and models
+    # retrained out of core on this run's result store (src/retrain.py)
+    fingerprints = [features_key, ModelRegistry.make_fingerprint(results_path.name, list(X.columns))]
+    save_scoring_bundle(store.make_key("scoring", topic_key, sentiment_key, shap_key), topic_output["topic_modeler"],
+                        trainer, explainer, X.columns, sentiment_model, sentiment_backend,
+                        data_fingerprints=fingerprints)
+
+    return {
+        "df": df,
+        "domain": domain,
+        "topic_modeler": topic_output["topic_modeler"],
+        "result_store": result_store,
+        "topics": topics,
+        "probs": probs,
+        "topic_info": topic_output["topic_info"],
+        "topic_map": topic_map,
+        "sentiment_scores": sentiment_scores,
+        "X": X,
+        "y": y,
+        "trainer": trainer,
+        "results": trainer.results,
+        "best_model_name": trainer.best_model_name,
+        "explainer": explainer,
+        "dedup": dedup.summary(),
+        "cached_stages": cached_stages,
+        "performance": instrumentation.report(),
+    }
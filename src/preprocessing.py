@@ -1,5 +1,6 @@
 import re
 import string
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 # Note: For a full production system we might use spaCy or NLTK. 
 # Given the constraints and 'uv' requirement, we'll use simple regex or basic NLTK if installed.
@@ -11,19 +12,79 @@ import pandas as pd
 # or use a regex based cleaner as the primary step for BERTopic (which handles its own preprocessing usually).
 # But the prompt explicitly asks for these functions.
 
+# Patterns are compiled once instead of on every call. The bracket, URL and HTML
+# patterns must stay separate, ordered passes: merging them into one alternation
+# changes the result when matches overlap (e.g. "<a[b>c]").
+_BRACKETS_RE = re.compile(r'\[.*?\]')
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_HTML_RE = re.compile(r'<.*?>+')
+# Same matches as r'\w*\d\w*' (every maximal run of word characters containing a
+# digit) but anchored at word starts, so words without digits are rejected in one
+# scan instead of once per character. The leading run cannot contain a digit, so
+# backtracking into it never helps (no possessive quantifiers, which need 3.11+).
+_DIGIT_WORDS_RE = re.compile(r'\b[^\W\d]*\d\w*')
+_DIGIT_RE = re.compile(r'\d')
+# Punctuation removal and newline -> space touch disjoint characters, so they
+# merge into a single str.translate pass.
+_TRANSLATE_TABLE = str.maketrans({**{c: None for c in string.punctuation}, '\n': ' '})
+
+# Joins a chunk of reviews for the column-level passes. It is neither a word
+# character nor punctuation, so no pass can match across it.
+_CHUNK_SEP = '\x00'
+
+def _strip_markup(text: str) -> str:
+    # Cheap substring checks skip regex passes that cannot match
+    if '[' in text:
+        text = _BRACKETS_RE.sub('', text)
+    if 'http' in text or 'www.' in text:
+        text = _URL_RE.sub('', text)
+    if '<' in text:
+        text = _HTML_RE.sub('', text)
+    return text
+
 def clean_text(text: str) -> str:
     """
     Cleans text by removing special characters, lowercasing, etc.
     """
-    text = str(text).lower()
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'<.*?>+', '', text)
-    text = re.sub(r'[%s]' % re.escape(string.punctuation), '', text)
-    text = re.sub(r'\n', ' ', text)
-    text = re.sub(r'\w*\d\w*', '', text)
+    text = _strip_markup(str(text).lower())
+    text = text.translate(_TRANSLATE_TABLE)
+    if _DIGIT_RE.search(text):
+        text = _DIGIT_WORDS_RE.sub('', text)
     return text.strip()
 
+def _clean_chunk(texts: list) -> list:
+    """
+    clean_text over a list of reviews. Markup removal runs per review (those
+    patterns can span characters); punctuation and digit-word removal run once
+    over the whole chunk joined by _CHUNK_SEP.
+    """
+    stripped = [_strip_markup(str(t).lower()) for t in texts]
+    joined = _CHUNK_SEP.join(stripped)
+    if joined.count(_CHUNK_SEP) != len(stripped) - 1:
+        # A review contains the separator itself, fall back to per-review passes
+        return [clean_text(t) for t in texts]
+
+    joined = joined.translate(_TRANSLATE_TABLE)
+    if _DIGIT_RE.search(joined):
+        joined = _DIGIT_WORDS_RE.sub('', joined)
+    return [t.strip() for t in joined.split(_CHUNK_SEP)]
+
+def clean_text_series(texts: pd.Series, n_jobs: int = 1, chunksize: int = 50_000) -> pd.Series:
+    """
+    Column-level clean_text with identical output.
+
+    Avoids the per-row overhead of Series.apply, and with n_jobs > 1 spreads
+    chunks of `chunksize` reviews across worker processes.
+    """
+    values = texts.tolist()
+    if n_jobs > 1 and len(values) > chunksize:
+        chunks = [values[i:i+chunksize] for i in range(0, len(values), chunksize)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            cleaned = [t for chunk in executor.map(_clean_chunk, chunks) for t in chunk]
+    else:
+        cleaned = _clean_chunk(values)
+    return pd.Series(cleaned, index=texts.index, dtype=object)
+
 def tokenize_and_pos_tag(texts: list[str]):
     """
     Tokenizes and performs POS tagging.
@@ -58,9 +119,9 @@ def filter_tokens_by_pos(tagged_texts, allowed_tags={'NOUN', 'ADJ', 'VERB'}):
         filtered.append(" ".join(tokens))
     return filtered
 
-def preprocess_pipeline(df: pd.DataFrame, domain: str = "mha") -> pd.DataFrame:
+def preprocess_pipeline(df: pd.DataFrame, domain: str = "mha", n_jobs: int = 1) -> pd.DataFrame:
     """
     Full preprocessing pipeline.
     """
-    df['clean_text'] = df['review_text'].apply(clean_text)
+    df['clean_text'] = clean_text_series(df['review_text'], n_jobs=n_jobs)
     return df
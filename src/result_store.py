@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.artifacts import publish_dir, resolve_latest
+
+# Per-review columns and their on-disk types. The 1-5 sentiment fits int8 and
+# topic ids (-1 = outlier) int16; text is stored as Arrow strings.
+COLUMN_TYPES = {
+    "review_text": "string",
+    "clean_text": "string",
+    "rating": "float64",  # targets; float32 would turn 2.1 into 2.0999999
+    "topic": "int16",
+    "sentiment": "int8",
+}
+
+class ResultStore:
+    """
+    Columnar store of per-review pipeline outputs, one directory per run (the
+    version `LATEST` points at under the run's key directory):
+
+    - reviews.parquet: review_text, clean_text, rating, topic (int16), sentiment (int8)
+    - topic_probs.npy: (n_reviews, n_topics) probability matrix, float32 or float16,
+      opened with mmap so only the rows touched are paged in
+    - meta.json: row count, topic count, dtypes. Written last, so its presence
+      marks a complete store.
+
+    Aggregates (per-topic rating / sentiment) stream over Parquet batches of the
+    columns they need, so they run over millions of reviews in bounded memory.
+    """
+
+    REVIEWS_FILE = "reviews.parquet"
+    PROBS_FILE = "topic_probs.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, path):
+        # The version LATEST points at; stores written before versioning have no pointer
+        self.path = resolve_latest(path)
+        with open(self.path / self.META_FILE) as f:
+            self.meta = json.load(f)
+
+    @classmethod
+    def exists(cls, path) -> bool:
+        return (resolve_latest(path) / cls.META_FILE).exists()
+
+    @classmethod
+    def write(cls, path, df: pd.DataFrame, topics, sentiment_scores, topic_probs=None,
+              prob_dtype=None, row_group_size=None) -> "ResultStore":
+        """
+        Writes df['review_text', 'clean_text', 'rating'] with topics and sentiment
+        scores, plus the probability matrix when it is 2D, and returns the store.
+
+        Each write is published as a new write-once directory under `path` and
+        `path/LATEST` is pointed at it (see artifacts.publish_dir). A previous
+        version is left in place, so a job or the app still reading it lazily
+        (Parquet row groups, the probability memmap) is not affected.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = Path(path)
+        prob_dtype = np.dtype(prob_dtype or config.RESULTS_PROB_DTYPE)
+        row_group_size = row_group_size or config.RESULTS_ROW_GROUP_SIZE
+        topics = np.asarray(topics)
+        sentiment_scores = np.asarray(sentiment_scores)
+        text_col = "clean_text" if "clean_text" in df else "review_text"
+
+        def write_files(directory):
+            def chunk_frame(start, stop):
+                # Converted one row group at a time, so text columns are never copied in full
+                return pd.DataFrame({
+                    "review_text": df["review_text"].iloc[start:stop].to_numpy(),
+                    "clean_text": df[text_col].iloc[start:stop].to_numpy(),
+                    "rating": df["rating"].iloc[start:stop].to_numpy(),
+                    "topic": topics[start:stop],
+                    "sentiment": sentiment_scores[start:stop],
+                }).astype(COLUMN_TYPES)
+
+            n_reviews = len(df)
+            schema = pa.Schema.from_pandas(chunk_frame(0, 0), preserve_index=False)
+            with pq.ParquetWriter(directory / cls.REVIEWS_FILE, schema) as writer:
+                for start in range(0, n_reviews, row_group_size):
+                    chunk = chunk_frame(start, start + row_group_size)
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+            n_topics = None
+            if topic_probs is not None and np.ndim(topic_probs) == 2:
+                n_topics = int(topic_probs.shape[1])
+                out = np.lib.format.open_memmap(directory / cls.PROBS_FILE, mode="w+", dtype=prob_dtype,
+                                                shape=(n_reviews, n_topics))
+                # Copied in blocks, so a float64 input is never duplicated in full
+                for start in range(0, n_reviews, row_group_size):
+                    out[start:start + row_group_size] = topic_probs[start:start + row_group_size]
+                out.flush()
+                del out
+
+            meta = {"n_reviews": n_reviews, "n_topics": n_topics, "prob_dtype": prob_dtype.name,
+                    "columns": COLUMN_TYPES}
+            with open(directory / cls.META_FILE, "w") as f:
+                json.dump(meta, f, indent=2)
+
+        # This write's own version, even if a concurrent write moves LATEST on
+        return cls(publish_dir(path, f"{time.time_ns()}-{os.getpid()}-{threading.get_ident()}", write_files))
+
+    def __len__(self):
+        return self.meta["n_reviews"]
+
+    def read(self, columns: List[str] = None) -> pd.DataFrame:
+        """
+        Reads the given columns (all by default). Arrow buffers are released as
+        they are converted, so peak memory stays close to the final frame.
+        """
+        import pyarrow.parquet as pq
+        table = pq.read_table(self.path / self.REVIEWS_FILE, columns=columns, memory_map=True)
+        return table.to_pandas(self_destruct=True, split_blocks=True)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.read([name])[name].to_numpy()
+
+    def head(self, n: int = 10, columns: List[str] = None) -> pd.DataFrame:
+        batch = next(self.iter_batches(columns, batch_size=n), None)
+        return batch if batch is not None else self.read(columns).head(0)
+
+    def iter_batches(self, columns: List[str] = None, batch_size: int = None) -> Iterator[pd.DataFrame]:
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(self.path / self.REVIEWS_FILE, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=batch_size or config.RESULTS_ROW_GROUP_SIZE, columns=columns):
+            yield batch.to_pandas()
+
+    def topic_probs(self) -> np.ndarray:
+        """
+        The probability matrix as a read-only memmap, or None if it was not stored.
+        """
+        if self.meta["n_topics"] is None:
+            return None
+        return np.load(self.path / self.PROBS_FILE, mmap_mode="r")
+
+    def topic_summary(self) -> pd.DataFrame:
+        """
+        Per topic: review count, average rating, average sentiment and the share
+        of each sentiment score, computed in one streaming pass.
+        """
+        counts = sentiment_counts = rating_sums = None
+        for batch in self.iter_batches(["topic", "rating", "sentiment"]):
+            # Topic ids start at -1 (outliers); shift so they index bincount
+            topic = batch["topic"].to_numpy().astype(np.int64) + 1
+            sentiment = batch["sentiment"].to_numpy().astype(np.int64)
+            size = int(topic.max()) + 1 if len(topic) else 0
+            batch_counts = np.bincount(topic, minlength=size)
+            batch_ratings = np.bincount(topic, weights=batch["rating"].to_numpy(dtype=np.float64), minlength=size)
+            batch_sentiment = np.bincount(topic * 6 + sentiment, minlength=size * 6).reshape(-1, 6)
+            if counts is None:
+                counts, rating_sums, sentiment_counts = batch_counts, batch_ratings, batch_sentiment
+            else:
+                counts, rating_sums, sentiment_counts = (
+                    _add_padded(counts, batch_counts), _add_padded(rating_sums, batch_ratings),
+                    _add_padded(sentiment_counts, batch_sentiment))
+
+        if counts is None:
+            return pd.DataFrame(columns=["count", "avg_rating", "avg_sentiment"])
+        present = counts > 0
+        summary = pd.DataFrame({
+            "count": counts,
+            "avg_rating": rating_sums / np.maximum(counts, 1),
+            "avg_sentiment": (sentiment_counts * np.arange(6)).sum(axis=1) / np.maximum(counts, 1),
+        }, index=pd.Index(np.arange(len(counts)) - 1, name="topic"))
+        for score in range(1, 6):
+            summary[f"sentiment_{score}_share"] = sentiment_counts[:, score] / np.maximum(counts, 1)
+        return summary[present]
+
+    def sentiment_counts(self) -> pd.Series:
+        counts = np.zeros(6, dtype=np.int64)
+        for batch in self.iter_batches(["sentiment"]):
+            counts += np.bincount(batch["sentiment"].to_numpy().astype(np.int64), minlength=6)[:6]
+        return pd.Series(counts[1:], index=pd.RangeIndex(1, 6, name="sentiment"), name="count")
+
+def _add_padded(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Batches can see different max topic ids; grow along the first axis
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
@@ -0,0 +1,55 @@
+"""
+Retrains the rating model out of core on the per-review results of a pipeline
+run and registers it as a new model version.
+
+    python -m src.retrain models/artifacts/results/<key> --models LightGBM SGD
+
+Features are streamed from the result store (topic probabilities stay memory
+mapped), so memory stays bounded however many reviews the run had. The
+registered model can then be served or explained without retraining
+(python -m src.serving --model-version N).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from src import config
+from src.features import FeatureStream
+from src.model_registry import ModelRegistry
+from src.models import OutOfCoreTrainer
+from src.result_store import ResultStore
+
+def latest_result_store(root=None) -> Path:
+    root = Path(root) if root is not None else config.ARTIFACTS_DIR / "results"
+    stores = [p for p in root.iterdir() if ResultStore.exists(p)] if root.exists() else []
+    if not stores:
+        raise FileNotFoundError(f"No result stores under {root}; run the pipeline first")
+    return max(stores, key=lambda p: (ResultStore(p).path / ResultStore.META_FILE).stat().st_mtime)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("results", nargs="?", default=None, help="Result store directory, default: the latest one")
+    parser.add_argument("--models", nargs="+", default=["LightGBM", "SGD"], choices=["LightGBM", "SGD"])
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Feature rows in memory at a time")
+    parser.add_argument("--registry", default=None, help="Registry root, default: models/registry")
+    args = parser.parse_args(argv)
+
+    path = Path(args.results) if args.results else latest_result_store()
+    stream = FeatureStream(ResultStore(path))
+    print(f"Training on {len(stream)} reviews, {len(stream.columns)} features from {path}")
+
+    # The result store directory name is a hash of the run's topic and sentiment outputs
+    fingerprint = ModelRegistry.make_fingerprint(path.name, stream.columns)
+    registry = ModelRegistry(args.registry)
+    trainer = OutOfCoreTrainer(args.models, chunk_size=args.chunk_rows)
+    results, best = trainer.train_and_evaluate(stream, fingerprint=fingerprint)
+    for name, metrics in results.items():
+        print(f"{name}: RMSE {metrics['RMSE']:.4f}, R2 {metrics['R2']:.4f} ({metrics['Time (s)']:.1f}s)")
+
+    version = registry.register(trainer.best_model, stream.columns, results[best], data_fingerprint=fingerprint,
+                                model_name=best, n_rows=len(stream), training="out_of_core")
+    print(f"Registered {best} as version {version}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
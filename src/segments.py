@@ -0,0 +1,144 @@
+import os
+from concurrent.futures import as_completed
+from typing import List
+
+import numpy as np
+import pandas as pd
+from joblib.externals.loky import get_reusable_executor
+
+from src import config
+from src.artifacts import ArtifactStore
+
+def detect_segment_columns(df: pd.DataFrame, max_values: int = None, candidates: List[str] = None) -> List[str]:
+    """
+    Columns that can split reviews into segments (app, agent, location, ...):
+    the `candidates` (default SEGMENT_COLUMNS) present in df with 2..max_values
+    distinct values. Pipeline outputs such as sentiment_score are never offered.
+    """
+    max_values = max_values or config.SEGMENT_MAX_VALUES
+    candidates = set(config.SEGMENT_COLUMNS if candidates is None else candidates)
+    return [c for c in df.columns if c in candidates and 2 <= df[c].nunique(dropna=True) <= max_values]
+
+def segment_labels(df: pd.DataFrame, segment_column: str) -> np.ndarray:
+    # Missing values form their own segment rather than being dropped
+    return df[segment_column].astype("string").fillna("(missing)").to_numpy(dtype=object)
+
+def topic_names(topic_info) -> dict:
+    """
+    Feature name ("Topic_3") -> BERTopic's representative name of that topic.
+    """
+    if topic_info is None or 'Topic' not in topic_info or 'Name' not in topic_info:
+        return {}
+    return {f"Topic_{t}": name for t, name in zip(topic_info['Topic'], topic_info['Name'])}
+
+def top_determinants(explainer, names: dict = None, top_k: int = None) -> str:
+    """
+    The top_k features by mean |SHAP value|, e.g. "0_delivery_late (0.41), ...".
+    """
+    names = names or {}
+    top_k = top_k or config.SEGMENT_TOP_DETERMINANTS
+    importance = pd.Series(np.abs(explainer.shap_values).mean(axis=0), index=explainer.X.columns)
+    top = importance.sort_values(ascending=False).head(top_k)
+    return ", ".join(f"{names.get(feature, feature)} ({value:.2f})" for feature, value in top.items())
+
+def _fit_segment(segment, X, y, names: dict, top_k: int) -> dict:
+    """
+    Model selection and SHAP for one segment's rows. Runs in a pool worker, so
+    both stay in-process here instead of starting pools of their own.
+    """
+    from src.models import ModelTrainer
+    from src.explainability import SHAPExplainer
+
+    trainer = ModelTrainer()
+    trainer.train_and_evaluate(X, y, n_jobs=1)
+    best = trainer.results[trainer.best_model_name]
+
+    explainer = SHAPExplainer(trainer.best_model, X, max_samples=config.SEGMENT_SHAP_MAX_SAMPLES, n_jobs=1,
+                              use_cache=False)
+    explainer.calculate_shap()
+
+    return {
+        "segment": segment,
+        "reviews": len(y),
+        "avg_rating": float(np.mean(y)),
+        "best_model": trainer.best_model_name,
+        "RMSE": best["RMSE"],
+        "R2": best["R2"],
+        "top_determinants": top_determinants(explainer, names, top_k),
+    }
+
+def compare_segments(result: dict, segment_column: str, min_reviews: int = None, n_jobs: int = None,
+                     top_k: int = None, store: ArtifactStore = None) -> pd.DataFrame:
+    """
+    Fits a model and finds the top SHAP determinants per value of `segment_column`.
+
+    Builds on one global run_pipeline result: embeddings, topics and sentiment
+    were computed once for all reviews with the shared models, and each
+    segment's features are a row slice of the global feature matrix, so all
+    segments share one topic space and their determinants are comparable.
+    Only model selection and SHAP run per segment, in parallel on a pool of
+    `n_jobs` processes. Segments with fewer than `min_reviews` reviews are skipped.
+
+    Returns one row per segment, sorted by RMSE, after an "All" row for the global model.
+    """
+    min_reviews = min_reviews or config.SEGMENT_MIN_REVIEWS
+    n_jobs = n_jobs or config.SEGMENT_N_JOBS or os.cpu_count() or 1
+    top_k = top_k or config.SEGMENT_TOP_DETERMINANTS
+    store = store or ArtifactStore()
+
+    labels = segment_labels(result["df"], segment_column)
+    X, y = result["X"], np.asarray(result["y"])
+    names = topic_names(result.get("topic_info"))
+
+    def fit_segments():
+        values, counts = np.unique(labels, return_counts=True)
+        executor = get_reusable_executor(max_workers=n_jobs)
+        futures = {}
+        # Largest segments first, so they do not end up as the tail of the pool
+        for value in values[np.argsort(-counts, kind="stable")][:np.sum(counts >= min_reviews)]:
+            rows = np.flatnonzero(labels == value)
+            futures[executor.submit(_fit_segment, value, X.iloc[rows].reset_index(drop=True), y[rows],
+                                    names, top_k)] = value
+        segment_rows, failed = [], []
+        for future in as_completed(futures):
+            try:
+                segment_rows.append(future.result())
+            except Exception as e:
+                print(f"Segment '{futures[future]}' failed: {e}")
+                failed.append(futures[future])
+        return segment_rows, failed
+
+    key = store.make_key("segments", X, y, labels, min_reviews, top_k, config.MODEL_SELECTION_CV_FOLDS,
+                         config.SEGMENT_SHAP_MAX_SAMPLES, config.SHAP_TIME_BUDGET, config.SHAP_CHUNK_SIZE)
+    if store.has("segments", key):
+        segment_rows = store.load("segments", key)
+    else:
+        segment_rows, failed = fit_segments()
+        # A table missing a failed segment is shown for this run only, so the next run retries it
+        if not failed:
+            store.save("segments", key, segment_rows)
+
+    best = result["results"][result["best_model_name"]]
+    overall = {
+        "segment": "All",
+        "reviews": len(y),
+        "avg_rating": float(np.mean(y)),
+        "best_model": result["best_model_name"],
+        "RMSE": best["RMSE"],
+        "R2": best["R2"],
+        "top_determinants": top_determinants(result["explainer"], names, top_k),
+    }
+    table = pd.DataFrame([overall] + sorted(segment_rows, key=lambda r: r["RMSE"]))
+    return table.set_index("segment")
+
+def run_segmented(df: pd.DataFrame, domain: str, segment_column: str, store: ArtifactStore = None,
+                  min_reviews: int = None, n_jobs: int = None, **pipeline_kwargs):
+    """
+    run_pipeline over all reviews followed by compare_segments.
+    Returns (pipeline result, comparison table).
+    """
+    from src.pipeline import run_pipeline
+
+    store = store or ArtifactStore()
+    result = run_pipeline(df, domain, store=store, **pipeline_kwargs)
+    return result, compare_segments(result, segment_column, min_reviews, n_jobs, store=store)
@@ -1,22 +1,271 @@
-from transformers import pipeline
+import logging
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import time
 import pandas as pd
 import numpy as np
 
+from src import config
+from src.batching import plan_batches
+from src.cache import get_default_cache
+
+logger = logging.getLogger(__name__)
+
+# torch / transformers (and onnxruntime) are imported where they are used
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+# Analyzer of a pool worker process, set once by _init_worker in that process
+_worker_analyzer = None
+
+def _init_worker(analyzer, model_name, backend, max_tokens_per_batch, num_threads):
+    global _worker_analyzer
+    import torch
+    torch.set_num_threads(num_threads)
+    if analyzer is not None:
+        # "fork": the parent's analyzer is inherited as an initarg (not pickled), weights shared copy-on-write
+        _worker_analyzer = analyzer
+        if analyzer.backend == "onnx":
+            # The inherited session keeps the parent's intra-op thread count; rebuild it with this worker's share
+            analyzer.num_threads = num_threads
+            analyzer._load_backend()
+    else:
+        # from_pretrained memory-maps safetensors weights, so the OS page cache is shared
+        _worker_analyzer = SentimentAnalyzer(model_name, use_cache=False, max_tokens_per_batch=max_tokens_per_batch,
+                                             num_threads=num_threads, backend=backend)
+
+def _logits_module(model, input_names):
+    """
+    Positional-argument wrapper that returns plain logits, used for ONNX export.
+    """
+    import torch
+
+    class LogitsModule(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).logits
+
+    return LogitsModule()
+
+def _score_shard(texts):
+    return _worker_analyzer._compute_logits(texts)
+
 class SentimentAnalyzer:
-    def __init__(self, model_name="nlptown/bert-base-multilingual-uncased-sentiment"):
-        self.pipe = pipeline("sentiment-analysis", model=model_name, tokenizer=model_name, truncation=True, max_length=512)
+    def __init__(self, model_name="nlptown/bert-base-multilingual-uncased-sentiment", use_cache=True, cache=None,
+                 max_tokens_per_batch=None, num_threads=None, num_workers=None, backend=None):
+        self.model_name = model_name
+        self.backend = backend or config.SENTIMENT_BACKEND
+        if self.backend not in BACKENDS:
+            # Checked before any model is loaded
+            raise ValueError(f"Unknown sentiment backend '{self.backend}'. Use 'torch', 'torch_int8' or 'onnx'.")
+        import torch
+        from transformers import pipeline
+
+        self.num_workers = num_workers or config.SENTIMENT_NUM_WORKERS
+        self.pipe = pipeline("sentiment-analysis", model=model_name, tokenizer=model_name, truncation=True, max_length=config.SENTIMENT_MAX_LENGTH)
+        self.max_tokens_per_batch = max_tokens_per_batch or config.SENTIMENT_MAX_TOKENS_PER_BATCH
+        self.num_threads = num_threads or config.SENTIMENT_NUM_THREADS
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self._load_backend()
+        # Map logit index -> star rating, e.g. {0: '1 star', ..., 4: '5 stars'} -> [1, ..., 5]
+        id2label = self.pipe.model.config.id2label
+        self.label_scores = [int(id2label[i].split()[0]) for i in range(len(id2label))]
+        # Raw logits are cached on disk keyed by (model, cleaned text). Non-FP32
+        # backends produce slightly different logits, so they get their own entries.
+        self.cache_model_name = model_name if self.backend == "torch" else f"{model_name}@{self.backend}"
+        if use_cache and config.EMBEDDING_CACHE_ENABLED:
+            self.cache = cache if cache is not None else get_default_cache()
+        else:
+            self.cache = None
 
-    def predict(self, texts: list[str]) -> list[int]:
+    def _load_backend(self):
+        if self.backend == "torch":
+            self.model = self.pipe.model
+        elif self.backend == "torch_int8":
+            import torch
+            # Dynamic quantization: int8 weights for Linear layers, activations quantized on the fly
+            self.model = torch.quantization.quantize_dynamic(self.pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.backend == "onnx":
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            self.model = ort.InferenceSession(str(self._export_onnx()), options, providers=["CPUExecutionProvider"])
+            self.onnx_input_names = [i.name for i in self.model.get_inputs()]
+        else:
+            raise ValueError(f"Unknown sentiment backend '{self.backend}'. Use 'torch', 'torch_int8' or 'onnx'.")
+
+    def _export_onnx(self):
+        """
+        Exports the FP32 model to ONNX once and returns the file path.
+        """
+        path = config.ONNX_DIR / (self.model_name.replace("/", "__") + ".onnx")
+        if path.exists():
+            return path
+
+        import torch
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tokenizer = self.pipe.tokenizer
+        input_names = list(tokenizer.model_input_names)
+        dummy = tokenizer(["onnx export sample"], return_tensors="pt")
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        with torch.inference_mode():
+            torch.onnx.export(
+                _logits_module(self.pipe.model.eval(), input_names),
+                tuple(dummy[name] for name in input_names),
+                str(path),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=config.ONNX_OPSET,
+            )
+        return path
+
+    def _forward(self, features) -> np.ndarray:
+        """
+        Pads one batch of tokenized features and returns its logits.
+        """
+        tokenizer = self.pipe.tokenizer
+        if self.backend == "onnx":
+            batch = tokenizer.pad(features, return_tensors="np")
+            feeds = {name: batch[name].astype(np.int64) for name in self.onnx_input_names}
+            return self.model.run(["logits"], feeds)[0].astype(np.float32)
+
+        batch = tokenizer.pad(features, return_tensors="pt")
+        batch = {k: v.to(self.pipe.model.device) for k, v in batch.items()}
+        return self.model(**batch).logits.float().cpu().numpy()
+
+    def _compute_logits(self, texts: list[str], progress_callback=None) -> np.ndarray:
+        """
+        Runs the model over texts in length-bucketed, dynamically padded batches.
+
+        Texts are tokenized without padding, sorted by token length within a window
+        of SENTIMENT_SORT_WINDOW reviews and grouped under a padded-token budget, so
+        short reviews are no longer padded to the longest review of a fixed batch.
+        Logits are scattered back into input order.
+        """
+        import torch
+        tokenizer = self.pipe.tokenizer
+        window = config.SENTIMENT_SORT_WINDOW
+        logits_out = np.empty((len(texts), len(self.label_scores)), dtype=np.float32)
+
+        with torch.inference_mode():
+            for start in range(0, len(texts), window):
+                chunk = texts[start:start + window]
+                encodings = tokenizer(chunk, truncation=True, max_length=config.SENTIMENT_MAX_LENGTH)
+                lengths = [len(ids) for ids in encodings["input_ids"]]
+                for idx in plan_batches(lengths, self.max_tokens_per_batch, config.SENTIMENT_MAX_BATCH_SIZE):
+                    features = [{k: encodings[k][i] for k in encodings.keys()} for i in idx]
+                    logits_out[start + idx] = self._forward(features)
+                if progress_callback:
+                    progress_callback(min(start + window, len(texts)), len(texts))
+        return logits_out
+
+    def _compute_logits_parallel(self, texts: list[str], progress_callback=None) -> np.ndarray:
+        """
+        Shards texts across a pool of worker processes, each holding one model.
+
+        Shards are returned in order (executor.map), so results line up with the
+        input. Falls back to the single-process path if the pool cannot be started
+        or a worker fails; the failure is logged. A worker that dies breaks the
+        pool (BrokenProcessPool) instead of leaving its shard waiting forever.
+        """
+        shard_size = config.SENTIMENT_SHARD_SIZE
+        shards = [texts[i:i+shard_size] for i in range(0, len(texts), shard_size)]
+        num_workers = min(self.num_workers, len(shards))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+
+        start_method = config.SENTIMENT_MP_START_METHOD
+        if start_method is None:
+            # Forking is only safe from the main thread: from a background thread (a
+            # JobRegistry job in the app server) other threads' locks are copied held
+            use_fork = "fork" in mp.get_all_start_methods() and threading.current_thread() is threading.main_thread()
+            start_method = "fork" if use_fork else "spawn"
+        initargs = (self if start_method == "fork" else None, self.model_name, self.backend,
+                    self.max_tokens_per_batch, threads_per_worker)
+
+        outputs = []
+        done = 0
+        try:
+            ctx = mp.get_context(start_method)
+            with ProcessPoolExecutor(num_workers, mp_context=ctx, initializer=_init_worker,
+                                     initargs=initargs) as executor:
+                for shard, logits in zip(shards, executor.map(_score_shard, shards)):
+                    outputs.append(logits)
+                    done += len(shard)
+                    if progress_callback:
+                        progress_callback(done, len(texts))
+        except Exception as e:
+            # Pool start-up failures, crashed workers (BrokenProcessPool) and pickling errors alike
+            logger.warning("Parallel sentiment scoring failed (%s: %s), falling back to a single process",
+                           type(e).__name__, e)
+            return self._compute_logits(texts, progress_callback)
+
+        return np.concatenate(outputs)
+
+    def predict_logits(self, texts: list[str], progress_callback=None) -> np.ndarray:
+        """
+        Returns raw model logits of shape (n_texts, n_labels).
+
+        progress_callback(done, total) is called as uncached texts are scored.
+        """
+        def compute(batch):
+            # Only worth paying pool start-up when there is more than one shard of work
+            if self.num_workers > 1 and len(batch) > config.SENTIMENT_SHARD_SIZE:
+                return self._compute_logits_parallel(batch, progress_callback)
+            return self._compute_logits(batch, progress_callback)
+
+        if self.cache is None:
+            return compute(texts)
+        return self.cache.get_or_compute(texts, self.cache_model_name, "logits", compute)
+
+    def predict(self, texts: list[str], progress_callback=None) -> list[int]:
         """
         Returns integer sentiment score 1-5.
         """
-        # Process in batches to avoid memory issues if list is huge
-        results = []
-        # Simple loop for clarity, batching could be added
-        for i in range(0, len(texts), 32):
-            batch = texts[i:i+32]
-            preds = self.pipe(batch)
-            # preds example: [{'label': '5 stars', 'score': 0.9}]
-            scores = [int(p['label'].split()[0]) for p in preds]
-            results.extend(scores)
-        return results
+        if len(texts) == 0:
+            return []
+        logits = self.predict_logits(texts, progress_callback)
+        # argmax of the logits is the same label the pipeline would report
+        return [self.label_scores[i] for i in logits.argmax(axis=1)]
+
+def check_backend_parity(texts: list[str], backend: str, reference: str = "torch", sample_size: int = 500,
+                         model_name: str = config.SENTIMENT_MODEL, seed: int = 42) -> dict:
+    """
+    Compares the 1-5 star labels of `backend` against `reference` (FP32 torch by
+    default) on a random sample of texts, and times both on the same sample.
+
+    Returns exact agreement, agreement within one star, mean absolute star
+    difference and the speedup of `backend` over `reference`.
+    """
+    rng = np.random.default_rng(seed)
+    if len(texts) > sample_size:
+        texts = [texts[i] for i in sorted(rng.choice(len(texts), size=sample_size, replace=False))]
+
+    timings = {}
+    labels = {}
+    for name in (reference, backend):
+        analyzer = SentimentAnalyzer(model_name, use_cache=False, num_workers=1, backend=name)
+        analyzer._compute_logits(texts[:8])  # warm-up
+        start = time.perf_counter()
+        labels[name] = np.array(analyzer.predict(texts))
+        timings[name] = time.perf_counter() - start
+
+    diff = np.abs(labels[backend] - labels[reference])
+    return {
+        "backend": backend,
+        "reference": reference,
+        "n_samples": len(texts),
+        "agreement": float((diff == 0).mean()),
+        "within_one_star": float((diff <= 1).mean()),
+        "mean_abs_star_diff": float(diff.mean()),
+        "reference_seconds": timings[reference],
+        "backend_seconds": timings[backend],
+        "speedup": timings[reference] / timings[backend] if timings[backend] > 0 else float("inf"),
+    }
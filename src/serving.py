@@ -0,0 +1,308 @@
+"""
+Long-lived local scoring service for single reviews.
+
+    python -m src.serving --port 8765
+
+Loads the scoring bundle written by the last pipeline run (topic model, best
+model, SHAP background) and the sentiment model once, then answers:
+
+    POST /score   {"text": "..."} or {"texts": ["...", ...]}
+    GET  /stats   request count, batch sizes, p50 / p99 latency
+    GET  /health
+
+Concurrent requests are coalesced into micro-batches: a batch is scored as soon
+as it reaches SCORING_MAX_BATCH reviews or SCORING_MAX_WAIT_MS after its first
+review arrived, whichever comes first.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src import config
+from src.artifacts import publish_dir, resolve_latest
+from src.features import create_features
+from src.preprocessing import clean_text
+
+BUNDLE_FILE = "bundle.joblib"
+KEY_FILE = "key.txt"
+TOPIC_MODEL_SUBDIR = "topic_model"
+
+logger = logging.getLogger(__name__)
+
+def save_scoring_bundle(key: str, topic_modeler, trainer, explainer, feature_names, sentiment_model: str,
+                        sentiment_backend: str, path=None, data_fingerprints=()) -> Path:
+    """
+    Writes everything the scoring service needs for one pipeline run to
+    `path/<key>` (default SCORING_DIR) and makes it the latest bundle. Each run
+    gets its own directory, so concurrent runs do not overwrite each other.
+
+    `data_fingerprints`: registry fingerprints of models trained on this run's
+    features (same topic space), which Scorer(model_version=...) accepts.
+    """
+    def write(bundle_path: Path):
+        topic_modeler.save(bundle_path / TOPIC_MODEL_SUBDIR)
+        joblib.dump({
+            "key": key,
+            "model": trainer.best_model,
+            "model_name": trainer.best_model_name,
+            "feature_names": list(feature_names),
+            # Values were computed on a sample; its rows give the SHAP background
+            "explainer": explainer,
+            "sentiment_model": sentiment_model,
+            "sentiment_backend": sentiment_backend,
+            "data_fingerprints": list(data_fingerprints),
+        }, bundle_path / BUNDLE_FILE)
+        (bundle_path / KEY_FILE).write_text(key)
+
+    return publish_dir(path if path is not None else config.SCORING_DIR, key, write)
+
+class Scorer:
+    """
+    Scores batches of raw reviews with the artifacts of a pipeline run.
+    """
+
+    def __init__(self, path=None, sentence_model=None, sentiment_analyzer=None, model_version=None, registry=None):
+        from src.topic_modeling import TopicModeler
+        from src.sentiment_analysis import SentimentAnalyzer
+
+        # A bundle directory, or a root whose LATEST bundle is used
+        path = resolve_latest(path if path is not None else config.SCORING_DIR)
+        bundle = joblib.load(path / BUNDLE_FILE)
+        self.model = bundle["model"]
+        self.model_name = bundle["model_name"]
+        self.feature_names = bundle["feature_names"]
+        if model_version is not None:
+            # A registered model (e.g. retrained out of core) in place of the bundle's
+            from src.model_registry import ModelRegistry
+            model, meta = (registry or ModelRegistry()).load(model_version)
+            # The bundle's topic model and SHAP background define the Topic_i columns; a model
+            # trained on another run's topics would score them as if they meant the same thing
+            if meta["data_fingerprint"] not in bundle.get("data_fingerprints", []):
+                raise ValueError(f"Model version {model_version} was trained on another run's data "
+                                 f"(fingerprint {meta['data_fingerprint']}) than the scoring bundle {path}")
+            if list(meta["feature_names"]) != list(self.feature_names):
+                raise ValueError(f"Model version {model_version} has different feature columns than "
+                                 f"the scoring bundle {path}")
+            self.model = model
+            self.model_name = meta["model_name"]
+            bundle["explainer"].model = self.model
+        self.topic_modeler = TopicModeler.load(path / TOPIC_MODEL_SUBDIR, use_cache=False, sentence_model=sentence_model)
+        self.sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer(
+            bundle["sentiment_model"], use_cache=False, backend=bundle["sentiment_backend"])
+
+        # The pipeline stores the explainer without its live shap object; rebuild it once
+        self.explainer = bundle["explainer"]
+        self.explainer.explainer = self.explainer._build_explainer(self.explainer._background())
+        self.expected_value = float(np.ravel(self.explainer.explainer.expected_value)[0])
+
+    def score_batch(self, texts: list) -> list:
+        cleaned = [clean_text(t) for t in texts]
+        topics, probs = self.topic_modeler.transform(cleaned)
+        sentiment = self.sentiment_analyzer.predict(cleaned)
+
+        frame = pd.DataFrame({'rating': np.zeros(len(texts))})
+        probs = probs if probs is not None and np.ndim(probs) == 2 else None
+        X, _ = create_features(frame, topics, sentiment, topic_probs=probs)
+        # Same columns, in the same order, as the model was trained on
+        X = X.reindex(columns=self.feature_names, fill_value=0.0)
+
+        predictions = self.model.predict(X)
+        contributions = np.asarray(self.explainer.explainer.shap_values(X))
+        return [
+            {
+                "topic": int(topics[i]),
+                "sentiment": int(sentiment[i]),
+                "predicted_rating": float(predictions[i]),
+                "base_value": self.expected_value,
+                # Only topics that contributed, largest effect first
+                "shap": {name: float(value) for name, value in
+                         sorted(zip(self.feature_names, contributions[i]), key=lambda kv: -abs(kv[1])) if value != 0},
+            }
+            for i in range(len(texts))
+        ]
+
+class MicroBatcher:
+    """
+    Coalesces concurrent `score` calls into batches for `score_fn(texts) -> results`.
+
+    One batch is scored at a time, in a worker thread, so the event loop keeps
+    accepting requests and the next batch fills while the current one runs.
+    """
+
+    def __init__(self, score_fn, max_batch=None, max_wait_ms=None, latency_window=None):
+        self.score_fn = score_fn
+        self.max_batch = max_batch or config.SCORING_MAX_BATCH
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else config.SCORING_MAX_WAIT_MS) / 1000
+        self.latencies = collections.deque(maxlen=latency_window or config.SCORING_LATENCY_WINDOW)
+        self.batch_sizes = collections.deque(maxlen=latency_window or config.SCORING_LATENCY_WINDOW)
+        self.requests = 0
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def score(self, text: str) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.score_fn, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.batch_sizes.append(len(batch))
+            for (_, future, submitted), result in zip(batch, results):
+                self.latencies.append(now - submitted)
+                self.requests += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        latencies = np.asarray(self.latencies) * 1000
+        return {
+            "requests": self.requests,
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else None,
+            "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+class ScoringServer:
+    """
+    Minimal HTTP/1.1 server (keep-alive, JSON bodies) on asyncio streams,
+    so the service needs nothing beyond the standard library.
+    """
+
+    def __init__(self, batcher: MicroBatcher, host=None, port=None):
+        self.batcher = batcher
+        self.host = host or config.SCORING_HOST
+        self.port = config.SCORING_PORT if port is None else port
+        self.server = None
+
+    async def start(self):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Resolves port 0 to the port actually bound
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, payload = await self._route(method, target, body)
+                except Exception as e:
+                    # e.g. score_fn failing for a batch: answer instead of dropping the connection
+                    logger.exception("Error handling %s %s", method, target)
+                    status, payload = "500 Internal Server Error", {"error": f"{type(e).__name__}: {e}"}
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        if method == "GET" and target == "/health":
+            return "200 OK", {"status": "ok"}
+        if method == "GET" and target == "/stats":
+            return "200 OK", self.batcher.stats()
+        if method == "POST" and target == "/score":
+            try:
+                request = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                return "400 Bad Request", {"error": "Body must be JSON"}
+            if "texts" in request:
+                results = await asyncio.gather(*(self.batcher.score(str(t)) for t in request["texts"]))
+                return "200 OK", {"results": list(results)}
+            if "text" in request:
+                return "200 OK", await self.batcher.score(str(request["text"]))
+            return "400 Bad Request", {"error": "Expected 'text' or 'texts'"}
+        return "404 Not Found", {"error": f"No route for {method} {target}"}
+
+async def serve(scorer: Scorer, host=None, port=None, max_batch=None, max_wait_ms=None):
+    server = await ScoringServer(MicroBatcher(scorer.score_batch, max_batch, max_wait_ms), host, port).start()
+    print(f"Scoring service ({scorer.model_name}) listening on http://{server.host}:{server.port}")
+    async with server.server:
+        await server.server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bundle", default=None, help="Scoring bundle directory, default: the latest one in models/scoring")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=None)
+    parser.add_argument("--max-wait-ms", type=float, default=None)
+    parser.add_argument("--model-version", type=int, default=None,
+                        help="Serve this version from the model registry instead of the bundle's model")
+    args = parser.parse_args(argv)
+
+    scorer = Scorer(args.bundle, model_version=args.model_version)
+    try:
+        asyncio.run(serve(scorer, args.host, args.port, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,339 @@
-from bertopic import BERTopic
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import PCA
 from sklearn.feature_extraction.text import CountVectorizer
-from umap import UMAP
-from hdbscan import HDBSCAN
+from sklearn.pipeline import Pipeline
+import json
+import numpy as np
 import pandas as pd
+from pathlib import Path
 from typing import List, Tuple
 
+from src import config
+from src.cache import get_default_cache
+from src.utils import stratified_sample_indices
+
+# Sub-model factories, shared with the hyperparameter sweep (src/topic_sweep.py)
+# so swept configurations build exactly the models TopicModeler would.
+# bertopic, sentence-transformers, umap and hdbscan are imported where they are used.
+def make_umap(n_neighbors: int, n_components: int, low_memory: bool = False):
+    from umap import UMAP
+    return UMAP(n_neighbors=n_neighbors, n_components=n_components, min_dist=0.0, metric='cosine',
+                low_memory=low_memory)
+
+def make_hdbscan(min_cluster_size: int, min_samples: int = None):
+    from hdbscan import HDBSCAN
+    return HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples, metric='euclidean',
+                   cluster_selection_method='eom', prediction_data=True)
+
+def make_vectorizer(ngram_range=(1, 3)) -> CountVectorizer:
+    return CountVectorizer(ngram_range=tuple(ngram_range), stop_words="english")
+
+def _topic_embeddings(model) -> Tuple[List[int], np.ndarray]:
+    """
+    (topic ids, embeddings) of a fitted BERTopic model, outliers (-1) excluded.
+    topic_embeddings_ rows follow the sorted topic ids, -1 first when present.
+    """
+    ids = sorted(model.get_topics())
+    embeddings = np.asarray(model.topic_embeddings_)
+    keep = [i for i, t in enumerate(ids) if t != -1]
+    return [ids[i] for i in keep], embeddings[keep]
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
 class TopicModeler:
-    def __init__(self, embedding_model="all-MiniLM-L6-v2"):
+    def __init__(self, embedding_model="all-MiniLM-L6-v2", use_cache=True, cache=None, sentence_model=None,
+                 large_corpus=None, sample_size=None, pca_components=None, low_memory=None, random_state=42,
+                 n_neighbors=None, n_components=None, min_cluster_size=None, min_samples=None, ngram_range=None):
+        from bertopic import BERTopic
+        from sentence_transformers import SentenceTransformer
+
         self.embedding_model = embedding_model
+        # UMAP / HDBSCAN / vectorizer settings (defaults in config, see src/topic_sweep.py to tune them)
+        self.n_neighbors = n_neighbors or config.TOPIC_N_NEIGHBORS
+        self.n_components = n_components or config.TOPIC_N_COMPONENTS
+        self.min_cluster_size = min_cluster_size or config.TOPIC_MIN_CLUSTER_SIZE
+        self.min_samples = min_samples if min_samples is not None else config.TOPIC_MIN_SAMPLES
+        self.ngram_range = tuple(ngram_range or config.TOPIC_NGRAM_RANGE)
+        # Large-corpus mode (None = automatic above TOPIC_LARGE_CORPUS_THRESHOLD docs)
+        self.large_corpus = large_corpus
+        self.sample_size = sample_size or config.TOPIC_FIT_SAMPLE_SIZE
+        self.pca_components = pca_components or config.TOPIC_PCA_COMPONENTS
+        self.low_memory = config.TOPIC_LOW_MEMORY if low_memory is None else low_memory
+        self.random_state = random_state
+        # An already loaded SentenceTransformer can be passed in to avoid reloading it per fit
+        self.sentence_model = sentence_model if sentence_model is not None else SentenceTransformer(embedding_model)
+        # Sentence embeddings are cached on disk keyed by (model, cleaned text),
+        # so re-runs only encode reviews that were not seen before.
+        self.use_cache = use_cache
+        if use_cache and config.EMBEDDING_CACHE_ENABLED:
+            self.cache = cache if cache is not None else get_default_cache()
+        else:
+            self.cache = None
         # Configure sub-models as per prompt
-        # min_cluster_size = 80
         # calculate_probabilities = True
         # diversity = 0.5 (This is usually a parameter in maximal_marginal_relevance or similar representation tuning, 
         # but BERTopic main init doesn't take 'diversity' directly in recent versions, it's often in representation_model)
         # We will stick to standard init and apply diversity in representation if needed, or just ignore if API differs slightly.
         
-        self.umap_model = UMAP(n_neighbors=15, n_components=5, min_dist=0.0, metric='cosine')
-        self.hdbscan_model = HDBSCAN(min_cluster_size=80, metric='euclidean', cluster_selection_method='eom', prediction_data=True)
-        self.vectorizer_model = CountVectorizer(ngram_range=(1, 3), stop_words="english")
+        self.umap_model = make_umap(self.n_neighbors, self.n_components, self.low_memory)
+        if self.pca_components:
+            # Cheap linear pre-reduction shrinks the nearest-neighbour search UMAP has to do
+            self.umap_model = Pipeline([
+                ("pca", PCA(n_components=self.pca_components, random_state=random_state)),
+                ("umap", self.umap_model),
+            ])
+        self.hdbscan_model = make_hdbscan(self.min_cluster_size, self.min_samples)
+        self.vectorizer_model = make_vectorizer(self.ngram_range)
         
         self.model = BERTopic(
-            embedding_model=self.embedding_model,
+            embedding_model=self.sentence_model,
             umap_model=self.umap_model,
             hdbscan_model=self.hdbscan_model,
             vectorizer_model=self.vectorizer_model,
             calculate_probabilities=True,
-            min_topic_size=80 # "auto" isn't a standard int value, prompt said "auto" or 80. Let's use 80 to match min_cluster_size.
+            min_topic_size=self.min_cluster_size  # matches HDBSCAN's min_cluster_size
         )
+        # Models fitted by `merge` on later batches, each with {its topic id: topic id in this model}
+        self.merged = []
+
+    @property
+    def params(self) -> dict:
+        """
+        The tunable settings, as accepted by __init__.
+        """
+        return {"n_neighbors": self.n_neighbors, "n_components": self.n_components,
+                "min_cluster_size": self.min_cluster_size, "min_samples": self.min_samples,
+                "ngram_range": self.ngram_range}
         
-    def fit_transform(self, docs: List[str]) -> Tuple[List[int], pd.DataFrame]:
-        topics, probs = self.model.fit_transform(docs)
+    def __getstate__(self):
+        # The cache holds a SQLite connection, which cannot be pickled
+        state = self.__dict__.copy()
+        state['cache'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("merged", [])
+        if self.use_cache and config.EMBEDDING_CACHE_ENABLED:
+            self.cache = get_default_cache()
+
+    def embed(self, docs: List[str]) -> np.ndarray:
+        """
+        Returns sentence embeddings for docs, encoding only cache misses.
+        """
+        def encode(texts):
+            return self.sentence_model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+        if self.cache is None:
+            return encode(docs)
+        return self.cache.get_or_compute(docs, self.embedding_model, "embedding", encode)
+
+    def fit_transform(self, docs: List[str], embeddings: np.ndarray = None) -> Tuple[List[int], pd.DataFrame]:
+        # Pass precomputed embeddings so BERTopic does not re-embed the corpus
+        if embeddings is None:
+            embeddings = self.embed(docs)
+
+        large_corpus = self.large_corpus
+        if large_corpus is None:
+            large_corpus = len(docs) > config.TOPIC_LARGE_CORPUS_THRESHOLD
+        if large_corpus and len(docs) > self.sample_size:
+            return self._fit_transform_sampled(docs, embeddings)
+
+        topics, probs = self.model.fit_transform(docs, embeddings=embeddings)
         return topics, probs
+
+    def _fit_transform_sampled(self, docs: List[str], embeddings: np.ndarray) -> Tuple[List[int], np.ndarray]:
+        """
+        Fits UMAP + HDBSCAN on a stratified sample and assigns the remaining docs in chunks.
+
+        The sample is stratified over k-means cells of the embedding space, so small
+        regions of the corpus still get represented in the fit. Topic representations
+        (c-TF-IDF) are built from the sample. Probabilities are float32 and filled
+        chunk by chunk into one preallocated (n_docs, n_topics) array.
+        """
+        strata = MiniBatchKMeans(n_clusters=config.TOPIC_SAMPLE_STRATA, random_state=self.random_state,
+                                 n_init=3).fit_predict(embeddings)
+        sample_idx = stratified_sample_indices(strata, self.sample_size, self.random_state)
+        rest_mask = np.ones(len(docs), dtype=bool)
+        rest_mask[sample_idx] = False
+        rest_idx = np.nonzero(rest_mask)[0]
+
+        self.model.fit([docs[i] for i in sample_idx], embeddings=embeddings[sample_idx])
+
+        topics = np.empty(len(docs), dtype=np.int64)
+        topics[sample_idx] = self.model.topics_
+        sample_probs = self.model.probabilities_
+        probs = None
+        if sample_probs is not None and np.ndim(sample_probs) == 2:
+            probs = np.empty((len(docs), sample_probs.shape[1]), dtype=np.float32)
+            probs[sample_idx] = sample_probs
+
+        chunk_size = config.TOPIC_TRANSFORM_CHUNK_SIZE
+        for start in range(0, len(rest_idx), chunk_size):
+            idx = rest_idx[start:start + chunk_size]
+            chunk_topics, chunk_probs = self.model.transform([docs[i] for i in idx], embeddings=embeddings[idx])
+            topics[idx] = chunk_topics
+            if probs is not None:
+                probs[idx] = chunk_probs
+        return topics.tolist(), probs
+
+    def transform(self, docs: List[str], embeddings: np.ndarray = None) -> Tuple[List[int], np.ndarray]:
+        """
+        Assigns topics and probabilities to new docs with the fitted model, without refitting.
+
+        Uses the fitted UMAP and HDBSCAN's prediction data (approximate_predict /
+        membership_vector), so the cost scales with len(docs), not the corpus the
+        model was fitted on. Docs are processed in chunks of TOPIC_TRANSFORM_CHUNK_SIZE
+        and probabilities returned as float32.
+
+        Probabilities always have one column per topic of the original fit, the
+        layout create_features and the rating model were trained on. Docs that the
+        original model leaves as outliers can get a topic added by `merge`; such
+        topics only appear in the returned topic ids until the rating model is
+        retrained on them.
+        """
+        chunk_size = config.TOPIC_TRANSFORM_CHUNK_SIZE
+        all_topics = []
+        all_probs = []
+        for start in range(0, len(docs), chunk_size):
+            chunk = docs[start:start + chunk_size]
+            chunk_embeddings = embeddings[start:start + chunk_size] if embeddings is not None else self.embed(chunk)
+            topics, probs = self.model.transform(chunk, embeddings=chunk_embeddings)
+            topics = np.asarray(topics, dtype=np.int64)
+            for model, mapping in self.merged:
+                outliers = np.flatnonzero(topics == -1)
+                if len(outliers) == 0:
+                    break
+                merged_topics, _ = model.transform([chunk[i] for i in outliers],
+                                                   embeddings=np.asarray(chunk_embeddings)[outliers])
+                topics[outliers] = [mapping.get(int(t), -1) for t in merged_topics]
+            all_topics.extend(topics.tolist())
+            if probs is not None:
+                all_probs.append(np.asarray(probs, dtype=np.float32))
+        probs = np.concatenate(all_probs) if all_probs else None
+        return all_topics, probs
+
+    def _fit_new(self, docs: List[str]):
+        """
+        A BERTopic model with the same settings, fitted on `docs` only.
+        """
+        new_modeler = TopicModeler(self.embedding_model, use_cache=self.use_cache, cache=self.cache,
+                                   sentence_model=self.sentence_model, large_corpus=self.large_corpus,
+                                   sample_size=self.sample_size, pca_components=self.pca_components,
+                                   low_memory=self.low_memory, random_state=self.random_state, **self.params)
+        new_modeler.fit_transform(docs)
+        return new_modeler.model
+
+    def _topic_table(self) -> Tuple[List[int], np.ndarray]:
+        # Topic ids and normalized embeddings of the original fit and all merged topics
+        ids, embeddings = _topic_embeddings(self.model)
+        ids, embeddings = list(ids), [_normalize(embeddings)]
+        for model, mapping in self.merged:
+            merged_ids, merged_embeddings = _topic_embeddings(model)
+            for t, embedding in zip(merged_ids, _normalize(merged_embeddings)):
+                if mapping[t] not in ids:
+                    ids.append(mapping[t])
+                    embeddings.append(embedding[None])
+        return ids, np.concatenate(embeddings)
+
+    def merge(self, docs: List[str], min_similarity: float = None) -> int:
+        """
+        Folds clusters found in new docs into the model.
+
+        A fresh model with the same settings is fitted on `docs` only, and each of
+        its topics is mapped to the most similar existing topic (cosine of topic
+        embeddings >= min_similarity) or to a new topic id. The fitted UMAP and
+        HDBSCAN of the original model are kept, so `transform` still assigns the
+        original topics (and probability columns) as before; the new model only
+        assigns docs the original model leaves as outliers (see `transform`).
+        Meant to be run periodically on a batch of recent reviews; daily scoring
+        should use `transform`. Returns the number of topics added.
+        """
+        min_similarity = min_similarity or config.TOPIC_MERGE_MIN_SIMILARITY
+        new_model = self._fit_new(docs)
+
+        ids, embeddings = self._topic_table()
+        new_ids, new_embeddings = _topic_embeddings(new_model)
+        similarity = _normalize(new_embeddings) @ embeddings.T if len(new_ids) else np.empty((0, len(ids)))
+        mapping = {}
+        next_id = max(ids, default=-1) + 1
+        for t, row in zip(new_ids, similarity):
+            if len(ids) and row.max() >= min_similarity:
+                mapping[t] = ids[int(row.argmax())]
+            else:
+                mapping[t] = next_id
+                next_id += 1
+        self.merged.append((new_model, mapping))
+        return next_id - (max(ids, default=-1) + 1)
+
+    def save(self, path=None):
+        """
+        Persists the fitted model (including UMAP and HDBSCAN prediction data).
+        The sentence-transformer is not saved; it is reloaded by name.
+        """
+        path = Path(path) if path is not None else config.TOPIC_MODEL_DIR
+        path.mkdir(parents=True, exist_ok=True)
+        self.model.save(str(path / "bertopic.pkl"), serialization="pickle", save_embedding_model=False)
+        merged = []
+        for i, (model, mapping) in enumerate(self.merged):
+            model.save(str(path / f"merged_{i}.pkl"), serialization="pickle", save_embedding_model=False)
+            merged.append({"file": f"merged_{i}.pkl", "mapping": {str(k): v for k, v in mapping.items()}})
+        with open(path / "meta.json", "w") as f:
+            json.dump({"embedding_model": self.embedding_model, "params": self.params, "merged": merged}, f)
+        return path
+
+    @classmethod
+    def load(cls, path=None, use_cache=True, sentence_model=None):
+        """
+        Loads a model saved with `save`, ready for `transform`. By default the
+        model the last pipeline run published under TOPIC_MODEL_DIR.
+        """
+        from bertopic import BERTopic
+        from src.artifacts import resolve_latest
+
+        path = resolve_latest(path if path is not None else config.TOPIC_MODEL_DIR)
+        with open(path / "meta.json") as f:
+            meta = json.load(f)
+        modeler = cls(meta["embedding_model"], use_cache=use_cache, sentence_model=sentence_model,
+                      **meta.get("params", {}))
+        modeler.model = BERTopic.load(str(path / "bertopic.pkl"), embedding_model=modeler.sentence_model)
+        modeler.umap_model = modeler.model.umap_model  # may be a PCA -> UMAP Pipeline
+        modeler.hdbscan_model = modeler.model.hdbscan_model
+        modeler.vectorizer_model = modeler.model.vectorizer_model
+        modeler.merged = [
+            (BERTopic.load(str(path / m["file"]), embedding_model=modeler.sentence_model),
+             {int(k): v for k, v in m["mapping"].items()})
+            for m in meta.get("merged", [])
+        ]
+        return modeler
     
     def get_topic_info(self):
-        return self.model.get_topic_info()
+        info = self.model.get_topic_info()
+        added = []
+        known = set(info['Topic'])
+        for model, mapping in self.merged:
+            merged_info = model.get_topic_info()
+            merged_info = merged_info[merged_info['Topic'] != -1]
+            merged_info = merged_info.assign(Topic=merged_info['Topic'].map(mapping))
+            added.append(merged_info[~merged_info['Topic'].isin(known)])
+            known.update(merged_info['Topic'])
+        if not added:
+            return info
+        return pd.concat([info] + added, ignore_index=True).sort_values('Topic', kind='stable').reset_index(drop=True)
     
     def get_topics(self):
         return self.model.get_topics()
+
+    def get_topic_embeddings(self):
+        # One row per topic id, outliers (-1) first when present
+        embeddings = getattr(self.model, "topic_embeddings_", None)
+        if embeddings is None or not self.merged:
+            return embeddings
+        ids, merged_embeddings = self._topic_table()
+        n_original = len(_topic_embeddings(self.model)[0])
+        return np.concatenate([np.asarray(embeddings), merged_embeddings[n_original:]])
         
     def visualize_topics(self):
         try:
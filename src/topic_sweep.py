@@ -0,0 +1,250 @@
+"""
+Topic-model hyperparameter sweep.
+
+    from src.topic_sweep import sweep_topics, best_topic_params
+    table = sweep_topics(clean_text, ratings, sentiment_scores)
+    modeler = TopicModeler(**best_topic_params(table))
+
+Costs are shared across the grid:
+- embeddings are computed once (and come from the embedding cache on re-runs)
+- UMAP runs once per (n_neighbors, n_components) and the projection is stored
+  in the artifact store, so later sweeps over the same corpus skip it
+- HDBSCAN + c-TF-IDF runs once per (projection, min_cluster_size, min_samples),
+  fanned out over a process pool that memory-maps the projection
+- vectorizer variants (ngram_range) only rebuild the topic representations
+  (BERTopic.update_topics) of an already clustered model
+
+Every configuration is scored with cheap metrics: topic count, outlier
+fraction, NPMI coherence and diversity of the top words, and the downstream
+RMSE of a Ridge model on create_features.
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import as_completed
+from itertools import combinations
+from typing import List
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib.externals.loky import get_reusable_executor
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.model_selection import ParameterGrid
+
+from src import config
+from src.artifacts import ArtifactStore
+from src.features import create_features, to_model_matrix
+
+PARAMS = ["n_neighbors", "n_components", "min_cluster_size", "min_samples", "ngram_range"]
+METRICS = ["n_topics", "outlier_fraction", "coherence", "diversity", "rmse"]
+# Sort direction of each metric when ranking
+ASCENDING = {"n_topics": False, "outlier_fraction": True, "coherence": False, "diversity": False, "rmse": True}
+
+def npmi_coherence(docs: List[str], topic_words: List[List[str]]) -> float:
+    """
+    Mean NPMI of the pairs of top words of each topic, from document
+    co-occurrence in `docs` (-1 = never together, 1 = always together).
+    """
+    vocab = sorted({w for words in topic_words for w in words})
+    if not vocab:
+        return float("nan")
+    max_n = max(len(w.split()) for w in vocab)
+    # Same analyzer as the topic vectorizer, so n-gram top words are matched as phrases
+    vectorizer = CountVectorizer(vocabulary=vocab, ngram_range=(1, max_n), stop_words="english", binary=True)
+    presence = vectorizer.transform(docs)
+    n_docs = presence.shape[0]
+    p_word = np.asarray(presence.sum(axis=0)).ravel() / n_docs
+    p_pair = (presence.T @ presence).toarray() / n_docs
+    index = {w: i for i, w in enumerate(vocab)}
+
+    scores = []
+    for words in topic_words:
+        ids = [index[w] for w in words]
+        if len(ids) < 2:
+            continue
+        a, b = np.array(list(combinations(ids, 2))).T
+        joint, independent = p_pair[a, b], p_word[a] * p_word[b]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            npmi = np.log(joint / independent) / -np.log(joint)
+        npmi[joint == 0] = -1.0
+        # Words present in every document
+        npmi[joint == 1] = 1.0
+        scores.append(npmi.mean())
+    return float(np.mean(scores)) if scores else float("nan")
+
+def topic_diversity(topic_words: List[List[str]]) -> float:
+    """
+    Share of unique words among all topics' top words (1 = no overlap).
+    """
+    words = [w for topic in topic_words for w in topic]
+    return len(set(words)) / len(words) if words else float("nan")
+
+def downstream_rmse(ratings, topics, sentiment_scores, topic_probs=None, folds: int = None) -> float:
+    """
+    Cross-validated RMSE of a Ridge model on create_features: a cheap stand-in
+    for how well the topics explain ratings in the full model selection.
+    """
+    from sklearn.linear_model import Ridge
+    from sklearn.model_selection import KFold, cross_val_score
+
+    folds = folds or config.TOPIC_SWEEP_CV_FOLDS
+    X, y = create_features(pd.DataFrame({'rating': ratings}), topics, sentiment_scores, topic_probs=topic_probs)
+    scores = cross_val_score(Ridge(), to_model_matrix(X), np.asarray(y), cv=KFold(folds),
+                             scoring="neg_root_mean_squared_error")
+    return float(-scores.mean())
+
+# Corpus (docs, ratings, sentiment) per worker process, keyed by its dump path
+_corpus = {}
+
+def _load_corpus(corpus_path):
+    if corpus_path not in _corpus:
+        _corpus.clear()
+        _corpus[corpus_path] = joblib.load(corpus_path)
+    return _corpus[corpus_path]
+
+def _evaluate_clustering(projection_path, corpus_path, min_cluster_size, min_samples, ngram_ranges) -> List[dict]:
+    """
+    Clusters one stored UMAP projection and scores every ngram_range on the
+    resulting topics. Runs in a pool worker.
+    """
+    from bertopic import BERTopic
+    from bertopic.dimensionality import BaseDimensionalityReduction
+    from src.topic_modeling import make_hdbscan, make_vectorizer
+
+    start = time.perf_counter()
+    docs, ratings, sentiment_scores = _load_corpus(corpus_path)
+    reduced = np.asarray(joblib.load(projection_path, mmap_mode="r"))
+
+    # The projection is passed as the embeddings, with UMAP replaced by a no-op
+    model = BERTopic(umap_model=BaseDimensionalityReduction(), hdbscan_model=make_hdbscan(min_cluster_size, min_samples),
+                     vectorizer_model=make_vectorizer(ngram_ranges[0]), calculate_probabilities=True,
+                     min_topic_size=min_cluster_size)
+    topics, probs = model.fit_transform(docs, embeddings=reduced)
+    probs = probs if probs is not None and np.ndim(probs) == 2 else None
+    # Independent of the representation, so computed once for all ngram ranges
+    rmse = downstream_rmse(ratings, topics, sentiment_scores, probs)
+    cluster_seconds = time.perf_counter() - start
+
+    rows = []
+    for i, ngram_range in enumerate(ngram_ranges):
+        start = time.perf_counter()
+        if i > 0:
+            model.update_topics(docs, vectorizer_model=make_vectorizer(ngram_range))
+        topic_words = [[word for word, _ in model.get_topic(t)[:config.TOPIC_SWEEP_TOP_WORDS] if word]
+                       for t in sorted(set(model.topics_)) if t != -1]
+        rows.append({
+            "min_cluster_size": min_cluster_size,
+            "min_samples": min_samples,
+            "ngram_range": tuple(ngram_range),
+            "n_topics": len(topic_words),
+            "outlier_fraction": float(np.mean(np.asarray(topics) == -1)),
+            "coherence": npmi_coherence(docs, topic_words),
+            "diversity": topic_diversity(topic_words),
+            "rmse": rmse,
+            # The clustering cost is attributed to the first variant that needed it
+            "fit_seconds": time.perf_counter() - start + (cluster_seconds if i == 0 else 0.0),
+        })
+    return rows
+
+def rank_results(table: pd.DataFrame, rank_by: List[str] = None) -> pd.DataFrame:
+    rank_by = rank_by or config.TOPIC_SWEEP_RANK_BY
+    ranked = table.sort_values(rank_by, ascending=[ASCENDING[m] for m in rank_by], na_position="last",
+                               kind="stable").reset_index(drop=True)
+    ranked.index = pd.RangeIndex(1, len(ranked) + 1, name="rank")
+    return ranked
+
+def best_topic_params(table: pd.DataFrame) -> dict:
+    """
+    Settings of the top-ranked row, as keyword arguments for TopicModeler.
+    """
+    row = table.iloc[0]
+    return {
+        "n_neighbors": int(row["n_neighbors"]),
+        "n_components": int(row["n_components"]),
+        "min_cluster_size": int(row["min_cluster_size"]),
+        "min_samples": None if pd.isna(row["min_samples"]) else int(row["min_samples"]),
+        "ngram_range": tuple(row["ngram_range"]),
+    }
+
+def sweep_topics(docs: List[str], ratings, sentiment_scores, grid: dict = None, embeddings: np.ndarray = None,
+                 sentence_model=None, store: ArtifactStore = None, n_jobs: int = None, sample_size: int = None,
+                 rank_by: List[str] = None, random_state: int = 42) -> pd.DataFrame:
+    """
+    Scores every combination of `grid` (default TOPIC_SWEEP_GRID, keys from PARAMS)
+    on cleaned `docs` with their ratings and sentiment scores, and returns one row
+    per configuration, best first (see rank_results).
+
+    Corpora larger than `sample_size` are swept on a random sample. Embeddings
+    are computed with the configured embedding model unless given.
+    """
+    grid = grid or config.TOPIC_SWEEP_GRID
+    n_jobs = n_jobs or config.TOPIC_SWEEP_N_JOBS or os.cpu_count() or 1
+    sample_size = sample_size or config.TOPIC_SWEEP_SAMPLE_SIZE
+    store = store or ArtifactStore()
+    configs = list(ParameterGrid({p: list(grid.get(p, [None])) for p in PARAMS}))
+
+    ratings, sentiment_scores = np.asarray(ratings), np.asarray(sentiment_scores)
+    if sample_size and len(docs) > sample_size:
+        idx = np.sort(np.random.default_rng(random_state).choice(len(docs), sample_size, replace=False))
+        docs, ratings, sentiment_scores = [docs[i] for i in idx], ratings[idx], sentiment_scores[idx]
+        embeddings = embeddings[idx] if embeddings is not None else None
+    if embeddings is None:
+        from src.topic_modeling import TopicModeler
+        embeddings = TopicModeler(config.BERTOPIC_EMBEDDING_MODEL, sentence_model=sentence_model).embed(docs)
+
+    corpus_key = store.make_key("topic_sweep", embeddings, docs, ratings, sentiment_scores)
+    tmp_dir = tempfile.mkdtemp(prefix="topic_sweep_")
+    try:
+        corpus_path = os.path.join(tmp_dir, "corpus.joblib")
+        joblib.dump((docs, ratings, sentiment_scores), corpus_path)
+        executor = get_reusable_executor(max_workers=n_jobs)
+        futures = {}
+        rows = []
+
+        projections = sorted({(c["n_neighbors"], c["n_components"]) for c in configs})
+        for n_neighbors, n_components in projections:
+            projection_key = store.make_key("umap_projection", corpus_key, n_neighbors, n_components,
+                                            config.TOPIC_LOW_MEMORY)
+
+            def project():
+                from src.topic_modeling import make_umap
+                return make_umap(n_neighbors, n_components, config.TOPIC_LOW_MEMORY).fit_transform(embeddings)
+
+            start = time.perf_counter()
+            store.get_or_compute("umap_projection", projection_key, project)
+            umap_seconds = time.perf_counter() - start
+
+            clusterings = sorted({(c["min_cluster_size"], c["min_samples"] or 0) for c in configs
+                                  if (c["n_neighbors"], c["n_components"]) == (n_neighbors, n_components)})
+            for min_cluster_size, min_samples in clusterings:
+                min_samples = min_samples or None
+                ngram_ranges = sorted({tuple(c["ngram_range"]) for c in configs
+                                       if (c["n_neighbors"], c["n_components"], c["min_cluster_size"],
+                                           c["min_samples"]) == (n_neighbors, n_components, min_cluster_size,
+                                                                 min_samples)})
+                result_key = store.make_key("topic_sweep", projection_key, min_cluster_size, min_samples, ngram_ranges,
+                                            config.TOPIC_SWEEP_TOP_WORDS, config.TOPIC_SWEEP_CV_FOLDS)
+                shared = {"n_neighbors": n_neighbors, "n_components": n_components, "umap_seconds": umap_seconds}
+                if store.has("topic_sweep", result_key):
+                    rows.extend({**shared, **row, "cached": True} for row in store.load("topic_sweep", result_key))
+                    continue
+                future = executor.submit(_evaluate_clustering, str(store.path("umap_projection", projection_key)),
+                                         corpus_path, min_cluster_size, min_samples, ngram_ranges)
+                futures[future] = (result_key, shared)
+
+        for future in as_completed(futures):
+            result_key, shared = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Topic sweep configuration failed: {e}")
+                continue
+            store.save("topic_sweep", result_key, result)
+            rows.extend({**shared, **row, "cached": False} for row in result)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    table = pd.DataFrame(rows, columns=PARAMS + METRICS + ["fit_seconds", "umap_seconds", "cached"])
+    return rank_results(table, rank_by)
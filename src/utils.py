@@ -1,10 +1,101 @@
 import pandas as pd
 import numpy as np
 
-def generate_dummy_data(domain="mha", n_samples=1000):
+from src import config
+
+# Opinion words for the synthetic generator, keyed by the star level they express
+_OPINIONS = {
+    1: ["terrible", "awful", "useless", "horrible", "frustrating"],
+    2: ["bad", "poor", "disappointing", "slow", "annoying"],
+    3: ["okay", "average", "fine", "decent", "mixed"],
+    4: ["good", "nice", "helpful", "smooth", "reliable"],
+    5: ["excellent", "amazing", "perfect", "fantastic", "great"],
+}
+_TEMPLATES = [
+    "the {aspect} is {opinion}.",
+    "{aspect} was {opinion}!",
+    "really {opinion} {aspect}.",
+    "i found the {aspect} {opinion}.",
+    "{opinion} experience with {aspect}.",
+]
+_FILLER = ["honestly", "overall", "also", "but", "and", "this app", "to be fair", "every time", "lately", "again",
+           "since the update", "for 2 weeks", "my friend said", "as usual"]
+# Short reviews that stores are full of, used verbatim to produce duplicates
+_GENERIC = [("good app", 4), ("very nice", 5), ("worst app ever", 1), ("love it", 5), ("not bad", 3), ("waste of money", 1)]
+
+def generate_synthetic_reviews(domain="mha", n_samples=10_000, seed=None, duplicate_rate=0.1) -> pd.DataFrame:
+    """
+    Seedable generator of realistic-looking reviews for benchmarks and tests.
+
+    Each review mentions 1-3 determinants from config.MHA_DETERMINANTS /
+    QC_DETERMINANTS, each with an opinion at some star level, mixed with filler
+    words, so lengths vary from a couple of words to a few dozen. The rating is
+    the mean opinion level plus noise, so topic sentiment actually predicts it.
+    A `duplicate_rate` fraction of rows are short generic repeats ("good app").
+    """
+    rng = np.random.default_rng(seed)
+    determinants = config.MHA_DETERMINANTS if domain == "mha" else config.QC_DETERMINANTS
+    aspects = [d.lower() for d in determinants]
+
+    n_mentions = rng.integers(1, 4, size=n_samples)
+    mention_aspects = rng.integers(0, len(aspects), size=(n_samples, 3))
+    mention_levels = rng.integers(1, 6, size=(n_samples, 3))
+    mention_templates = rng.integers(0, len(_TEMPLATES), size=(n_samples, 3))
+    mention_words = rng.integers(0, 5, size=(n_samples, 3))
+    n_filler = rng.poisson(3, size=n_samples)
+    # Filler words and their insert positions, drawn up front for all rows
+    filler_offsets = np.concatenate([[0], np.cumsum(n_filler)])
+    filler_words = rng.integers(0, len(_FILLER), size=filler_offsets[-1])
+    filler_positions = rng.random(size=filler_offsets[-1])
+    noise = rng.normal(0, 0.5, size=n_samples)
+    is_generic = (rng.random(n_samples) < duplicate_rate).tolist()
+    generic_choice = rng.integers(0, len(_GENERIC), size=n_samples).tolist()
+
+    # Rating from the mean level of the mentions actually used
+    used = np.arange(3) < n_mentions[:, None]
+    mean_level = (mention_levels * used).sum(axis=1) / n_mentions
+    ratings = np.clip(np.rint(mean_level + noise), 1, 5).astype(np.int64)
+
+    # Plain Python lists are much faster to index in the row loop than numpy scalars
+    n_mentions, mention_aspects, mention_levels = n_mentions.tolist(), mention_aspects.tolist(), mention_levels.tolist()
+    mention_templates, mention_words = mention_templates.tolist(), mention_words.tolist()
+    filler_offsets, filler_words, filler_positions = filler_offsets.tolist(), filler_words.tolist(), filler_positions.tolist()
+
+    texts = []
+    for i in range(n_samples):
+        if is_generic[i]:
+            text, ratings[i] = _GENERIC[generic_choice[i]]
+            texts.append(text)
+            continue
+        parts = [
+            _TEMPLATES[mention_templates[i][j]].format(
+                aspect=aspects[mention_aspects[i][j]],
+                opinion=_OPINIONS[mention_levels[i][j]][mention_words[i][j]],
+            )
+            for j in range(n_mentions[i])
+        ]
+        for f in range(filler_offsets[i], filler_offsets[i + 1]):
+            parts.insert(int(filler_positions[f] * (len(parts) + 1)), _FILLER[filler_words[f]])
+        texts.append(" ".join(parts).capitalize())
+
+    return pd.DataFrame({
+        "review_text": texts,
+        "rating": ratings,
+        "review_id": range(n_samples),
+        "app_name": "TestApp",
+        "determinant": [None if g else determinants[a[0]] for g, a in zip(is_generic, mention_aspects)],
+    })
+
+def generate_dummy_data(domain="mha", n_samples=1000, seed=None, realistic=False):
     """
     Generates dummy data for testing.
+
+    With realistic=True this delegates to generate_synthetic_reviews (varied
+    reviews built from the domain's determinants) instead of repeating ten sentences.
     """
+    if realistic:
+        return generate_synthetic_reviews(domain, n_samples, seed=seed)
+
     if domain == "mha":
         texts = [
             "This app helps me sleep better.",
@@ -32,7 +123,7 @@ def generate_dummy_data(domain="mha", n_samples=1000):
             "Too many delivery fees."
         ] * (n_samples // 10)
         
-    ratings = np.random.randint(1, 6, size=len(texts))
+    ratings = np.random.default_rng(seed).integers(1, 6, size=len(texts)) if seed is not None else np.random.randint(1, 6, size=len(texts))
     
     df = pd.DataFrame({
         "review_text": texts,
@@ -42,3 +133,26 @@ def generate_dummy_data(domain="mha", n_samples=1000):
     })
     
     return df
+
+def stratified_sample_indices(strata: np.ndarray, n_samples: int, random_state: int = 42) -> np.ndarray:
+    """
+    Picks up to n_samples row indices, allocated to each stratum in proportion
+    to its size (at least one row per stratum while the budget allows).
+    """
+    strata = np.asarray(strata)
+    if len(strata) <= n_samples:
+        return np.arange(len(strata))
+
+    rng = np.random.default_rng(random_state)
+    labels, counts = np.unique(strata, return_counts=True)
+    alloc = np.maximum(1, np.floor(counts / counts.sum() * n_samples)).astype(int)
+    alloc = np.minimum(alloc, counts)
+    # Trim the largest strata if the minimum of one per stratum overshot the budget
+    while alloc.sum() > n_samples:
+        alloc[np.argmax(alloc)] -= 1
+
+    picked = []
+    for label, k in zip(labels, alloc):
+        members = np.nonzero(strata == label)[0]
+        picked.append(rng.choice(members, size=k, replace=False))
+    return np.sort(np.concatenate(picked))
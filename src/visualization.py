@@ -0,0 +1,242 @@
+"""
+Plots that stay fast however many reviews were analyzed.
+
+Figures are rendered from compact summaries instead of raw rows:
+
+- summarize_shap: mean |SHAP| per feature, a binned (feature value x SHAP value)
+  density per feature, and a beeswarm sample that keeps at most
+  VIZ_BEESWARM_POINTS_PER_BIN points per SHAP bin (dense regions are thinned,
+  tails are kept)
+- summarize_topics: one row per topic (2D position, size, average rating /
+  sentiment), capped at VIZ_MAX_TOPICS
+
+Summaries are bounded by the VIZ_* settings, not by the row count, and rendered
+figures are cached on disk by a hash of their summary, at a fixed size and DPI,
+so render time and payload have a fixed upper bound.
+"""
+import io
+import os
+import threading
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src import config
+
+def _edges(values: np.ndarray, bins: int) -> np.ndarray:
+    lo, hi = (float(np.nanmin(values)), float(np.nanmax(values))) if len(values) else (0.0, 0.0)
+    if not np.isfinite(lo) or not np.isfinite(hi):
+        lo, hi = 0.0, 0.0
+    if lo == hi:
+        # Constant feature: one unit-wide range around it
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+def summarize_shap(shap_values, X, max_features: int = None, value_bins: int = None, shap_bins: int = None,
+                   points_per_bin: int = None, random_state: int = 0) -> dict:
+    """
+    Summary of SHAP values (n_rows, n_features) and the explained rows X, with
+    the max_features most important features only, most important first.
+
+    - mean_abs[f]: mean |SHAP| of feature f
+    - density[f]: (value_bins, shap_bins) row counts over value_edges[f] x shap_edges
+    - beeswarm: per kept point its feature, SHAP value, color (feature value
+      scaled to its 5th-95th percentile range) and the relative density of its
+      SHAP bin, which sets how wide the swarm spreads there
+    """
+    max_features = max_features or config.VIZ_MAX_FEATURES
+    value_bins = value_bins or config.VIZ_VALUE_BINS
+    shap_bins = shap_bins or config.VIZ_SHAP_BINS
+    points_per_bin = points_per_bin or config.VIZ_BEESWARM_POINTS_PER_BIN
+    rng = np.random.default_rng(random_state)
+
+    shap_values = np.asarray(shap_values, dtype=np.float64)
+    names = list(X.columns) if isinstance(X, pd.DataFrame) else [f"Feature {i}" for i in range(shap_values.shape[1])]
+    values = np.asarray(X, dtype=np.float64)
+
+    mean_abs = np.abs(shap_values).mean(axis=0) if len(shap_values) else np.zeros(shap_values.shape[1])
+    order = np.argsort(-mean_abs, kind="stable")[:max_features]
+    # One SHAP axis for all features, as in the beeswarm plot
+    shap_edges = _edges(shap_values[:, order].ravel(), shap_bins)
+
+    density = np.zeros((len(order), value_bins, shap_bins), dtype=np.int64)
+    value_edges = np.zeros((len(order), value_bins + 1))
+    swarm = {"feature": [], "shap": [], "color": [], "density": []}
+    for rank, j in enumerate(order):
+        s, v = shap_values[:, j], values[:, j]
+        value_edges[rank] = _edges(v, value_bins)
+        density[rank] = np.histogram2d(v, s, bins=[value_edges[rank], shap_edges])[0]
+
+        # Random subset of at most points_per_bin rows per SHAP bin
+        shap_bin = np.clip(np.searchsorted(shap_edges, s, side="right") - 1, 0, shap_bins - 1)
+        shuffled = rng.permutation(len(s))
+        by_bin = shuffled[np.argsort(shap_bin[shuffled], kind="stable")]
+        bin_counts = np.bincount(shap_bin, minlength=shap_bins)
+        position = np.arange(len(by_bin)) - np.repeat(np.cumsum(bin_counts) - bin_counts, bin_counts)
+        kept = np.sort(by_bin[position < points_per_bin])
+
+        lo, hi = np.nanpercentile(v, [5, 95]) if len(v) else (0.0, 0.0)
+        color = np.clip((v[kept] - lo) / (hi - lo), 0, 1) if hi > lo else np.full(len(kept), 0.5)
+        swarm["feature"].append(np.full(len(kept), rank, dtype=np.int16))
+        swarm["shap"].append(s[kept].astype(np.float32))
+        swarm["color"].append(color.astype(np.float32))
+        swarm["density"].append((bin_counts[shap_bin[kept]] / max(bin_counts.max(), 1)).astype(np.float32))
+
+    return {
+        "n_rows": len(shap_values),
+        "features": [names[j] for j in order],
+        "mean_abs": mean_abs[order],
+        "shap_edges": shap_edges,
+        "value_edges": value_edges,
+        "density": density,
+        "beeswarm": {k: np.concatenate(v) if v else np.empty(0, dtype=np.float32) for k, v in swarm.items()},
+    }
+
+def summarize_topics(topic_info: pd.DataFrame, topic_embeddings=None, topic_stats: pd.DataFrame = None,
+                     max_topics: int = None) -> pd.DataFrame:
+    """
+    One row per topic (outliers excluded) for the topic map: name, review count,
+    a 2D position from the first two principal components of the topic
+    embeddings, and avg_rating / avg_sentiment when topic_stats
+    (ResultStore.topic_summary) is given. Only the max_topics largest topics are kept.
+    """
+    max_topics = max_topics or config.VIZ_MAX_TOPICS
+    topics = topic_info[['Topic', 'Count', 'Name']].rename(columns={'Topic': 'topic', 'Count': 'count', 'Name': 'name'})
+    topics = topics.reset_index(drop=True)
+
+    if topic_embeddings is not None and len(topic_embeddings) == len(topics) and len(topics) > 1:
+        # topic_embeddings rows follow topic ids (-1 first when present), as topic_info sorted by id
+        embeddings = np.asarray(topic_embeddings, dtype=np.float64)[np.argsort(np.argsort(topics['topic'].to_numpy()))]
+        centered = embeddings - embeddings.mean(axis=0)
+        components = np.linalg.svd(centered, full_matrices=False)[2][:2]
+        coords = centered @ components.T
+        if coords.shape[1] < 2:
+            coords = np.column_stack([coords, np.zeros(len(coords))])
+    else:
+        # No embeddings: spread topics on a circle
+        angle = np.linspace(0, 2 * np.pi, len(topics), endpoint=False)
+        coords = np.column_stack([np.cos(angle), np.sin(angle)])
+    topics['x'], topics['y'] = coords[:, 0], coords[:, 1]
+
+    if topic_stats is not None:
+        topics = topics.join(topic_stats[['avg_rating', 'avg_sentiment']], on='topic')
+    topics = topics[topics['topic'] != -1]
+    return topics.nlargest(max_topics, 'count').reset_index(drop=True)
+
+# Renderers: their cost depends only on the summary size
+
+def _figure(height_per_row: float, rows: int):
+    import matplotlib.pyplot as plt
+    height = min(max(2.0, 0.4 + height_per_row * rows), config.VIZ_MAX_FIGURE_HEIGHT)
+    return plt.figure(figsize=(config.VIZ_FIGURE_WIDTH, height))
+
+def plot_shap_importance(summary: dict):
+    """
+    Mean |SHAP| bar chart (the summary plot's bar variant).
+    """
+    fig = _figure(0.3, len(summary["features"]))
+    ax = fig.add_subplot()
+    ax.barh(range(len(summary["features"]))[::-1], summary["mean_abs"], color="#1E88E5")
+    ax.set_yticks(range(len(summary["features"]))[::-1], summary["features"])
+    ax.set_xlabel("mean(|SHAP value|)")
+    fig.tight_layout()
+    return fig
+
+def plot_shap_beeswarm(summary: dict, random_state: int = 0):
+    """
+    Beeswarm from the downsampled points: each point is jittered vertically in
+    proportion to the density of its SHAP bin, colored by feature value.
+    """
+    swarm = summary["beeswarm"]
+    n_features = len(summary["features"])
+    fig = _figure(0.4, n_features)
+    ax = fig.add_subplot()
+    jitter = np.random.default_rng(random_state).uniform(-1, 1, len(swarm["shap"])) * 0.4 * swarm["density"]
+    points = ax.scatter(swarm["shap"], n_features - 1 - swarm["feature"] + jitter, c=swarm["color"],
+                        cmap="coolwarm", s=6, linewidths=0, rasterized=True)
+    ax.axvline(0, color="#999999", linewidth=0.8)
+    ax.set_yticks(range(n_features)[::-1], summary["features"])
+    ax.set_xlabel("SHAP value (impact on rating)")
+    colorbar = fig.colorbar(points, ax=ax, ticks=[0, 1], aspect=40)
+    colorbar.ax.set_yticklabels(["Low", "High"])
+    colorbar.set_label("Feature value")
+    ax.set_title(f"{len(swarm['shap'])} of {summary['n_rows']} explained reviews shown", fontsize=9)
+    fig.tight_layout()
+    return fig
+
+def plot_shap_density(summary: dict, max_panels: int = None):
+    """
+    Per feature, a heatmap of review counts by feature value (x) and SHAP value (y).
+    """
+    n_panels = min(len(summary["features"]), max_panels or config.VIZ_DENSITY_PANELS)
+    n_cols = min(4, max(n_panels, 1))
+    n_rows = int(np.ceil(n_panels / n_cols)) if n_panels else 1
+    fig = _figure(2.0, n_rows)
+    axes = fig.subplots(n_rows, n_cols, squeeze=False).ravel()
+    edges = summary["shap_edges"]
+    for rank, ax in enumerate(axes):
+        if rank >= n_panels:
+            ax.set_axis_off()
+            continue
+        value_edges = summary["value_edges"][rank]
+        # Log scale keeps sparse cells visible next to the dense ones
+        ax.imshow(np.log1p(summary["density"][rank].T), origin="lower", aspect="auto", cmap="viridis",
+                  extent=[value_edges[0], value_edges[-1], edges[0], edges[-1]])
+        ax.set_title(summary["features"][rank], fontsize=8)
+        ax.tick_params(labelsize=6)
+    fig.supxlabel("Feature value", fontsize=8)
+    fig.supylabel("SHAP value", fontsize=8)
+    fig.tight_layout()
+    return fig
+
+def plot_topic_map(topics: pd.DataFrame):
+    """
+    Plotly topic map from summarize_topics: marker size = review count, color =
+    average rating when known.
+    """
+    import plotly.express as px
+    color = "avg_rating" if "avg_rating" in topics else None
+    fig = px.scatter(topics, x="x", y="y", size="count", color=color, hover_name="name",
+                     hover_data={c: True for c in ("count", "avg_rating", "avg_sentiment") if c in topics},
+                     color_continuous_scale="RdYlGn", size_max=40)
+    fig.update_layout(xaxis_visible=False, yaxis_visible=False, height=config.VIZ_TOPIC_MAP_HEIGHT)
+    return fig
+
+def _cache_path(name: str, summary, suffix: str) -> Path:
+    key = joblib.hash((name, summary, config.VIZ_FIGURE_WIDTH, config.VIZ_MAX_FIGURE_HEIGHT, config.VIZ_DPI))
+    return config.FIGURE_CACHE_DIR / f"{name}-{key}.{suffix}"
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def render_png(name: str, summary, plot_fn) -> bytes:
+    """
+    PNG of plot_fn(summary) at VIZ_DPI, cached on disk by a hash of the summary.
+    """
+    path = _cache_path(name, summary, "png")
+    if path.exists():
+        return path.read_bytes()
+    import matplotlib.pyplot as plt
+    fig = plot_fn(summary)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=config.VIZ_DPI)
+    plt.close(fig)
+    _write_atomic(path, buffer.getvalue())
+    return buffer.getvalue()
+
+def render_plotly(name: str, summary, plot_fn):
+    """
+    plot_fn(summary) as a Plotly figure, cached on disk as JSON by a hash of the summary.
+    """
+    import plotly.io as pio
+    path = _cache_path(name, summary, "json")
+    if path.exists():
+        return pio.from_json(path.read_text())
+    fig = plot_fn(summary)
+    _write_atomic(path, fig.to_json().encode())
+    return fig
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 import sys
 from pathlib import Path
@@ -6,9 +7,9 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from src.data_loading import detect_domain
+from src.data_loading import detect_domain, load_data, load_data_stream
 from src.preprocessing import clean_text
-from src.features import create_features
+from src.features import create_features, to_model_matrix
 
 def test_preprocessing():
     text = "Hello World! This is a test."
@@ -22,6 +23,36 @@ def test_domain_detection():
     df_qc = pd.DataFrame({'review_text': ['delivery rider grocery'], 'rating': [5]})
     assert detect_domain(df_qc) == "quick_commerce"
 
+def test_chunked_loading(tmp_path):
+    df = pd.DataFrame({
+        'Agent Name': ['A', 'B', 'C', 'D', 'E'],
+        'Review Text': ['late delivery', 'rider was rude', None, 'fresh items', 'order missing'],
+        'Rating': ['1', '2.1', '3', 'n/a', '5'],
+    })
+    csv_path = tmp_path / "reviews.csv"
+    df.to_csv(csv_path, index=False)
+
+    chunks, domain = load_data_stream(csv_path, chunksize=2, extra_columns=[])
+    chunks = list(chunks)
+    assert domain == "quick_commerce"
+    assert len(chunks) == 2  # the middle chunk is entirely dropped
+    assert all(list(c.columns) == ['review_text', 'rating'] for c in chunks)
+
+    loaded, _ = load_data(csv_path, chunksize=2, extra_columns=['agent name'])
+    assert loaded['review_text'].tolist() == ['late delivery', 'rider was rude', 'order missing']
+    # float64, so ratings are not rounded to the nearest float32
+    assert loaded['rating'].tolist() == [1.0, 2.1, 5.0]
+    assert loaded['agent name'].tolist() == ['A', 'B', 'E']
+
+    # Without extra_columns every column is kept, as lowercase names
+    loaded, _ = load_data(csv_path, chunksize=2)
+    assert list(loaded.columns) == ['agent name', 'review_text', 'rating']
+
+    parquet_path = tmp_path / "reviews.parquet"
+    df.to_parquet(parquet_path, index=False)
+    from_parquet, _ = load_data(parquet_path, chunksize=2)
+    assert from_parquet['review_text'].tolist() == loaded['review_text'].tolist()
+
 def test_feature_creation():
     df = pd.DataFrame({'rating': [1, 5]})
     topics = [0, 1]
@@ -30,3 +61,57 @@ def test_feature_creation():
     X, y = create_features(df, topics, sentiments, topic_probs=None)
     assert X.shape == (2, 2) # Topic_0, Topic_1
     assert y.shape == (2,)
+
+def test_sparse_feature_creation():
+    df = pd.DataFrame({'rating': [1, 5, 3, 4]})
+    topics = [0, 2, -1, 0]
+    sentiments = [1, 5, 3, 4]
+    X, _ = create_features(df, topics, sentiments, topic_probs=None)
+    X_sparse, _ = create_features(df, topics, sentiments, topic_probs=None, sparse=True)
+    assert list(X.columns) == ['Topic_0', 'Topic_2']
+    assert X['Topic_0'].tolist() == [1, 0, 0, 4]
+    assert np.array_equal(to_model_matrix(X_sparse).toarray(), X.values)
+
+    probs = np.array([[0.9, 0.1], [0.005, 0.995], [0.5, 0.5], [0.2, 0.8]])
+    X, _ = create_features(df, topics, sentiments, topic_probs=probs, prob_threshold=0.01)
+    X32, _ = create_features(df, topics, sentiments, topic_probs=probs, sparse=True, dtype=np.float32, prob_threshold=0.01)
+    assert list(X32.columns) == ['Topic_0', 'Topic_1']
+    assert X.loc[1, 'Topic_0'] == 0
+    csr = to_model_matrix(X32)
+    assert csr.dtype == np.float32 and csr.nnz == 7
+    assert np.allclose(csr.toarray(), X.values)
+
+def test_model_selection_early_stopping():
+    from src.models import ModelTrainer
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=['Topic_0', 'Topic_1', 'Topic_2'])
+    y = pd.Series(2 * X['Topic_0'] - X['Topic_1'] + rng.normal(scale=0.1, size=200))
+
+    full = ModelTrainer()
+    full_results, full_best = full.train_and_evaluate(X, y, n_jobs=1, early_stopping=False)
+    early = ModelTrainer()
+    early_results, early_best = early.train_and_evaluate(X, y, n_jobs=1, early_stopping=True)
+
+    assert full_best == early_best == "Ridge"
+    assert early_results["Ridge"]["RMSE"] == pytest.approx(full_results["Ridge"]["RMSE"])
+    assert all("Time (s)" in r for r in early_results.values())
+    # Lasso's first fold alone already rules it out
+    assert early_results["Lasso"]["Early Stopped"] and early_results["Lasso"]["Folds"] == 1
+
+def test_synthetic_generator():
+    from src import config
+    from src.utils import generate_synthetic_reviews
+
+    df = generate_synthetic_reviews("quick_commerce", 2000, seed=7)
+    assert len(df) == 2000
+    assert df.equals(generate_synthetic_reviews("quick_commerce", 2000, seed=7))
+    assert df['rating'].between(1, 5).all()
+
+    lengths = df['review_text'].str.split().str.len()
+    assert lengths.min() < 5 and lengths.max() > 30
+
+    # Most reviews mention a determinant from the domain vocabulary
+    vocab = {d.lower() for d in config.QC_DETERMINANTS}
+    assert df['determinant'].dropna().str.lower().isin(vocab).all()
+    assert df['determinant'].notna().mean() > 0.5
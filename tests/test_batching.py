@@ -0,0 +1,21 @@
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.batching import plan_batches
+
+def test_plan_batches_respects_token_budget():
+    lengths = [5, 100, 7, 98, 6, 300]
+    batches = plan_batches(lengths, max_tokens=200, max_batch_size=8)
+
+    # Every index is scheduled exactly once
+    assert sorted(np.concatenate(batches).tolist()) == list(range(len(lengths)))
+    for idx in batches:
+        assert len(idx) == 1 or len(idx) * max(lengths[i] for i in idx) <= 200
+    # Longest item first, on its own because it exceeds the budget
+    assert batches[0].tolist() == [5]
+    # Short reviews are grouped together instead of padding to 100 tokens
+    assert sorted(batches[-1].tolist()) == [0, 2, 4]
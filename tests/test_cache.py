@@ -0,0 +1,102 @@
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.cache import EmbeddingCache
+
+def test_cache_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+    out = cache.get_or_compute(["good app", "bad app", "good app"], "dummy", "embedding", encode)
+    assert out.shape == (3, 2)
+    assert calls == [["good app", "bad app"]]
+    assert cache.misses == 3 and cache.hits == 0
+
+    out2 = cache.get_or_compute(["bad app", "new review"], "dummy", "embedding", encode)
+    assert calls[-1] == ["new review"]
+    assert np.array_equal(out2[0], out[1])
+    assert cache.hits == 1
+
+    # Same text under another model name is a different entry
+    cache.get_or_compute(["good app"], "other-model", "embedding", encode)
+    assert calls[-1] == ["good app"]
+
+def test_cache_lru_eviction(tmp_path):
+    # Each entry is 4 float32 = 16 bytes; allow three entries
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", max_bytes=48)
+    encode = lambda texts: np.ones((len(texts), 4), dtype=np.float32)
+    for t in ["a", "b", "c"]:
+        cache.get_or_compute([t], "m", "logits", encode)
+    cache.get_or_compute(["a"], "m", "logits", encode)  # touch "a" so "b" is oldest
+    cache.get_or_compute(["d"], "m", "logits", encode)
+
+    assert len(cache) == 3
+    assert cache.evictions == 1
+    assert cache.get_many(["b"], "m", "logits") == [None]
+    assert cache.get_many(["a"], "m", "logits")[0] is not None
+
+def test_artifact_store_skips_unchanged_stages(tmp_path):
+    from src.artifacts import ArtifactStore
+
+    store = ArtifactStore(tmp_path / "artifacts")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"topics": [0, 1, -1]}
+
+    key = store.make_key("topics", "upstream-key", "all-MiniLM-L6-v2")
+    first, cached_first = store.get_or_compute("topics", key, compute)
+    second, cached_second = store.get_or_compute("topics", key, compute)
+    assert (cached_first, cached_second) == (False, True)
+    assert first == second and len(calls) == 1
+
+    # Any change in inputs or config gives a new key
+    assert store.make_key("topics", "upstream-key", "other-model") != key
+
+    store.delete("topics", key)
+    assert not store.has("topics", key)
+
+def test_cache_is_shared_by_threads(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+
+    def encode(texts):
+        return np.array([[len(t)] for t in texts], dtype=np.float32)
+
+    def job(i):
+        texts = [f"review {i} {j}" for j in range(50)] + ["shared review"]
+        return cache.get_or_compute(texts, "m", "embedding", encode)
+
+    with ThreadPoolExecutor(8) as executor:
+        outputs = list(executor.map(job, range(32)))
+    assert all(out.shape == (51, 1) for out in outputs)
+    assert len(cache) == 32 * 50 + 1
+
+def test_concurrent_runs_publish_separate_directories(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    from src.artifacts import publish_dir, resolve_latest
+
+    def publish(name):
+        def write(path):
+            for i in range(20):
+                (path / f"part{i}").write_text(name)
+        return publish_dir(tmp_path, name, write)
+
+    with ThreadPoolExecutor(4) as executor:
+        paths = list(executor.map(publish, ["run-a", "run-b", "run-a", "run-b"]))
+    for path in paths:
+        assert {p.read_text() for p in path.iterdir()} == {path.name}
+    assert resolve_latest(tmp_path).name in {"run-a", "run-b"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["LATEST", "run-a", "run-b"]
+    # Without a pointer the directory itself is used (bundles written before LATEST existed)
+    assert resolve_latest(tmp_path / "run-a") == tmp_path / "run-a"
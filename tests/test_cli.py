@@ -0,0 +1,55 @@
+import functools
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent / "benchmarks"))
+
+from src import config
+from src.artifacts import ArtifactStore
+from src.utils import generate_synthetic_reviews
+
+def test_cli_checkpoints_resume_and_restart(tmp_path, monkeypatch, capsys):
+    # Runs every stage for real, on offline stand-ins for the pretrained models
+    for module in ("bertopic", "transformers", "torch", "shap", "lightgbm"):
+        pytest.importorskip(module)
+    from standins import HashingSentenceModel, build_tiny_sentiment_model
+    from src import cli
+    from src.pipeline import run_pipeline
+
+    for name in ("TOPIC_MODEL_DIR", "SCORING_DIR", "MODEL_REGISTRY_DIR", "SHAP_CACHE_DIR", "FIGURE_CACHE_DIR"):
+        monkeypatch.setattr(config, name, tmp_path / "models" / name.lower())
+    monkeypatch.setattr(config, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "MODEL_SELECTION_N_JOBS", 1)
+    monkeypatch.setattr(config, "TOPIC_MIN_CLUSTER_SIZE", 20)
+    monkeypatch.setattr(config, "SHAP_MAX_SAMPLES", 50)
+    monkeypatch.setattr(config, "SENTIMENT_CHECKPOINT_ROWS", 100)
+    reviews = generate_synthetic_reviews("qc", 400, seed=0)
+    monkeypatch.setattr(config, "SENTIMENT_MODEL", build_tiny_sentiment_model(
+        tmp_path / "sentiment", " ".join(reviews["review_text"]).lower().split()))
+    monkeypatch.setattr(cli, "run_pipeline", functools.partial(run_pipeline, sentence_model=HashingSentenceModel()))
+
+    csv_path = tmp_path / "reviews.csv"
+    reviews.to_csv(csv_path, index=False)
+    checkpoints = tmp_path / "checkpoints"
+    args = [str(csv_path), "--output-dir", str(tmp_path / "out"), "--checkpoint-dir", str(checkpoints)]
+    # Another dataset's checkpoint in the same store
+    ArtifactStore(checkpoints).save("topics", "other-dataset", {"topics": []})
+
+    assert cli.main(args) == 0
+    first = capsys.readouterr().out
+    assert "resumed from checkpoint" not in first
+    for stage in ("preprocess", "dedup", "topics", "sentiment", "features", "model", "shap"):
+        assert list((checkpoints / stage).glob("*.joblib")), stage
+    assert (tmp_path / "out" / "metrics.json").exists()
+
+    assert cli.main(args) == 0
+    resumed = capsys.readouterr().out
+    assert resumed.count("resumed from checkpoint") == 7
+
+    assert cli.main(args + ["--restart"]) == 0
+    restarted = capsys.readouterr().out
+    assert "resumed from checkpoint" not in restarted
+    assert ArtifactStore(checkpoints).has("topics", "other-dataset")
@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.dedup import deduplicate, minhash_signatures
+
+def test_exact_dedup_broadcast():
+    texts = ["good app", "very nice", "good app", "late delivery", "very nice", "good app"]
+    dedup = deduplicate(texts, near_duplicates=False)
+    assert dedup.unique(texts) == ["good app", "very nice", "late delivery"]
+    assert dedup.counts.tolist() == [3, 2, 1]
+    assert dedup.reduction_ratio == 0.5
+
+    # Scoring the unique texts and broadcasting gives one result per row
+    scores = [len(t) for t in dedup.unique(texts)]
+    assert dedup.broadcast(scores).tolist() == [len(t) for t in texts]
+    embeddings = np.arange(6).reshape(3, 2)
+    assert dedup.broadcast(embeddings).shape == (6, 2)
+
+def test_near_duplicates():
+    base = "the delivery was very late and the rider was rude to me at the door"
+    texts = [base, base.replace("rude", "rud"), "great selection of fresh vegetables every morning", base + "!"]
+    dedup = deduplicate(texts, near_duplicates=True, threshold=0.7)
+    assert dedup.inverse.tolist() == [0, 0, 1, 0]
+    assert dedup.unique_index.tolist() == [0, 2]
+
+    # Signature agreement tracks Jaccard similarity of the shingles
+    signatures = minhash_signatures([base, base, texts[2]], num_perm=128)
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() < 0.2
+
+def test_minhash_blocks_do_not_change_signatures():
+    texts = ["late delivery " * i + str(i) for i in range(1, 200)] + ["", "ok"]
+    whole = minhash_signatures(texts, num_perm=32)
+    # Blocks of a few hundred shingles, including texts longer than one block
+    np.testing.assert_array_equal(minhash_signatures(texts, num_perm=32, block_shingles=300), whole)
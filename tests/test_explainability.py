@@ -0,0 +1,109 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import config
+from src.explainability import SHAPExplainer, dominant_feature
+
+class KernelExplainer:
+    """
+    Stand-in for shap.KernelExplainer: one SHAP value per cell (twice the
+    feature value), recording how many calls ran at once.
+    """
+    expected_value = 3.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.calls = 0
+
+    def shap_values(self, chunk):
+        with self.lock:
+            self.running += 1
+            self.calls += 1
+            self.max_running = max(self.max_running, self.running)
+        values = np.asarray(chunk, dtype=float) * 2
+        with self.lock:
+            self.running -= 1
+        return values
+
+class TreeExplainer(KernelExplainer):
+    pass
+
+def _frame(n_rows=1000):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(np.zeros((n_rows, 3)), columns=["Topic_0", "Topic_1", "sentiment_score"])
+    # 90% of rows dominated by Topic_0, 10% by Topic_1
+    X.loc[:899, "Topic_0"] = rng.uniform(0.5, 1, 900)
+    X.loc[900:, "Topic_1"] = rng.uniform(0.5, 1, 100)
+    return X
+
+def test_dominant_feature_and_stratified_sample():
+    X = _frame()
+    dense = dominant_feature(X)
+    assert np.array_equal(dominant_feature(X.astype(pd.SparseDtype(float, 0.0))), dense)
+    assert dominant_feature(pd.DataFrame([[0.0, 0.0]]))[0] == -1
+
+    explainer = SHAPExplainer(object(), X, max_samples=100, n_jobs=4, use_cache=False)
+    assert len(explainer.X) == 100
+    # The small topic keeps its share of the sample
+    assert np.sum(dominant_feature(explainer.X) == 1) == 10
+
+def _explainer(monkeypatch, stub, **kwargs):
+    explainer = SHAPExplainer(object(), _frame(), max_samples=500, n_jobs=4, **kwargs)
+    monkeypatch.setattr(config, "SHAP_CHUNK_SIZE", 50)
+    monkeypatch.setattr(explainer, "_background", lambda: None)
+    monkeypatch.setattr(explainer, "_build_explainer", lambda background: stub)
+    return explainer
+
+def test_chunks_are_concatenated_in_order(monkeypatch):
+    stub = KernelExplainer()
+    explainer = _explainer(monkeypatch, stub, use_cache=False)
+    explainer.calculate_shap()
+    assert stub.calls == 10
+    assert np.array_equal(explainer.shap_values, explainer.X.to_numpy() * 2)
+    assert explainer.expected_value == 3.0
+
+def test_only_tree_explainer_runs_chunks_in_parallel(monkeypatch):
+    kernel = KernelExplainer()
+    explainer = _explainer(monkeypatch, kernel, use_cache=False)
+    explainer.calculate_shap()
+    assert kernel.max_running == 1
+
+    explainer.explainer = TreeExplainer()
+    assert explainer._chunk_workers() == 4
+
+def test_partial_results_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "SHAP_CACHE_DIR", tmp_path)
+    # A zero budget stops after the first chunk
+    explainer = _explainer(monkeypatch, KernelExplainer(), time_budget=0)
+    explainer.calculate_shap()
+    assert len(explainer.shap_values) == len(explainer.X) == 50
+    assert not list(tmp_path.iterdir())
+
+    explainer = _explainer(monkeypatch, KernelExplainer())
+    explainer.calculate_shap()
+    assert len(explainer.shap_values) == 500
+    assert len(list(tmp_path.iterdir())) == 1
+
+def test_tree_and_linear_backgrounds_are_real_rows():
+    from sklearn.linear_model import Ridge
+    from sklearn.neighbors import KNeighborsRegressor
+
+    X = _frame()
+    assert SHAPExplainer(Ridge(), X, use_cache=False)._explainer_kind() == "linear"
+    assert SHAPExplainer(KNeighborsRegressor(), X, use_cache=False)._explainer_kind() == "kernel"
+
+    pytest.importorskip("shap")
+    explainer = SHAPExplainer(Ridge(), X, background_size=20, use_cache=False)
+    background = explainer._background()
+    # Not k-means centroids: every background row is a row of the explained sample
+    assert len(background) == 20
+    assert background.index.isin(explainer.X.index).all()
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Modules the Streamlit app imports before the first render
+APP_STARTUP_MODULES = ["src.config", "src.data_loading", "src.utils", "src.artifacts",
+                       "src.cache", "src.instrumentation", "src.pipeline", "src.jobs"]
+
+# Must only be imported by the stage that needs them
+HEAVY_MODULES = {"torch", "transformers", "sentence_transformers", "bertopic", "umap", "hdbscan",
+                 "shap", "lightgbm", "xgboost", "matplotlib", "onnxruntime", "sklearn"}
+
+# Seconds for all startup imports (pandas + numpy + scipy.sparse take ~0.6s on a laptop)
+IMPORT_BUDGET_SECONDS = 2.5
+
+def _importtime(modules):
+    """
+    Returns {module: cumulative microseconds} from `python -X importtime` in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+def test_startup_imports_skip_heavy_dependencies():
+    times = _importtime(APP_STARTUP_MODULES)
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & HEAVY_MODULES
+
+def test_startup_import_budget():
+    times = _importtime(APP_STARTUP_MODULES)
+    total = sum(times[m] for m in APP_STARTUP_MODULES if m in times) / 1e6
+    assert total < IMPORT_BUDGET_SECONDS, f"startup imports took {total:.2f}s"
+
+def test_config_import_creates_no_directories(tmp_path):
+    # Import config from a copy of the package rooted in an empty directory
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "config.py").write_text((PROJECT_ROOT / "src" / "config.py").read_text())
+    subprocess.run([sys.executable, "-c", "import src.config"], cwd=tmp_path, check=True)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["src"]
@@ -0,0 +1,72 @@
+import json
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.instrumentation import Instrumentation
+
+class _Counter:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+def test_stage_records(tmp_path):
+    inst = Instrumentation()
+    cache = _Counter()
+    with inst.stage("work", items=1000, cache=cache) as record:
+        data = [0] * 2_000_000
+        cache.hits += 3
+        cache.misses += 1
+        record["extra"] = len(data)
+    del data
+
+    stage = inst.stages["work"]
+    assert stage["wall_seconds"] > 0 and stage["cpu_seconds"] >= 0
+    assert stage["items_per_sec"] == 1000 / stage["wall_seconds"]
+    assert stage["peak_rss_mb"] > 0
+    assert (stage["cache_hits"], stage["cache_misses"]) == (3, 1)
+    assert stage["extra"] == 2_000_000
+    assert stage["overlapped"] is False
+
+    inst.to_json(tmp_path / "report.json")
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert list(report["stages"]) == ["work"]
+    assert report["overlapped_stages"] == []
+    assert list(inst.to_frame().index) == ["work"]
+
+def test_stage_profile():
+    inst = Instrumentation(profile="cprofile")
+    with inst.stage("sorted"):
+        sorted(range(100_000), key=lambda x: -x)
+    assert "function calls" in inst.stages["sorted"]["profile"]
+
+def test_overlapping_stages_are_flagged_and_not_profiled_twice():
+    # Two jobs in one process: the second starts while the first is still running
+    first, second = Instrumentation(profile="cprofile"), Instrumentation(profile="cprofile")
+    first_started, second_done = threading.Event(), threading.Event()
+
+    def run_first():
+        with first.stage("topics"):
+            first_started.set()
+            second_done.wait(5)
+
+    thread = threading.Thread(target=run_first)
+    thread.start()
+    first_started.wait(5)
+    with second.stage("sentiment"):
+        pass
+    second_done.set()
+    thread.join()
+
+    assert first.stages["topics"]["overlapped"] and second.stages["sentiment"]["overlapped"]
+    assert first.report()["overlapped_stages"] == ["topics"]
+    assert "function calls" in first.stages["topics"]["profile"]
+    assert second.stages["sentiment"]["profile"].startswith("Not profiled")
+
+    # Once alone again, stages are measured and profiled normally
+    with second.stage("features"):
+        pass
+    assert not second.stages["features"]["overlapped"]
+    assert "function calls" in second.stages["features"]["profile"]
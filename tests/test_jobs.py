@@ -0,0 +1,71 @@
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.jobs import JobRegistry
+
+def _df(n=5):
+    return pd.DataFrame({'review_text': [f"review {i}" for i in range(n)], 'rating': [5] * n})
+
+def test_identical_jobs_are_deduplicated():
+    release = threading.Event()
+    calls = []
+
+    def run_fn(df, domain, on_stage=None, sentiment_progress=None, **kwargs):
+        calls.append(domain)
+        release.wait(5)
+        on_stage("preprocess", False)
+        sentiment_progress(len(df), len(df))
+        on_stage("sentiment", True)
+        return {"rows": len(df)}
+
+    registry = JobRegistry(run_fn=run_fn, max_workers=2)
+    first = registry.submit(_df(), "mha", settings={"model": "a"})
+    second = registry.submit(_df(), "mha", settings={"model": "a"})
+    other = registry.submit(_df(), "mha", settings={"model": "b"})
+    assert first is second and other is not first
+
+    release.set()
+    registry.shutdown()
+    assert len(calls) == 2
+    assert first.status == "done" and first.result == {"rows": 5}
+    assert first.stages == {"preprocess": "done", "sentiment": "cached"}
+    assert first.progress["sentiment"] == (5, 5)
+
+def test_failed_job_is_retried():
+    attempts = []
+
+    def run_fn(df, domain, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("out of memory")
+        return {}
+
+    registry = JobRegistry(run_fn=run_fn, max_workers=1)
+    failed = registry.submit(_df(), "mha")
+    registry._executor.submit(lambda: None).result()
+    assert failed.status == "failed" and "out of memory" in failed.error
+
+    retried = registry.submit(_df(), "mha")
+    registry.shutdown()
+    assert retried is not failed and retried.status == "done"
+
+def test_only_newest_results_are_kept():
+    registry = JobRegistry(run_fn=lambda df, domain, **kwargs: {"rows": len(df)}, max_workers=1, keep_results=2)
+    jobs = []
+    for n in (1, 2, 3):
+        jobs.append(registry.submit(_df(n), "mha"))
+        registry._executor.submit(lambda: None).result()
+
+    assert jobs[0].status == "evicted" and jobs[0].result is None
+    assert [j.result for j in jobs[1:]] == [{"rows": 2}, {"rows": 3}]
+
+    # Resubmitting an evicted job runs it again (stages come from the artifact store)
+    again = registry.submit(_df(1), "mha")
+    registry.shutdown()
+    assert again is not jobs[0] and again.result == {"rows": 1}
+    assert jobs[1].status == "evicted"
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import config
+from src.features import FeatureStream, create_features
+from src.model_registry import ModelRegistry
+from src.models import ModelTrainer, OutOfCoreTrainer, _Split
+from src.result_store import ResultStore
+
+def _result_store(path, n=3000, with_probs=True):
+    rng = np.random.default_rng(0)
+    topics = rng.integers(-1, 4, n)
+    sentiment = rng.integers(1, 6, n)
+    probs = rng.dirichlet(np.ones(4), n) if with_probs else None
+    # Ratings follow sentiment on topic 0
+    weight = probs[:, 0] if with_probs else (topics == 0).astype(float)
+    ratings = np.clip(np.round(3 + weight * (sentiment - 3) + rng.normal(0, 0.3, n)), 1, 5)
+    df = pd.DataFrame({'review_text': [f"review {i}" for i in range(n)], 'rating': ratings})
+    return ResultStore.write(path, df, topics, sentiment, topic_probs=probs)
+
+def test_feature_stream_matches_create_features(tmp_path):
+    for with_probs in (True, False):
+        store = _result_store(tmp_path / f"run_{with_probs}", n=500, with_probs=with_probs)
+        columns = store.read(["rating", "topic", "sentiment"])
+        X, y = create_features(columns, columns["topic"].to_numpy(), columns["sentiment"].to_numpy(),
+                               topic_probs=store.topic_probs())
+        stream = FeatureStream(store)
+        assert stream.columns == list(X.columns)
+        chunks = list(stream.iter_chunks(chunk_size=128))
+        np.testing.assert_allclose(np.vstack([c[1] for c in chunks]), X.to_numpy(), rtol=1e-6)
+        np.testing.assert_allclose(stream.rows(np.array([3, 7, 400])), X.to_numpy()[[3, 7, 400]], rtol=1e-6)
+        np.testing.assert_array_equal(stream.y, y.to_numpy(dtype=np.float32))
+
+def test_split_rows():
+    train, validation = _Split(10, 3, validation=False), _Split(10, 3, validation=True)
+    assert train.rows(np.arange(len(train))).tolist() == [0, 1, 3, 4, 6, 7, 9]
+    assert validation.rows(np.arange(len(validation))).tolist() == [2, 5, 8]
+    assert np.flatnonzero(_Split.validation_mask(0, 10, 3)).tolist() == [2, 5, 8]
+
+def test_out_of_core_validation_and_dataset_key(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="at least 2"):
+        OutOfCoreTrainer(validation_every=1)
+
+    stream = FeatureStream(_result_store(tmp_path / "run", n=600))
+    datasets = tmp_path / "datasets"
+    OutOfCoreTrainer(["LightGBM"], dataset_dir=datasets).train_and_evaluate(stream, fingerprint="run")
+    assert len(list(datasets.glob("*.bin"))) == 1
+
+    # A Dataset parameter other than max_bin gets its own binary instead of the stale one
+    monkeypatch.setattr("src.config.OOC_LGB_PARAMS", {**config.OOC_LGB_PARAMS, "min_data_in_bin": 50})
+    OutOfCoreTrainer(["LightGBM"], dataset_dir=datasets).train_and_evaluate(stream, fingerprint="run")
+    assert len(list(datasets.glob("*.bin"))) == 2
+
+def test_out_of_core_training_and_registry(tmp_path):
+    stream = FeatureStream(_result_store(tmp_path / "run"))
+    trainer = OutOfCoreTrainer(chunk_size=700, dataset_dir=tmp_path / "datasets")
+    results, best = trainer.train_and_evaluate(stream, fingerprint="run")
+    assert set(results) == {"LightGBM", "SGD"}
+    assert results["LightGBM"]["Validation Rows"] == len(stream) // 5
+    # Both learn the sentiment-on-topic-0 effect: better than predicting the mean
+    assert all(r["R2"] > 0.2 for r in results.values())
+    assert list((tmp_path / "datasets").glob("*.bin"))
+
+    # Retraining reuses the binned dataset and gives the same model
+    again = OutOfCoreTrainer(["LightGBM"], chunk_size=700, dataset_dir=tmp_path / "datasets")
+    again.train_and_evaluate(stream, fingerprint="run")
+    assert again.results["LightGBM"]["RMSE"] == results["LightGBM"]["RMSE"]
+
+    registry = ModelRegistry(tmp_path / "registry")
+    assert registry.find("run") is None
+    v1 = registry.register(trainer.best_model, stream.columns, results[best], data_fingerprint="run", model_name=best)
+    v2 = registry.register(trainer.fitted["SGD"], stream.columns, results["SGD"], data_fingerprint="other",
+                           model_name="SGD")
+    assert (v1, v2) == (1, 2)
+    assert registry.find("run") == 1 and registry.latest_version() == 2
+    assert registry.list()["model_name"].tolist() == [best, "SGD"]
+
+    model, meta = registry.load(1)
+    assert meta["feature_names"] == stream.columns and meta["metrics"]["RMSE"] == results[best]["RMSE"]
+    X = stream.rows(slice(0, 50))
+    np.testing.assert_allclose(model.predict(X), trainer.best_model.predict(X))
+
+    # A trainer restored from the registry, without retraining
+    restored = ModelTrainer.from_registry(2, registry=registry)
+    assert restored.best_model_name == "SGD" and restored.feature_names == stream.columns
+    np.testing.assert_allclose(restored.best_model.predict(X), trainer.fitted["SGD"].predict(X))
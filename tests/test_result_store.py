@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.features import create_features
+from src.result_store import ResultStore
+
+def test_result_store_roundtrip_and_aggregates(tmp_path, monkeypatch):
+    from src import config
+    monkeypatch.setattr(config, "RESULTS_ROW_GROUP_SIZE", 1000)
+    rng = np.random.default_rng(0)
+    n = 2500
+    df = pd.DataFrame({
+        'review_text': [f"review {i}" for i in range(n)],
+        'clean_text': [f"clean {i}" for i in range(n)],
+        'rating': rng.integers(1, 6, n).astype(float),
+    })
+    topics = rng.integers(-1, 4, n)
+    sentiment = rng.integers(1, 6, n)
+    probs = rng.random((n, 4))
+
+    store = ResultStore.write(tmp_path / "run", df, topics, sentiment, topic_probs=probs)
+    reviews = store.read()
+    assert len(store) == n
+    assert reviews['topic'].dtype == np.int16 and reviews['sentiment'].dtype == np.int8
+    np.testing.assert_array_equal(reviews['topic'], topics)
+
+    mapped = store.topic_probs()
+    assert isinstance(mapped, np.memmap) and mapped.dtype == np.float32
+    np.testing.assert_allclose(mapped, probs, rtol=1e-6)
+
+    # Features built from the store match the in-memory inputs
+    X_store, _ = create_features(reviews, reviews['topic'].to_numpy(), reviews['sentiment'].to_numpy(), topic_probs=mapped)
+    X_mem, _ = create_features(df, topics, sentiment, topic_probs=probs)
+    np.testing.assert_allclose(X_store.to_numpy(), X_mem.to_numpy(), rtol=1e-6)
+
+    # Streaming aggregates (over 3 batches) match a pandas groupby
+    summary = store.topic_summary()
+    expected = pd.DataFrame({'topic': topics, 'rating': df['rating'], 'sentiment': sentiment}).groupby('topic')
+    np.testing.assert_array_equal(summary['count'], expected.size())
+    np.testing.assert_allclose(summary['avg_rating'], expected['rating'].mean())
+    np.testing.assert_allclose(summary['avg_sentiment'], expected['sentiment'].mean())
+    assert store.sentiment_counts().sum() == n
+    assert len(store.head(5)) == 5
+
+def test_rewrite_keeps_the_version_being_read(tmp_path):
+    df = pd.DataFrame({'review_text': ["a", "b", "c"], 'rating': [1.0, 2.0, 3.0]})
+    old = ResultStore.write(tmp_path / "run", df, [0, 1, 0], [1, 2, 3], topic_probs=np.eye(3)[:, :2])
+    probs = old.topic_probs()
+
+    # e.g. a --restart or a second job with the same keys while the first still reads
+    new = ResultStore.write(tmp_path / "run", df, [1, 1, 1], [5, 5, 5])
+    assert new.path != old.path
+    assert old.column("topic").tolist() == [0, 1, 0]
+    np.testing.assert_array_equal(probs, np.eye(3)[:, :2])
+
+    # The key directory now opens the newest version
+    assert ResultStore.exists(tmp_path / "run")
+    assert ResultStore(tmp_path / "run").column("sentiment").tolist() == [5, 5, 5]
+    assert ResultStore(tmp_path / "run").topic_probs() is None
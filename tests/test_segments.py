@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils import generate_dummy_data
+from src.segments import detect_segment_columns, segment_labels, top_determinants, topic_names
+
+def test_segment_columns_and_labels():
+    df = pd.DataFrame({
+        "review_text": ["a", "b", "c", "d"],
+        "rating": [1.0, 2.0, 3.0, 4.0],
+        "location": ["Pune", None, "Delhi", "Pune"],
+        "order type": ["Grocery"] * 4,
+        "agent name": ["A", "B", "C", "D"],
+    })
+    # One distinct value is not a segment; four rows with four agents is still a split
+    assert detect_segment_columns(df) == ["location", "agent name"]
+    assert detect_segment_columns(df, max_values=3) == ["location"]
+    assert segment_labels(df, "location").tolist() == ["Pune", "(missing)", "Delhi", "Pune"]
+
+def test_pipeline_outputs_are_not_segments():
+    # Shaped like run_pipeline's result["df"] on dummy data: one app, 1-5 sentiment scores
+    df = generate_dummy_data("qc", n_samples=100)
+    df["clean_text"] = df["review_text"].str.lower()
+    df["sentiment_score"] = np.resize([1, 2, 4, 5], len(df))
+    assert detect_segment_columns(df) == []
+
+    df["location"] = np.resize(["Pune", "Delhi"], len(df))
+    assert detect_segment_columns(df) == ["location"]
+    assert detect_segment_columns(df, candidates=["sentiment_score"]) == ["sentiment_score"]
+
+def test_top_determinants_uses_topic_names():
+    class Explainer:
+        X = pd.DataFrame(columns=["Topic_0", "Topic_1", "Topic_2", "sentiment_score"])
+        shap_values = np.array([[0.1, -0.5, 0.0, 0.2], [0.1, 0.3, 0.0, -0.2]])
+
+    names = topic_names(pd.DataFrame({"Topic": [0, 1, 2], "Name": ["0_late", "1_rude_rider", "2_fresh"]}))
+    assert top_determinants(Explainer(), names, top_k=3) == "1_rude_rider (0.40), sentiment_score (0.20), 0_late (0.10)"
+
+def test_failed_segments_are_not_stored(tmp_path):
+    from src.artifacts import ArtifactStore
+    from src.segments import compare_segments
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.random((6, 2)), columns=["Topic_0", "sentiment_score"])
+
+    class Explainer:
+        shap_values = np.ones((6, 2))
+
+    Explainer.X = X
+    result = {
+        "df": pd.DataFrame({"location": ["Pune"] * 3 + ["Delhi"] * 3}),
+        "X": X, "y": rng.integers(1, 6, 6).astype(float),
+        "results": {"Ridge": {"RMSE": 1.0, "R2": 0.1}}, "best_model_name": "Ridge",
+        "explainer": Explainer(), "topic_info": None,
+    }
+    store = ArtifactStore(tmp_path)
+    # Three reviews per segment cannot be split into the CV folds, so both segments fail
+    table = compare_segments(result, "location", min_reviews=3, n_jobs=1, store=store)
+    assert table.index.tolist() == ["All"]
+    assert not (tmp_path / "segments").exists()
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import sentiment_analysis
+from src.sentiment_analysis import SentimentAnalyzer, check_backend_parity
+
+def test_unknown_backend_raises():
+    # Rejected before transformers is imported or any model is loaded
+    with pytest.raises(ValueError, match="Unknown sentiment backend 'bogus'"):
+        SentimentAnalyzer("some/model", backend="bogus")
+
+    analyzer = SentimentAnalyzer.__new__(SentimentAnalyzer)
+    analyzer.backend = "bogus"
+    with pytest.raises(ValueError, match="Unknown sentiment backend"):
+        analyzer._load_backend()
+
+def test_backend_parity_metrics(monkeypatch):
+    # Ten texts; the "onnx" stub is off by one star on two of them and by two on one
+    labels = {
+        "torch": [1, 2, 3, 4, 5, 1, 2, 3, 4, 5],
+        "onnx": [1, 2, 3, 4, 4, 1, 2, 5, 4, 4],
+    }
+
+    class StubAnalyzer:
+        def __init__(self, model_name, use_cache=True, num_workers=None, backend=None):
+            self.backend = backend
+
+        def _compute_logits(self, texts):
+            return np.zeros((len(texts), 5), dtype=np.float32)
+
+        def predict(self, texts):
+            return [labels[self.backend][int(t)] for t in texts]
+
+    monkeypatch.setattr(sentiment_analysis, "SentimentAnalyzer", StubAnalyzer)
+    texts = [str(i) for i in range(10)]
+
+    parity = check_backend_parity(texts, "onnx", sample_size=100)
+    assert parity["backend"] == "onnx" and parity["reference"] == "torch"
+    assert parity["n_samples"] == 10
+    assert parity["agreement"] == pytest.approx(0.7)
+    assert parity["within_one_star"] == pytest.approx(0.9)
+    assert parity["mean_abs_star_diff"] == pytest.approx(0.4)
+    assert parity["speedup"] > 0
+
+    # Larger inputs are subsampled without replacement
+    parity = check_backend_parity(texts, "onnx", sample_size=4)
+    assert parity["n_samples"] == 4
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.serving import MicroBatcher, ScoringServer
+
+async def _post(port, body):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode()
+    writer.write(b"POST /score HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 + f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return head.split(b" ")[1].decode(), json.loads(payload)
+
+def test_concurrent_requests_are_micro_batched():
+    batches = []
+
+    def score_fn(texts):
+        batches.append(len(texts))
+        return [{"length": len(t)} for t in texts]
+
+    async def run():
+        server = await ScoringServer(MicroBatcher(score_fn, max_batch=8, max_wait_ms=50), port=0).start()
+        try:
+            texts = ["x" * i for i in range(20)]
+            responses = await asyncio.gather(*(_post(server.port, {"text": t}) for t in texts))
+            batch_response = await _post(server.port, {"texts": ["ab", "abc"]})
+            bad_request = await _post(server.port, {"review": "no text field"})
+            return texts, responses, batch_response, bad_request, server.batcher.stats()
+        finally:
+            await server.stop()
+
+    texts, responses, batch_response, bad_request, stats = asyncio.run(run())
+    # Every caller gets the result for its own text
+    assert [body["length"] for _, body in responses] == [len(t) for t in texts]
+    assert all(status == "200" for status, _ in responses)
+    assert batch_response[1] == {"results": [{"length": 2}, {"length": 3}]}
+    assert bad_request[0] == "400"
+
+    assert max(batches) == 8 and len(batches) < len(texts)
+    assert stats["requests"] == 22 and stats["p99_ms"] >= stats["p50_ms"] > 0
+
+def test_scoring_error_returns_500():
+    def score_fn(texts):
+        raise RuntimeError("model exploded")
+
+    async def run():
+        server = await ScoringServer(MicroBatcher(score_fn, max_batch=8, max_wait_ms=5), port=0).start()
+        try:
+            failed = await _post(server.port, {"text": "hello"})
+            # The server keeps answering after a failed batch
+            failed_again = await _post(server.port, {"texts": ["a", "b"]})
+            return failed, failed_again
+        finally:
+            await server.stop()
+
+    failed, failed_again = asyncio.run(run())
+    assert failed == ("500", {"error": "RuntimeError: model exploded"})
+    assert failed_again[0] == "500"
+
+def test_registry_model_must_match_the_bundle(tmp_path):
+    import joblib
+    import pytest
+    from sklearn.linear_model import Ridge
+    from src.model_registry import ModelRegistry
+    from src.serving import BUNDLE_FILE, Scorer, save_scoring_bundle
+
+    class Trainer:
+        best_model, best_model_name = Ridge(), "Ridge"
+
+    class TopicModeler:
+        def save(self, path):
+            path.mkdir()
+
+    columns = ["Topic_0", "Topic_1", "sentiment_score"]
+    bundle = save_scoring_bundle("run", TopicModeler(), Trainer(), object(), columns, "sentiment/model", "torch",
+                                 path=tmp_path / "scoring", data_fingerprints=["run-features"])
+    assert joblib.load(bundle / BUNDLE_FILE)["data_fingerprints"] == ["run-features"]
+
+    registry = ModelRegistry(tmp_path / "registry")
+    other_run = registry.register(Ridge(), columns, {}, data_fingerprint="other-features", model_name="Ridge")
+    other_topics = registry.register(Ridge(), ["Topic_0", "sentiment_score"], {}, data_fingerprint="run-features",
+                                     model_name="Ridge")
+    # Rejected before any model is loaded
+    with pytest.raises(ValueError, match="another run's data"):
+        Scorer(tmp_path / "scoring", model_version=other_run, registry=registry)
+    with pytest.raises(ValueError, match="different feature columns"):
+        Scorer(tmp_path / "scoring", model_version=other_topics, registry=registry)
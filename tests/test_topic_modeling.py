@@ -0,0 +1,122 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src import config
+from src.topic_modeling import TopicModeler
+
+class StubBERTopic:
+    """
+    Fitted-model stand-in: docs are assigned to the nearest topic embedding,
+    or to -1 when none is within `radius`. Probabilities have one column per topic.
+    """
+
+    def __init__(self, topic_embeddings, radius=0.5, names=None):
+        self.topic_embeddings_ = np.asarray(topic_embeddings, dtype=float)
+        self.radius = radius
+        self.names = names or [f"{t}_topic" for t in range(len(self.topic_embeddings_))]
+        self.transform_calls = 0
+
+    def get_topics(self):
+        return {t: [] for t in range(len(self.topic_embeddings_))}
+
+    def get_topic_info(self):
+        return pd.DataFrame({"Topic": range(len(self.names)), "Count": 10, "Name": self.names})
+
+    def transform(self, docs, embeddings):
+        self.transform_calls += 1
+        distances = np.linalg.norm(np.asarray(embeddings)[:, None] - self.topic_embeddings_[None], axis=2)
+        topics = np.where(distances.min(axis=1) <= self.radius, distances.argmin(axis=1), -1)
+        probs = np.exp(-distances) / np.exp(-distances).sum(axis=1, keepdims=True)
+        return topics.tolist(), probs
+
+    def fit(self, docs, embeddings):
+        self.topics_, self.probabilities_ = self.transform(docs, embeddings)
+        return self
+
+def _modeler(model, **attrs):
+    # A fitted TopicModeler without loading bertopic / sentence-transformers
+    modeler = TopicModeler.__new__(TopicModeler)
+    modeler.__dict__.update({"model": model, "merged": [], "cache": None, "sample_size": 10, "random_state": 0,
+                             **attrs})
+    return modeler
+
+AXES = np.eye(3)
+
+def test_transform_chunks_keep_probability_layout(monkeypatch):
+    monkeypatch.setattr(config, "TOPIC_TRANSFORM_CHUNK_SIZE", 3)
+    model = StubBERTopic(AXES[:2])
+    embeddings = np.repeat(AXES, [4, 3, 3], axis=0)
+    topics, probs = _modeler(model).transform(["doc"] * 10, embeddings=embeddings)
+
+    assert model.transform_calls == 4
+    assert topics == [0] * 4 + [1] * 3 + [-1] * 3
+    assert probs.dtype == np.float32 and probs.shape == (10, 2)
+
+def test_merge_maps_new_topics_and_keeps_original_model(monkeypatch):
+    base = StubBERTopic(AXES[:2])
+    modeler = _modeler(base)
+    # The batch model finds topic 1 again (as its topic 0) and one new cluster
+    batch = StubBERTopic([AXES[1] * 0.9 + AXES[0] * 0.1, AXES[2]], names=["0_again", "1_new"])
+    monkeypatch.setattr(modeler, "_fit_new", lambda docs: batch)
+
+    assert modeler.merge(["doc"] * 5, min_similarity=0.9) == 1
+    assert modeler.model is base
+    assert modeler.merged[0][1] == {0: 1, 1: 2}
+
+    topics, probs = modeler.transform(["doc"] * 3, embeddings=AXES)
+    assert topics == [0, 1, 2]
+    # Still one column per original topic, as the rating model was trained on
+    assert probs.shape == (3, 2)
+
+    info = modeler.get_topic_info()
+    assert info["Topic"].tolist() == [0, 1, 2]
+    assert info["Name"].tolist()[-1] == "1_new"
+    assert modeler.get_topic_embeddings().shape == (3, 3)
+
+def test_fit_transform_sampled_assigns_every_row(monkeypatch):
+    monkeypatch.setattr(config, "TOPIC_SAMPLE_STRATA", 3)
+    monkeypatch.setattr(config, "TOPIC_TRANSFORM_CHUNK_SIZE", 7)
+    rng = np.random.default_rng(0)
+    embeddings = np.repeat(AXES, [30, 15, 5], axis=0) + rng.normal(0, 0.01, (50, 3))
+    model = StubBERTopic(AXES)
+    modeler = _modeler(model, sample_size=12)
+
+    topics, probs = modeler._fit_transform_sampled([f"doc {i}" for i in range(50)], embeddings)
+
+    assert topics == [0] * 30 + [1] * 15 + [2] * 5
+    assert probs.dtype == np.float32 and probs.shape == (50, 3)
+    assert np.allclose(probs.sum(axis=1), 1, atol=1e-5)
+
+def test_save_load_round_trip_and_merge(tmp_path):
+    pytest.importorskip("bertopic")
+    pytest.importorskip("umap")
+    pytest.importorskip("hdbscan")
+
+    class SentenceModel:
+        def encode(self, texts, **kwargs):
+            return np.array([AXES[int(t.split()[1]) % 3] * 10 for t in texts]) + 0.01
+
+    rng = np.random.default_rng(0)
+    docs = [f"topic {i % 2} words{i % 2} more{i % 2} text" for i in range(200)]
+    embeddings = np.array([AXES[i % 2] * 10 for i in range(200)]) + rng.normal(0, 0.1, (200, 3))
+    modeler = TopicModeler(use_cache=False, sentence_model=SentenceModel(), min_cluster_size=20,
+                           n_neighbors=10, n_components=2)
+    modeler.fit_transform(docs, embeddings=embeddings)
+
+    new_docs = [f"topic {2 + i % 2} words{2 + i % 2} other text" for i in range(100)]
+    modeler.merge(new_docs)
+    topics, probs = modeler.transform(docs[:20], embeddings=embeddings[:20])
+    n_topics = probs.shape[1]
+
+    loaded = TopicModeler.load(modeler.save(tmp_path / "topic_model"), use_cache=False,
+                               sentence_model=SentenceModel())
+    loaded_topics, loaded_probs = loaded.transform(docs[:20], embeddings=embeddings[:20])
+    assert loaded_topics == topics
+    assert loaded_probs.shape == (20, n_topics)
+    assert [m for _, m in loaded.merged] == [m for _, m in modeler.merged]
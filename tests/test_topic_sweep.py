@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.topic_sweep import best_topic_params, downstream_rmse, npmi_coherence, rank_results, topic_diversity
+
+def test_topic_quality_metrics():
+    docs = ["late delivery rider", "late delivery again", "fresh fruit quality", "fresh fruit great", "rider late"]
+    coherent = [["late", "delivery"], ["fresh", "fruit"]]
+    mixed = [["late", "fruit"], ["fresh", "delivery"]]
+    assert npmi_coherence(docs, coherent) > 0 > npmi_coherence(docs, mixed)
+    # Phrases from n-gram vectorizers are matched as phrases
+    assert npmi_coherence(docs, [["late delivery", "delivery"]]) == pytest.approx(1.0)
+    assert topic_diversity(coherent) == 1.0
+    assert topic_diversity([["late", "delivery"], ["late", "fruit"]]) == 0.75
+
+def test_downstream_rmse_prefers_informative_topics():
+    rng = np.random.default_rng(0)
+    topics = rng.integers(0, 3, size=300)
+    sentiment = rng.integers(1, 6, size=300)
+    # Ratings driven by sentiment on topic 0 only
+    ratings = np.where(topics == 0, sentiment, 3) + rng.normal(0, 0.1, size=300)
+    assert downstream_rmse(ratings, topics, sentiment) < downstream_rmse(ratings, rng.permutation(topics), sentiment)
+
+def test_ranking_and_best_params():
+    table = pd.DataFrame([
+        {"n_neighbors": 15, "n_components": 5, "min_cluster_size": 80, "min_samples": None,
+         "ngram_range": (1, 3), "rmse": 0.9, "coherence": 0.1},
+        {"n_neighbors": 30, "n_components": 10, "min_cluster_size": 20, "min_samples": 5,
+         "ngram_range": (1, 1), "rmse": 0.8, "coherence": 0.0},
+        {"n_neighbors": 10, "n_components": 5, "min_cluster_size": 40, "min_samples": None,
+         "ngram_range": (1, 2), "rmse": 0.8, "coherence": 0.2},
+    ])
+    ranked = rank_results(table, ["rmse", "coherence"])
+    assert ranked["n_neighbors"].tolist() == [10, 30, 15]
+    assert ranked.index.tolist() == [1, 2, 3]
+    assert best_topic_params(ranked) == {"n_neighbors": 10, "n_components": 5, "min_cluster_size": 40,
+                                         "min_samples": None, "ngram_range": (1, 2)}
+    assert best_topic_params(ranked.iloc[1:])["min_samples"] == 5
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.visualization import summarize_shap, summarize_topics
+
+def test_shap_summary_is_bounded():
+    rng = np.random.default_rng(0)
+    n_rows = 20_000
+    X = pd.DataFrame(rng.uniform(0, 5, size=(n_rows, 30)), columns=[f"Topic_{i}" for i in range(30)])
+    # Feature importance grows with the column index
+    shap_values = rng.normal(size=(n_rows, 30)) * np.arange(1, 31)
+
+    summary = summarize_shap(shap_values, X, max_features=5, value_bins=10, shap_bins=20, points_per_bin=3)
+    assert summary["n_rows"] == n_rows
+    assert summary["features"] == ["Topic_29", "Topic_28", "Topic_27", "Topic_26", "Topic_25"]
+    assert np.all(np.diff(summary["mean_abs"]) <= 0)
+    assert summary["density"].shape == (5, 10, 20)
+    # Every row is counted in each feature's density
+    assert summary["density"].sum(axis=(1, 2)).tolist() == [n_rows] * 5
+
+    swarm = summary["beeswarm"]
+    assert len(swarm["shap"]) <= 5 * 20 * 3
+    # Sparse tails are kept: the extreme values of the top feature are in the sample
+    top = swarm["shap"][swarm["feature"] == 0]
+    assert top.min() < np.percentile(shap_values[:, 29], 1)
+    assert ((swarm["color"] >= 0) & (swarm["color"] <= 1)).all()
+    assert ((swarm["density"] > 0) & (swarm["density"] <= 1)).all()
+
+def test_topic_summary():
+    topic_info = pd.DataFrame({"Topic": [-1, 0, 1, 2], "Count": [50, 30, 20, 10],
+                               "Name": ["-1_misc", "0_late", "1_rude", "2_fresh"]})
+    embeddings = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0]], dtype=float)
+    stats = pd.DataFrame({"avg_rating": [3.0, 1.5, 2.0, 4.5], "avg_sentiment": [3.0, 1.2, 2.1, 4.8]},
+                         index=pd.Index([-1, 0, 1, 2], name="topic"))
+
+    topics = summarize_topics(topic_info, embeddings, stats, max_topics=2)
+    assert topics["topic"].tolist() == [0, 1]
+    assert topics["avg_rating"].tolist() == [1.5, 2.0]
+    assert {"x", "y", "count", "name"} <= set(topics.columns)
+    # Without embeddings topics still get positions
+    assert summarize_topics(topic_info)[["x", "y"]].notna().all().all()